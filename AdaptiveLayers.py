@@ -0,0 +1,123 @@
+import numpy as np
+from GeomBase import epsilon
+from FacetLayerIndex import FacetLayerIndex
+
+
+def genUniformHeights(stlModel, layerThk):
+    """统一层厚的层高列表（各切片器 genLayerHeights 的公共实现）"""
+    xMin, xMax, yMin, yMax, zMin, zMax = stlModel.getBounds()
+    zs = []
+    z = zMin + layerThk
+    while z < zMax:
+        zs.append(z)
+        z += layerThk
+    return zs
+
+
+def facetNormalZ(stlModel):
+    """每个面片单位法向量的 |nz|，文件中法向量为零时由顶点叉积重新计算"""
+    n = stlModel.getFacetNumber()
+    normals = stlModel.getFacetNormals(slice(0, n))
+    lengths = np.linalg.norm(normals, axis=1)
+    bad = lengths < epsilon
+    if bad.any():
+        v = stlModel.getFacetVertices(np.flatnonzero(bad))
+        normals = normals.copy()
+        normals[bad] = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nz = np.abs(normals[:, 2]) / lengths
+    return np.nan_to_num(nz, nan=0.0)
+
+
+# |nz| 超过此值的面片视为水平面片
+FLAT_NZ = 1.0 - 1e-6
+# 正好在水平面高度切片时共面面片使截面不确定，层面放在水平面下方这么远处（G 代码 Z 按 0.001 输出）
+FLAT_OFFSET = 1e-4
+
+
+def facetThicknesses(stlModel, minThk, maxThk, cuspHeight, nz=None):
+    """按尖角高度计算每个面片允许的最大层厚：cusp = t * |nz|
+    竖直面片不产生台阶误差；genAdaptiveHeights 在水平面片处强制设置层面，水平面片也不限制层厚。
+    接近水平的斜面台阶误差接近层厚，取 minThk"""
+    if nz is None:
+        nz = facetNormalZ(stlModel)
+    with np.errstate(divide='ignore'):
+        thk = np.where(nz > epsilon, cuspHeight / nz, maxThk)
+    thk[nz > FLAT_NZ] = maxThk
+    return np.clip(thk, minThk, maxThk)
+
+
+def flatHeights(stlModel, nz=None):
+    """模型内部（不含底面和顶面）水平面片对应的层面高度，升序去重"""
+    if nz is None:
+        nz = facetNormalZ(stlModel)
+    zMins, zMaxs = stlModel.getFacetZRange()
+    zs = np.sort(zMins[nz > FLAT_NZ])
+    zs = zs[np.concatenate([[True], np.diff(zs) > FLAT_OFFSET])] if len(zs) else zs
+    zs = zs[(zs > stlModel.zMin + FLAT_OFFSET) & (zs < stlModel.zMax - FLAT_OFFSET)]
+    return zs - FLAT_OFFSET
+
+
+def nextBoundary(z, t, flats, k, minThk, maxThk):
+    """从层面 z 按期望层厚 t 前进一层，返回下一层面；flats[k:] 为尚未到达的水平面层面
+    水平面落在本层内则本层止于该面；本层之后到该面只剩不足 minThk 时两层平分这段距离，
+    平分后薄于 minThk 则并为一层。层厚 [minThk, maxThk] 优先：离 z 不足 minThk 的水平面，
+    以及无法分成合规层厚的水平面不再强制为层面"""
+    for f in flats[k:]:
+        gap = float(f) - z
+        if gap >= t + minThk:
+            break
+        if minThk <= gap <= t:
+            return float(f)
+        if gap > t:
+            if gap >= 2.0 * minThk:
+                return z + gap / 2.0
+            if gap <= maxThk:
+                return float(f)
+    return z + t
+
+
+def genAdaptiveHeights(stlModel, minThk, maxThk, cuspHeight):
+    """自适应层高列表：每层厚度取覆盖该层的面片允许层厚的最小值，限制在 [minThk, maxThk] 内；
+    模型内部的水平面正下方（FLAT_OFFSET）是层面，除非与相邻层面的距离无法满足层厚限制"""
+    xMin, xMax, yMin, yMax, zMin, zMax = stlModel.getBounds()
+    if stlModel.getFacetNumber() == 0:
+        return []
+    zMins, zMaxs = stlModel.getFacetZRange()
+    nz = facetNormalZ(stlModel)
+    thk = facetThicknesses(stlModel, minThk, maxThk, cuspHeight, nz)
+    flats = flatHeights(stlModel, nz)
+
+    # 把 Z 方向划分为小格，每格记录跨过它的面片允许层厚的最小值；只有受限面片需要展开
+    binSize = minThk / 4.0
+    binNum = int(np.ceil((zMax - zMin) / binSize)) + 1
+    limited = np.flatnonzero(thk < maxThk)
+    index = FacetLayerIndex.fromBins(zMins[limited], zMaxs[limited], zMin, binSize, binNum)
+    profile = index.layerMin(thk[limited], maxThk)
+
+    zs = []
+    z = zMin
+    k = 0
+    while True:
+        # 层厚只会减小，反复收缩直到区间内的限制都满足
+        t = maxThk
+        while True:
+            b0 = min(int((z - zMin) / binSize), binNum - 1)
+            b1 = min(int((z + t - zMin) / binSize), binNum - 1)
+            tNew = max(minThk, min(t, float(profile[b0:b1 + 1].min())))
+            if tNew >= t:
+                break
+            t = tNew
+        z = nextBoundary(z, t, flats, k, minThk, maxThk)
+        while k < len(flats) and flats[k] <= z + epsilon:
+            k += 1
+        if z >= zMax:
+            break
+        zs.append(z)
+    return zs
+
+
+def layerThicknesses(zs, zMin):
+    """由层高列表得到每层的层厚，第一层从模型底面算起"""
+    return np.diff(np.concatenate([[zMin], zs])).tolist()
@@ -1,7 +1,9 @@
 import math
+import numpy as np
 import pyclipper
 from Polyline import *
 from GeomBase import Point3D
+import Profiler
 
 
 class ClipperAdaptor:
@@ -11,12 +13,8 @@ class ClipperAdaptor:
 
     def toPath(self, poly):
         """将Polyline转化为Path (浮点 -> 整数)"""
-        path = []
-        for pt in poly.points:
-            x_int = int(round(pt.x * self.f))
-            y_int = int(round(pt.y * self.f))
-            path.append((x_int, y_int))
-        return path
+        arr = polylineToArray(poly)[:, :2]
+        return np.rint(arr * self.f).astype(np.int64).tolist()
 
     def toPaths(self, polys):
         """将Polyline列表转化为Path列表"""
@@ -27,17 +25,15 @@ class ClipperAdaptor:
 
     def toPoly(self, path, z=0, closed=True):
         """将Path转化为Polyline (整数 -> 浮点)"""
-        poly = Polyline()
-        for pt in path:
-            x = pt[0] / self.f
-            y = pt[1] / self.f
-            poly.addPoint(Point3D(x, y, z))
-
-        if len(path) > 0 and closed:
-            first_pt = path[0]
-            if path[-1] != first_pt:
-                poly.addPoint(Point3D(first_pt[0] / self.f, first_pt[1] / self.f, z))
-        return poly
+        if len(path) == 0:
+            return Polyline()
+        xy = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+        if closed and (xy[-1] != xy[0]).any():
+            xy = np.vstack([xy, xy[:1]])
+        arr = np.empty((len(xy), 3))
+        arr[:, :2] = xy / self.f
+        arr[:, 2] = z
+        return arrayToPolyline(arr)
 
     def toPolys(self, paths, z=0, closed=True):
         """将Path列表转化为Polyline列表"""
@@ -68,52 +64,78 @@ class ClipperAdaptor:
 
         return self.toPolys(cleaned, z, True)
 
-    def offset(self, polys, delta, jt=pyclipper.JT_SQUARE):
-        """偏置函数"""
-        if not polys: return []
+    # ---- 整数路径模式：连续的偏置/布尔运算之间保持 Path 形式，只在最后转化为 Polyline ----
+
+    @staticmethod
+    def validPaths(paths):
+        """与 toPolys 一致，丢弃少于3个点的路径"""
+        return [path for path in paths if len(path) >= 3]
+
+    def offsetPaths(self, paths, delta, jt=pyclipper.JT_SQUARE):
+        """偏置函数（整数路径输入输出）"""
+        if not paths: return []
 
         pco = pyclipper.PyclipperOffset()
         pco.ArcTolerance = self.arcTolerance * self.f
+        pco.AddPaths(paths, jt, pyclipper.ET_CLOSEDPOLYGON)
 
-        paths = self.toPaths(polys)
-        for path in paths:
-            pco.AddPath(path, jt, pyclipper.ET_CLOSEDPOLYGON)
-
-        # 执行偏置
+        Profiler.count('clipper')
         try:
             solution = pco.Execute(delta * self.f)
         except:
             return []
+        return self.validPaths(solution)
 
-        if not solution: return []
+    def iterOffsetPaths(self, paths, deltas, jt=pyclipper.JT_SQUARE, minArea=0.0):
+        """同一组路径的连续偏置：路径只加入一次 PyclipperOffset，依次执行各偏置量
+        结果按面积过滤，某次结果为空（区域已收缩消失）时停止"""
+        if not paths: return
 
-        z_coord = polys[0].point(0).z if polys[0].count() > 0 else 0
-        return self.toPolys(solution, z_coord, True)
+        pco = pyclipper.PyclipperOffset()
+        pco.ArcTolerance = self.arcTolerance * self.f
+        pco.AddPaths(paths, jt, pyclipper.ET_CLOSEDPOLYGON)
+
+        minIntArea = minArea * self.f * self.f
+        for delta in deltas:
+            Profiler.count('clipper')
+            try:
+                solution = pco.Execute(delta * self.f)
+            except:
+                return
+            solution = [path for path in self.validPaths(solution) if math.fabs(pyclipper.Area(path)) > minIntArea]
+            if not solution:
+                return
+            yield solution
+
+    def clipPaths(self, subjPaths, clipPaths, clipType, minArea=0.01):
+        """通用布尔运算（整数路径输入输出），按面积过滤微小区域"""
+        if not subjPaths: return []
 
-    def clip(self, subjPolys, clipPolys, clipType, z=0, minArea=0.01):
-        """通用布尔运算"""
         clipper = pyclipper.Pyclipper()
+        clipper.AddPaths(subjPaths, pyclipper.PT_SUBJECT, True)
+        if clipPaths:
+            clipper.AddPaths(clipPaths, pyclipper.PT_CLIP, True)
 
-        p_subj = self.toPaths(subjPolys)
-        p_clip = self.toPaths(clipPolys)
-
-        if not p_subj: return []
-
-        clipper.AddPaths(p_subj, pyclipper.PT_SUBJECT, True)
-        if p_clip:
-            clipper.AddPaths(p_clip, pyclipper.PT_CLIP, True)
-
+        Profiler.count('clipper')
         try:
             sln = clipper.Execute(clipType, pyclipper.PFT_EVENODD, pyclipper.PFT_EVENODD)
         except:
             return []
 
-        slnPolys = self.toPolys(sln, z)
+        minIntArea = minArea * self.f * self.f
+        return [path for path in self.validPaths(sln) if math.fabs(pyclipper.Area(path)) >= minIntArea]
+
+    def offset(self, polys, delta, jt=pyclipper.JT_SQUARE):
+        """偏置函数"""
+        if not polys: return []
+
+        solution = self.offsetPaths(self.toPaths(polys), delta, jt)
+        if not solution: return []
 
-        # 过滤微小面积
-        resultPolys = []
-        for poly in slnPolys:
-            if math.fabs(poly.getArea()) >= minArea:
-                resultPolys.append(poly)
+        z_coord = polys[0].point(0).z if polys[0].count() > 0 else 0
+        return self.toPolys(solution, z_coord, True)
 
-        return resultPolys
\ No newline at end of file
+    def clip(self, subjPolys, clipPolys, clipType, z=0, minArea=0.01):
+        """通用布尔运算"""
+        sln = self.clipPaths(self.toPaths(subjPolys), self.toPaths(clipPolys), clipType, minArea)
+        return self.toPolys(sln, z)
@@ -0,0 +1,66 @@
+import numpy as np
+from Utility import expandRanges
+
+
+class FacetLayerIndex:
+    """面片-层关联索引（CSR 结构）：层高 z 满足 zMin <= z <= zMax 的面片与该层关联
+    （lowerOpen 为 True 时为 zMin < z <= zMax）
+    第 i 层的面片序号为 facets[offsets[i]:offsets[i + 1]]，层内按面片序号升序；zs 需升序"""
+
+    def __init__(self, zMins, zMaxs, zs, lowerOpen=False):
+        zMins, zMaxs = np.asarray(zMins, dtype=np.float64), np.asarray(zMaxs, dtype=np.float64)
+        self.zs = np.asarray(zs, dtype=np.float64)
+        # 每个面片关联的层序号区间 [lo, hi)
+        lo = np.searchsorted(self.zs, zMins, 'right' if lowerOpen else 'left')
+        hi = np.searchsorted(self.zs, zMaxs, 'right')
+        self.setRanges(lo, hi)
+
+    def setRanges(self, lo, hi):
+        """由每个面片关联的层序号区间 [lo, hi) 建立 CSR"""
+        counts = np.maximum(hi - lo, 0)
+        # 展开为 (面片, 层) 对，按层稳定排序后层内保持面片序号升序
+        facet, layer = expandRanges(lo, counts)
+        # 层数不超过 65535 时用 uint16 作排序键，numpy 对 16 位整数的稳定排序为基数排序
+        key = layer.astype(np.uint16) if len(self.zs) <= 0xFFFF else layer
+        order = np.argsort(key, kind='stable')
+        self.facets = facet[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(layer, minlength=len(self.zs)))])
+
+    @staticmethod
+    def fromModel(stlModel, zs, lowerOpen=False):
+        zMins, zMaxs = stlModel.getFacetZRange()
+        return FacetLayerIndex(zMins, zMaxs, zs, lowerOpen)
+
+    @staticmethod
+    def fromBins(zMins, zMaxs, z0, binSize, binNum):
+        """等距分格索引：第 b 格为 [z0 + b * binSize, z0 + (b + 1) * binSize)，
+        面片与其 Z 范围覆盖的各格关联，超出范围的部分归入首尾两格"""
+        zMins, zMaxs = np.asarray(zMins, dtype=np.float64), np.asarray(zMaxs, dtype=np.float64)
+        index = FacetLayerIndex([], [], z0 + binSize * np.arange(binNum))
+        lo = np.clip(((zMins - z0) / binSize).astype(np.int64), 0, binNum - 1)
+        hi = np.clip(((zMaxs - z0) / binSize).astype(np.int64), 0, binNum - 1) + 1
+        index.setRanges(lo, hi)
+        return index
+
+    def __len__(self):
+        return len(self.zs)
+
+    def layerFacets(self, i):
+        """第 i 层关联的面片序号数组"""
+        return self.facets[self.offsets[i]:self.offsets[i + 1]]
+
+    def pairCount(self):
+        return len(self.facets)
+
+    def pairLayers(self):
+        """与 facets 一一对应的层序号数组"""
+        return np.repeat(np.arange(len(self.zs)), np.diff(self.offsets))
+
+    def layerMin(self, values, default):
+        """每层关联面片的 values 最小值，没有关联面片的层取 default"""
+        result = np.full(len(self.zs), default, dtype=np.float64)
+        nonEmpty = np.flatnonzero(np.diff(self.offsets) > 0)
+        if len(nonEmpty):
+            # 空层的区间长度为0，相邻非空层之间的区间正好是前一层的面片
+            result[nonEmpty] = np.minimum.reduceat(np.asarray(values)[self.facets], self.offsets[nonEmpty])
+        return result
@@ -31,12 +31,16 @@ class FindSptRegion:
         # 2. 遍历每一层切片，生成平面支撑区域
         if self.layers:
             for layer in self.layers:
-                layer.sptContours = []  # 初始化支撑轮廓列表
-                # 计算当前高度的切片支撑点
-                pts = self.calcLayerSptPoints(gridDic, layer.z)
-                # 如果有支撑点，生成支撑区域
-                if len(pts) > 0:
-                    layer.sptContours = self.genSptRegions(pts, layer)
+                self.findLayerSptRegions(gridDic, layer)
+
+    def findLayerSptRegions(self, gridDic, layer):
+        """生成单层的支撑区域，只依赖模型支撑点和本层轮廓，可逐层调用"""
+        layer.sptContours = []  # 初始化支撑轮廓列表
+        # 计算当前高度的切片支撑点
+        pts = self.calcLayerSptPoints(gridDic, layer.z)
+        # 如果有支撑点，生成支撑区域
+        if len(pts) > 0:
+            layer.sptContours = self.genSptRegions(pts, layer)
 
     def initGrids(self):
         """底面网格生成函数"""
@@ -27,28 +27,19 @@ class GenCpPath:
         # 最小面积阈值，过滤噪点
         MIN_AREA = 1.0
 
+        # 边界只加入一次偏置器，依次执行各圈偏置量，区域消失时提前结束
+        paths = ca.toPaths(self.boundaries)
+        z = self.boundaries[0].point(0).z if self.boundaries and self.boundaries[0].count() > 0 else 0
+        for valid_paths in ca.iterOffsetPaths(paths, self.ringDeltas(), self.joinType, MIN_AREA):
+            self.offsetPolyses.append(ca.toPolys(valid_paths, z))
+
+    def ringDeltas(self):
+        """各圈的偏置量：首圈半个间距，之后每圈增加一个间距，直到超过壳厚"""
         delta = self.interval / 2
-
-        # 首次偏置
-        raw_polys = ca.offset(self.boundaries, -delta, self.joinType)
-        valid_polys = [p for p in raw_polys if abs(p.getArea()) > MIN_AREA]
-
-        if valid_polys:
-            self.offsetPolyses.append(valid_polys)
-        else:
-            return
-
-        # 循环偏置
+        yield -delta
         while math.fabs(delta) < self.shellThk:
             delta += self.interval
-            raw_polys = ca.offset(self.boundaries, -delta, self.joinType)
-
-            if not raw_polys: break
-
-            valid_polys = [p for p in raw_polys if abs(p.getArea()) > MIN_AREA]
-            if not valid_polys: break
-
-            self.offsetPolyses.append(valid_polys)
+            yield -delta
 
     def linkToParent(self, child):
         """将子曲线连接到父曲线上 """
@@ -67,9 +58,9 @@ class GenCpPath:
 
         newPoly = Polyline()
         for i in range(iAtdMin + 1): newPoly.addPoint(parent.point(i).clone())
-        if newPoly.count() > 0: newPoly.points[-1].w = 1
+        if newPoly.count() > 0: newPoly.setFlag(newPoly.count() - 1, 1)
         for i in range(child.count()): newPoly.addPoint(child.point(i).clone())
-        if newPoly.count() > 0: newPoly.points[-1].w = 1
+        if newPoly.count() > 0: newPoly.setFlag(newPoly.count() - 1, 1)
         for i in range(iAtdMin, parent.count()): newPoly.addPoint(parent.point(i).clone())
         return newPoly
 
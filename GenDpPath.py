@@ -67,7 +67,7 @@ class GenDpPath:
             # 标记连接线段（跳刀）
             if i < len(segs) - 1:
                 if poly.count() > 0:
-                    poly.points[-1].w = 1.0
+                    poly.setFlag(poly.count() - 1, 1)
 
         return poly
 
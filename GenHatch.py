@@ -1,106 +1,106 @@
 import math
+import numpy as np
 import pyclipper
 from GeomBase import *
 from Polyline import *
 from Segment import *
-from Line import *
-from GeomAlgo import intersect
+from GeomAlgo import PolygonEdgeTable
+from Utility import expandRanges
 from ClipperAdaptor import ClipperAdaptor
 
 
-class SweepLine:
-    def __init__(self):
-        self.segs = []
-
-    def intersect(self, y):
-        ips = []
-
-        # 获取当前层的正确 Z 高度
-        current_z = 0.0
-        if len(self.segs) > 0:
-            current_z = self.segs[0].A.z
-
-        yLine = Line(Point3D(0, y, current_z), Vector3D(1, 0, 0))
-
-        for seg in self.segs:
-            # 检查端点重合
-            if abs(seg.A.y - y) < epsilon:
-                ips.append(seg.A.clone())
-            elif abs(seg.B.y - y) < epsilon:
-                ips.append(seg.B.clone())
-            else:
-                ip = intersect(yLine, seg)
-                if ip is not None:
-                    ips.append(ip)
-
-        # 按X排序
-        ips.sort(key=lambda p: p.x)
+class HatchEdgeTable:
+    """扫描线填充的二维边表：忽略极短边，各边按 yMin 排序并预先计算斜率倒数，
+    建好后对一组扫描线用数组一次算出全部交点"""
+
+    def __init__(self, polygons):
+        table = PolygonEdgeTable(polygons)
+        keep = table.lenSq >= epsilonSquare
+        x0, y0, x1, y1 = table.x0[keep], table.y0[keep], table.x1[keep], table.y1[keep]
+        dx, dy = x1 - x0, y1 - y0
+        yMin = np.minimum(y0, y1)
+        order = np.argsort(yMin, kind='stable')
+        self.x0, self.y0, self.x1, self.y1 = x0[order], y0[order], x1[order], y1[order]
+        self.dy = dy[order]
+        self.yMin, self.yMax = yMin[order], np.maximum(y0, y1)[order]
+        # 与扫描线平行的边不求交
+        self.flat = (dy * dy <= epsilonSquare * (dx * dx + dy * dy))[order]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.invSlope = np.where(self.flat, 0.0, dx[order] / self.dy)
+        self.z = 0.0
+        for poly in polygons:
+            if poly.count() > 0:
+                self.z = poly.point(0).z
+                break
 
-        # 移除重合点
-        i = len(ips) - 1
+    def scan(self, ys):
+        """每条扫描线的交点 (xs, ys) 数组，按 x 排序并去除成对重合的点
+        边的有效区间为 yMin < y - epsilon <= yMax（半开区间，防止顶点重复计算），
+        在排好序的扫描线上用 searchsorted 得到每条边的活动区间，所有 (边, 扫描线) 对一次求交"""
+        ys = np.asarray(ys, dtype=np.float64)
+        lineOrder = np.argsort(ys, kind='stable')
+        sortedYs = ys[lineOrder]
+        lo = np.searchsorted(sortedYs, self.yMin + epsilon, 'right')
+        hi = np.searchsorted(sortedYs, self.yMax + epsilon, 'right')
+        cnt = np.maximum(hi - lo, 0)
+        edge, line = expandRanges(lo, cnt)
+        y = sortedYs[line]
+
+        y0, y1 = self.y0[edge], self.y1[edge]
+        # 端点落在扫描线上时直接取端点
+        endA = np.abs(y0 - y) < epsilon
+        endB = ~endA & (np.abs(y1 - y) < epsilon)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (y - y0) / self.dy[edge]
+        valid = endA | endB | (~self.flat[edge] & (t >= 0.0) & (t <= 1.0))
+        xs = np.where(endA, self.x0[edge], np.where(endB, self.x1[edge], self.x0[edge] + (y - y0) * self.invSlope[edge]))
+        pys = np.where(endA, y0, np.where(endB, y1, y))
+        xs, pys, line = xs[valid], pys[valid], line[valid]
+
+        order = np.lexsort((xs, line))
+        xs, pys, line = xs[order], pys[order], line[order]
+        bounds = np.searchsorted(line, np.arange(len(ys) + 1), 'left')
+        # 同一扫描线上相邻的重合点所在的扫描线需要逐点处理
+        close = (np.diff(xs) ** 2 + np.diff(pys) ** 2 < epsilonSquare) & (line[1:] == line[:-1])
+        closeLines = set(line[1:][close].tolist())
+
+        result = [None] * len(ys)
+        for k, i in enumerate(lineOrder.tolist()):
+            lx, ly = xs[bounds[k]:bounds[k + 1]], pys[bounds[k]:bounds[k + 1]]
+            if k in closeLines:
+                lx, ly = self.removeCoincident(lx, ly)
+            result[i] = (lx, ly)
+        return result
+
+    @staticmethod
+    def removeCoincident(xs, ys):
+        """移除重合点（成对移除）"""
+        keep = np.ones(len(xs), dtype=bool)
+        i = len(xs) - 1
         while i > 0:
-            if ips[i].distanceSquare(ips[i - 1]) < epsilonSquare:
-                del ips[i]
-                del ips[i - 1]
+            if (xs[i] - xs[i - 1]) ** 2 + (ys[i] - ys[i - 1]) ** 2 < epsilonSquare:
+                keep[i] = keep[i - 1] = False
                 i -= 2
             else:
                 i -= 1
-        return ips
+        return xs[keep], ys[keep]
 
 
 def calcHatchPoints(polygons, ys):
-    segs = []
-    # 收集所有边
-    for poly in polygons:
-        cnt = poly.count()
-        for i in range(cnt):
-            p1 = poly.point(i)
-            p2 = poly.point((i + 1) % cnt)
-            # 忽略极短边
-            if p1.distance(p2) < epsilon: continue
-
-            seg = Segment(p1, p2)
-            seg.yMin = min(p1.y, p2.y)
-            seg.yMax = max(p1.y, p2.y)
-            segs.append(seg)
-
-    segs.sort(key=lambda s: s.yMin)
-
-    k = 0
-    sweep = SweepLine()
-    ipsec = []
-
-    for y in ys:
-        # 移除
-        for i in range(len(sweep.segs) - 1, -1, -1):
-            if sweep.segs[i].yMax < y - epsilon:
-                del sweep.segs[i]
-
-        # 添加
-        for i in range(k, len(segs)):
-            seg = segs[i]
-            # yMin < y <= yMax (半开区间，防止顶点重复计算)
-            if seg.yMin < y - epsilon <= seg.yMax:
-                sweep.segs.append(seg)
-            elif seg.yMin >= y - epsilon:
-                k = i
-                break
-
-        if len(sweep.segs) > 0:
-            ipsec.append(sweep.intersect(y))
-        else:
-            ipsec.append([])
-
-    return ipsec
+    """返回每条扫描线上按 x 排序的交点列表"""
+    table = HatchEdgeTable(polygons)
+    z = table.z
+    return [[Point3D(x, y, z) for x, y in zip(xs.tolist(), pys.tolist())] for xs, pys in table.scan(ys)]
 
 
 def genHatches(polygons, ys):
     segs = []
-    ipsec = calcHatchPoints(polygons, ys)
-    for ips in ipsec:
-        for i in range(0, len(ips), 2):
-            if i + 1 < len(ips):
-                segs.append(Segment(ips[i], ips[i + 1]))
+    table = HatchEdgeTable(polygons)
+    z = table.z
+    for xs, pys in table.scan(ys):
+        xs, pys = xs.tolist(), pys.tolist()
+        for i in range(0, len(xs) - 1, 2):
+            segs.append(Segment(Point3D(xs[i], pys[i], z), Point3D(xs[i + 1], pys[i + 1], z)))
     return segs
 
 
@@ -111,9 +111,10 @@ def genSweepHatches(polygons, interval, angle):
 
     yMin, yMax = float('inf'), float('-inf')
     for poly in rotPolys:
-        for pt in poly.points:
-            yMin = min(yMin, pt.y)
-            yMax = max(yMax, pt.y)
+        if poly.count() == 0: continue
+        ys = polylineToArray(poly)[:, 1]
+        yMin = min(yMin, float(ys.min()))
+        yMax = max(yMax, float(ys.max()))
 
     ys = []
     y = yMin + interval
@@ -134,11 +135,12 @@ def genClipHatches(polygons, interval, angle):
     z = polygons[0].startPoint().z
 
     for poly in polygons:
-        for pt in poly.points:
-            xMin = min(xMin, pt.x);
-            xMax = max(xMax, pt.x)
-            yMin = min(yMin, pt.y);
-            yMax = max(yMax, pt.y)
+        if poly.count() == 0: continue
+        xy = polylineToArray(poly)[:, :2]
+        xMin = min(xMin, float(xy[:, 0].min()))
+        xMax = max(xMax, float(xy[:, 0].max()))
+        yMin = min(yMin, float(xy[:, 1].min()))
+        yMax = max(yMax, float(xy[:, 1].max()))
 
     center = Point3D((xMin + xMax) / 2, (yMin + yMax) / 2, z)
     R = math.sqrt((xMax - xMin) ** 2 + (yMax - yMin) ** 2) / 2.0
@@ -1,10 +1,17 @@
+import gzip
+import io
 import math
-from GenSptPath import SptFillType, genSptPath
-from SliceAlgo import intersectStl_sweep
-from IdEndLayers import idEndLayers
+import numpy as np
+from GenSptPath import SptFillType, genSptPath, iterSptPaths
+from SliceAlgo import slice_combine, warnOpenLayers
+from SliceCache import sliceCached, openSliceCached, openSliceTemp
+from AdaptiveLayers import genAdaptiveHeights, layerThicknesses
+from IdEndLayers import idEndLayers, iterIdEndLayers
 from GenCpPath import genCpPath
 from GenDpPath import genDpPath
 from GeomBase import *
+from Polyline import polylineToArray
+import Profiler
 
 
 class PrintParams:
@@ -24,26 +31,80 @@ class PrintParams:
         self.startCode = "; Start code...\nG28\n"
         self.endCode = "; End code...\nM104 S0\n"
         self.nozzleSize, self.filamentSize = 0.4, 1.75  # 常用默认值
+        self.workers = 1  # 并行进程数，大于1时按层块多进程生成路径
+        self.cacheDir = None  # 切片缓存目录，设置后相同模型和层厚跳过切片
+        self.adaptive = False  # 自适应层厚：按面片斜率和尖角高度在 [minLayerThk, maxLayerThk] 内分层
+        self.minLayerThk, self.maxLayerThk = 0.1, 0.3
+        self.cuspHeight = 0.1
 
 
-def genAllPaths(pp: PrintParams):
-    """所有路径生成函数"""
-    sfInvl = pp.nozzleSize / pp.sfRate
-    sptSfInvl = pp.nozzleSize / pp.sptSfRate
+def layerHeights(pp: PrintParams):
+    """自适应分层时返回层高列表，否则返回 None（由切片器按 layerThk 均匀分层）"""
+    if not pp.adaptive:
+        return None
+    return genAdaptiveHeights(pp.stlModel, pp.minLayerThk, pp.maxLayerThk, pp.cuspHeight)
 
-    layers = intersectStl_sweep(pp.stlModel, pp.layerThk)
 
-    endLayerNum = int(pp.endThk / pp.layerThk) + 1
-    idEndLayers(layers, pp.shellThk, endLayerNum)
+def endLayerNumber(pp: PrintParams):
+    if pp.adaptive:
+        # 层厚不均匀时按最小层厚计算端面层数，保证端面厚度不小于 endThk
+        return int(pp.endThk / pp.minLayerThk) + 1
+    return int(pp.endThk / pp.layerThk) + 1
 
-    for i, layer in enumerate(layers):
-        layer.cpPaths, layer.ffPaths, layer.sfPaths = [], [], []
 
-        # 轮廓路径
+def setLayerThicknesses(pp: PrintParams, layers, zs):
+    if zs is not None:
+        zMin = pp.stlModel.getBounds()[4]
+        for layer, thk in zip(layers, layerThicknesses(zs, zMin)):
+            layer.thk = thk
+            yield layer
+    else:
+        yield from layers
+
+
+def sliceLayers(pp: PrintParams, slicer=slice_combine):
+    """切片并识别端面层，返回带轮廓和填充区域的层列表
+    slicer(stlModel, layerThk, zs) 为切片函数"""
+    zs = layerHeights(pp)
+    if pp.cacheDir is not None:
+        layers = sliceCached(pp.stlModel, pp.layerThk, pp.cacheDir, slicer, zs)
+    else:
+        layers = slicer(pp.stlModel, pp.layerThk, zs)
+
+    layers = list(setLayerThicknesses(pp, layers, zs))
+    idEndLayers(layers, pp.shellThk, endLayerNumber(pp))
+    return layers
+
+
+def iterSliceLayers(pp: PrintParams):
+    """逐层产生已识别端面层的层（生成器），结果与 sliceLayers 相同
+    上端面识别需要自上而下扫描：先逐层切片并写入切片缓存（未设缓存目录时为临时文件），
+    再从缓存自上而下读一遍，只保留非空的上端面区域，最后自下而上读缓存并产生结果，
+    模型只切片一遍，任一时刻只有少数几层的轮廓在内存中"""
+    zs = layerHeights(pp)
+    if pp.cacheDir is not None:
+        cached = openSliceCached(pp.stlModel, pp.layerThk, pp.cacheDir, zs)
+    else:
+        cached = openSliceTemp(pp.stlModel, pp.layerThk, zs)
+
+    with cached:
+        layers = setLayerThicknesses(pp, cached.iterLayers(), zs)
+        yield from iterIdEndLayers(layers, cached.iterLayers(reverse=True), pp.shellThk, endLayerNumber(pp))
+        warnOpenLayers(cached.layerHeaders())
+
+
+def genLayerPaths(layer, i, pp: PrintParams):
+    """生成第 i 层的轮廓、密实和稀疏填充路径"""
+    sfInvl = pp.nozzleSize / pp.sfRate
+    layer.cpPaths, layer.ffPaths, layer.sfPaths = [], [], []
+
+    # 轮廓路径
+    with Profiler.span('genCpPath', layer.z):
         layer.cpPaths = genCpPath(layer.contours, pp.nozzleSize, pp.shellThk)
 
-        delta = 0 if i % 2 == 0 else math.pi / 2
+    delta = 0 if i % 2 == 0 else math.pi / 2
 
+    with Profiler.span('genDpPath', layer.z):
         # 密实填充
         if len(layer.ffContours) > 0:
             layer.ffPaths = genDpPath(layer.ffContours, pp.nozzleSize, pp.fillAngle + delta)
@@ -52,6 +113,19 @@ def genAllPaths(pp: PrintParams):
         if len(layer.sfContours) > 0:
             layer.sfPaths = genDpPath(layer.sfContours, sfInvl, pp.fillAngle + delta)
 
+
+def genAllPaths(pp: PrintParams):
+    """所有路径生成函数"""
+    if pp.workers != 1:
+        from ParallelPipeline import genAllPathsParallel
+        return genAllPathsParallel(pp, pp.workers)
+
+    sptSfInvl = pp.nozzleSize / pp.sptSfRate
+
+    layers = sliceLayers(pp)
+    for i, layer in enumerate(layers):
+        genLayerPaths(layer, i, pp)
+
     if pp.sptOn:
         genSptPath(pp.stlModel, layers, sptSfInvl, pp.sptGridSize,
                    pp.sptCrAngle, pp.sptFillType, pp.sptFillAngle, pp.sptXyGap)
@@ -59,6 +133,25 @@ def genAllPaths(pp: PrintParams):
     return layers
 
 
+def iterLayerPaths(pp: PrintParams):
+    """逐层生成路径的迭代器，产生已生成路径的层，结果与 genAllPaths 相同
+    单进程时切片、端面识别、路径和支撑都逐层进行，每层路径在被消费后即释放；多进程时先整体生成"""
+    if pp.workers != 1:
+        yield from genAllPaths(pp)
+        return
+
+    layers = iterSliceLayers(pp)
+    if pp.sptOn:
+        layers = iterSptPaths(pp.stlModel, layers, pp.nozzleSize / pp.sptSfRate, pp.sptGridSize,
+                              pp.sptCrAngle, pp.sptFillType, pp.sptFillAngle, pp.sptXyGap)
+    for i, layer in enumerate(layers):
+        genLayerPaths(layer, i, pp)
+        yield layer
+        layer.cpPaths, layer.ffPaths, layer.sfPaths = [], [], []
+        if pp.sptOn:
+            layer.sptCpPaths, layer.sptDpPaths = [], []
+
+
 def pathToCode(path, pp, e, e_per_mm):
     """
     将一条路径转化为NC代码
@@ -67,69 +160,124 @@ def pathToCode(path, pp, e, e_per_mm):
     e: 当前累计挤出量
     e_per_mm: 单位长度(mm)需要的挤出量
     """
-    code = ""
-    for i, p in enumerate(path.points):
-        if i == 0:
-            # 移动到起点 (G0)
-            code += "G0 F%d X%.3f Y%.3f Z%.3f\n" % (pp.g0Speed, p.x, p.y, p.z)
-        else:
-            # 打印移动 (G1)
-            dist = p.distance(path.points[i - 1])
-
-            # 检查是否为空走 (w=1表示连接线段，不挤出)
-            # 在GenCpPath中我们用w=1标记了空走连接线
-            if path.points[i - 1].w == 1:
-                # 空走，无挤出
-                code += "G0 F%d X%.3f Y%.3f\n" % (pp.g0Speed, p.x, p.y)
-            else:
-                # 正常打印
-                e += dist * e_per_mm
-                code += "G1 F%d X%.3f Y%.3f E%.5f\n" % (pp.g1Speed, p.x, p.y, e)
-
-    return code, e
+    return pathArrayToCode(polylineToArray(path), pp, e, e_per_mm)
 
 
-def postProcess(layers, pp):
-    """后处理生成G代码"""
-    code = pp.startCode
-    e = 0.0
+def pathArrayToCode(arr, pp, e, e_per_mm):
+    """pathToCode 的批量版本，arr 为 (n,4) 的 x, y, z, 空走标记数组
+    逐段长度和累计挤出量用数组计算，所有行用一次 % 格式化生成，输出与逐点格式化完全相同"""
+    n = len(arr)
+    if n == 0:
+        return "", e
+    x, y, z = arr[:, 0], arr[:, 1], arr[:, 2]
+    # 移动到起点 (G0)
+    head = "G0 F%d X%.3f Y%.3f Z%.3f\n" % (pp.g0Speed, x[0], y[0], z[0])
+    if n == 1:
+        return head, e
 
-    # 打印线条体积 = 长度 * 线宽(喷嘴直径) * 层高
-    # 耗材体积 = 长度 * pi * (耗材直径/2)^2
-    # E_per_mm = (nozzle * layer_height) / (pi * (filament/2)^2)
+    # 前一点空走标记非0表示空走连接线段，不挤出
+    travel = arr[:-1, 3] != 0
+    dx, dy, dz = x[:-1] - x[1:], y[:-1] - y[1:], z[:-1] - z[1:]
+    dist = np.sqrt(dx * dx + dy * dy + dz * dz)
+    # 与逐点累加顺序一致：从 e 开始依次加上每段挤出量（空走为0）
+    steps = np.empty(n)
+    steps[0] = e
+    steps[1:] = np.where(travel, 0.0, dist * e_per_mm)
+    es = np.cumsum(steps)
 
-    filament_area = math.pi * (pp.filamentSize / 2) ** 2
-    line_area = pp.nozzleSize * pp.layerThk
-    e_per_mm = line_area / filament_area
+    # 空走行用 %.0s 吞掉挤出量参数，使两种行的参数个数相同
+    g0 = "G0 F%d X%%.3f Y%%.3f%%.0s\n" % pp.g0Speed
+    g1 = "G1 F%d X%%.3f Y%%.3f E%%.5f\n" % pp.g1Speed
+    fmt = "".join([g0 if t else g1 for t in travel.tolist()])
+    args = np.column_stack([x[1:], y[1:], es[1:]]).ravel().tolist()
+    return head + fmt % tuple(args), float(es[-1])
 
-    for i, layer in enumerate(layers):
-        code += "; Layer %d Z=%.3f\n" % (i, layer.z)
-
-        # 支撑
-        if hasattr(layer, 'sptCpPaths'):
-            for path in layer.sptCpPaths:
-                block, e = pathToCode(path, pp, e, e_per_mm)
-                code += block
-        if hasattr(layer, 'sptDpPaths'):
-            for path in layer.sptDpPaths:
-                block, e = pathToCode(path, pp, e, e_per_mm)
-                code += block
-
-        # 实体路径
-        for path in layer.cpPaths:
-            block, e = pathToCode(path, pp, e, e_per_mm)
-            code += block
-        for path in layer.ffPaths:
-            block, e = pathToCode(path, pp, e, e_per_mm)
-            code += block
-        for path in layer.sfPaths:
-            block, e = pathToCode(path, pp, e, e_per_mm)
-            code += block
-
-    code += pp.endCode
-    return code
+
+class GCodeWriter:
+    """流式G代码输出：逐层把代码块写入 sink（任意可写文本的文件对象），不在内存中拼接整个程序"""
+
+    def __init__(self, sink, pp: PrintParams, flushEachLayer=False):
+        self.sink = sink
+        self.pp = pp
+        self.flushEachLayer = flushEachLayer  # 每层写完后 flush，便于边生成边发送给打印机
+        self.e = 0.0
+        self.layerIndex = 0
+
+        # 打印线条体积 = 长度 * 线宽(喷嘴直径) * 层高
+        # 耗材体积 = 长度 * pi * (耗材直径/2)^2
+        # E_per_mm = (nozzle * layer_height) / (pi * (filament/2)^2)
+        self.filament_area = math.pi * (pp.filamentSize / 2) ** 2
+        self.e_per_mm = self.ePerMm(pp.layerThk)
+
+    def ePerMm(self, layerThk):
+        line_area = self.pp.nozzleSize * layerThk
+        return line_area / self.filament_area
+
+    def begin(self):
+        self.sink.write(self.pp.startCode)
+
+    def writePaths(self, paths):
+        for path in paths:
+            block, self.e = pathToCode(path, self.pp, self.e, self.e_per_mm)
+            self.sink.write(block)
+
+    def writeLayer(self, layer):
+        with Profiler.span('postProcess', layer.z):
+            self.sink.write("; Layer %d Z=%.3f\n" % (self.layerIndex, layer.z))
+            self.layerIndex += 1
+            # 自适应分层时按本层层厚计算挤出量
+            thk = getattr(layer, 'thk', None)
+            self.e_per_mm = self.ePerMm(thk if thk is not None else self.pp.layerThk)
+
+            # 支撑
+            if hasattr(layer, 'sptCpPaths'):
+                self.writePaths(layer.sptCpPaths)
+            if hasattr(layer, 'sptDpPaths'):
+                self.writePaths(layer.sptDpPaths)
+
+            # 实体路径
+            self.writePaths(layer.cpPaths)
+            self.writePaths(layer.ffPaths)
+            self.writePaths(layer.sfPaths)
+
+            if self.flushEachLayer:
+                self.sink.flush()
+
+    def end(self):
+        self.sink.write(self.pp.endCode)
+        self.sink.flush()
+
+    def writeLayers(self, layers):
+        """写出完整程序，layers 可以是列表或逐层产生的迭代器"""
+        self.begin()
+        for layer in layers:
+            self.writeLayer(layer)
+        self.end()
+
+
+def openGCodeSink(path, compress=None):
+    """打开G代码输出文件，compress 为 None 时按扩展名 .gz 判断是否 gzip 压缩"""
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='\n')
+    return open(path, 'w', encoding='utf-8', newline='\n', buffering=1 << 20)
+
+
+def postProcess(layers, pp):
+    """后处理生成G代码"""
+    sink = io.StringIO()
+    GCodeWriter(sink, pp).writeLayers(layers)
+    return sink.getvalue()
 
 
 def genNcCode(pp: PrintParams):
     layers = genAllPaths(pp)
-    return postProcess(layers, pp)
\ No newline at end of file
+    return postProcess(layers, pp)
+
+
+def writeNcCode(pp: PrintParams, path, compress=None, flushEachLayer=False):
+    """边生成路径边写出G代码文件，内存占用与单层路径规模相当"""
+    with openGCodeSink(path, compress) as sink:
+        GCodeWriter(sink, pp, flushEachLayer).writeLayers(iterLayerPaths(pp))
+    return path
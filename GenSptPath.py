@@ -1,8 +1,9 @@
 import math
 from enum import Enum
 from GeomBase import Point3D
-from FindSptRegion import findSptRegion
+from FindSptRegion import FindSptRegion, findSptRegion
 from GenDpPath import genDpPathEx
+import Profiler
 
 
 class SptFillType(Enum):
@@ -10,12 +11,8 @@ class SptFillType(Enum):
     cross = 2
 
 
-def genSptPath(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngle=0, xyGap=1):
-    # 1. 生成支撑区域
-    print("正在计算支撑区域...")
-    findSptRegion(stlModel, layers, gridSize, crAngle, xyGap)
-
-    # 2. 计算全局 ys 和 center
+def sptScanLines(stlModel, pathInvl):
+    """全局统一的扫描线 ys 和旋转中心 center，保证上下层路径对齐"""
     xMin, xMax, yMin, yMax, zMin, zMax = stlModel.getBounds()
     center = Point3D((xMin + xMax) / 2, (yMin + yMax) / 2, 0)  # 旋转中心 Z 可以是 0
     corner = Point3D(xMax, yMax, 0)
@@ -28,25 +25,59 @@ def genSptPath(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngl
     while y <= end_y:
         ys.append(y)
         y += pathInvl
+    return ys, center
+
+
+def genLayerSptPath(layer, i, pathInvl, ys, center, fillType, fillAngle=0):
+    """生成第 i 层的支撑路径"""
+    # 确保清空旧数据
+    layer.sptDpPaths = []
+    layer.sptCpPaths = []
+
+    if not hasattr(layer, 'sptContours') or not layer.sptContours:
+        return
+
+    angle = fillAngle
+    if fillType == SptFillType.cross and i % 2 == 1:
+        angle = fillAngle + math.pi / 2
+
+    # 生成路径
+    # 这里传入的 ys 是全局统一的，保证了上下层路径对齐
+    layer.sptDpPaths = genDpPathEx(layer.sptContours, pathInvl, angle, ys, center)
+    layer.sptCpPaths = layer.sptContours
+
+
+def genSptPath(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngle=0, xyGap=1):
+    with Profiler.span('supports'):
+        genAllSptPaths(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngle, xyGap)
+
+
+def genAllSptPaths(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngle=0, xyGap=1):
+    # 1. 生成支撑区域
+    print("正在计算支撑区域...")
+    findSptRegion(stlModel, layers, gridSize, crAngle, xyGap)
+
+    # 2. 计算全局 ys 和 center
+    ys, center = sptScanLines(stlModel, pathInvl)
 
     print(f"正在生成支撑路径 (Total layers: {len(layers)})...")
     # 3. 遍历每层
     for i, layer in enumerate(layers):
-        # 确保清空旧数据
-        layer.sptDpPaths = []
-        layer.sptCpPaths = []
+        genLayerSptPath(layer, i, pathInvl, ys, center, fillType, fillAngle)
 
-        if not hasattr(layer, 'sptContours') or not layer.sptContours:
-            continue
 
-        angle = fillAngle
-        if fillType == SptFillType.cross and i % 2 == 1:
-            angle = fillAngle + math.pi / 2
-
-        # 生成路径
-        # 这里传入的 ys 是全局统一的，保证了上下层路径对齐
-        layer.sptDpPaths = genDpPathEx(layer.sptContours, pathInvl, angle, ys, center)
-        layer.sptCpPaths = layer.sptContours
+def iterSptPaths(stlModel, layers, pathInvl, gridSize, crAngle, fillType, fillAngle=0, xyGap=1):
+    """逐层生成支撑区域和支撑路径的生成器，结果与 genSptPath 相同
+    模型支撑点只计算一次，各层只依赖本层轮廓，layers 可以是逐层产生的迭代器"""
+    finder = FindSptRegion(stlModel, None, gridSize, crAngle, xyGap)
+    with Profiler.span('supports'):
+        gridDic = finder.calcModelSptPoints()
+        ys, center = sptScanLines(stlModel, pathInvl)
+    for i, layer in enumerate(layers):
+        with Profiler.span('supports', layer.z):
+            finder.findLayerSptRegions(gridDic, layer)
+            genLayerSptPath(layer, i, pathInvl, ys, center, fillType, fillAngle)
+        yield layer
 
 
 if __name__ == '__main__':
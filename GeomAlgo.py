@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from GeomBase import *
 from Polyline import *
 from Line import *
@@ -7,6 +8,8 @@ from Segment import *
 from Plane import *
 from Polyline import *
 from Triangle import *
+from FacetLayerIndex import FacetLayerIndex
+from Utility import expandRanges
 
 def nearZero(x):
     return math.fabs(x) < epsilon
@@ -27,15 +30,7 @@ def distance(obj1, obj2):
         return Q.distance(P)
 
     elif isinstance(obj1, Point3D) and isinstance(obj2, Segment):  # Point Segment
-        Q, P, P1, V = obj1, obj2.A, obj2.B, obj2.direction().normalized()
-        L = obj2.length()
-        t = P.pointTo(Q).dotProduct(V)
-        if t <= 0:
-            return Q.distance(P)
-        elif t <= L:
-            R = P + V.amplified(t)
-            return Q.distance(R)
-        return Q.distance(P1)
+        return math.sqrt(pointSegmentDistanceSquare(obj1, obj2.A, obj2.B))
 
     elif isinstance(obj1, Point3D) and isinstance(obj2, Plane):  # Point Plane
         P = obj2.P
@@ -96,6 +91,21 @@ def distance(obj1, obj2):
     return None
 
 
+def pointSegmentDistanceSquare(Q, A, B):
+    """点Q到线段AB距离的平方，纯标量计算，不创建中间对象"""
+    abx, aby, abz = B.x - A.x, B.y - A.y, B.z - A.z
+    aqx, aqy, aqz = Q.x - A.x, Q.y - A.y, Q.z - A.z
+    t = aqx * abx + aqy * aby + aqz * abz
+    L2 = abx * abx + aby * aby + abz * abz
+    if t <= 0 or L2 == 0:
+        return aqx * aqx + aqy * aqy + aqz * aqz
+    if t >= L2:
+        return Q.distanceSquare(B)
+    t /= L2
+    rx, ry, rz = aqx - abx * t, aqy - aby * t, aqz - abz * t
+    return rx * rx + ry * ry + rz * rz
+
+
 def intersectLine(line1, line2):
     """
     计算两条直线的交点
@@ -144,27 +154,23 @@ def intersectSegmentPlane(seg, plane):
 
     A = seg.A
     B = seg.B
-    AB = B - A
+    N, P = plane.N, plane.P
+    dx, dy, dz = B.x - A.x, B.y - A.y, B.z - A.z
+    # A 到平面的有向距离（N 的点积）
+    f = N.dx * (A.x - P.x) + N.dy * (A.y - P.y) + N.dz * (A.z - P.z)
 
-    if AB.lengthSquare() < epsilonSquare:
-        if pointOnPlane(A, plane):
-            return A
-        else:
-            return None
+    if dx * dx + dy * dy + dz * dz < epsilonSquare:
+        return A if abs(f) < epsilon else None
 
-    dot = AB.dotProduct(plane.N)
+    dot = dx * N.dx + dy * N.dy + dz * N.dz
 
     if abs(dot) < epsilon:
-        if pointOnPlane(A, plane):
-            return A
-        else:
-            return None
+        return A if abs(f) < epsilon else None
 
-    t = -plane.N.dotProduct(A - plane.P) / dot
+    t = -f / dot
 
     if 0 <= t <= 1:
-        intersection = A + AB.amplified(t)
-        return intersection
+        return Point3D(A.x + dx * t, A.y + dy * t, A.z + dz * t)
     else:
         return None
 
@@ -270,6 +276,123 @@ def pointOnRay(p, ray):
 
     return False
 
+def _classifyEdges(px, py, x0, y0, dx, dy, lenSq, tol):
+    """点与边的关系（按广播逐元素计算），返回 (是否在边上, 是否与 +x 方向射线相交)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(((px - x0) * dx + (py - y0) * dy) / lenSq, 0.0, 1.0)
+        t = np.where(lenSq > 0.0, t, 0.0)
+        ex, ey = x0 + t * dx - px, y0 + t * dy - py
+        onEdge = ex * ex + ey * ey < tol * tol
+        # 半开区间规则：每条边只计入 y 方向跨过 py 的一侧，射线经过顶点时不会重复计数
+        cross = ((y0 > py) != (y0 + dy > py)) & (x0 + (py - y0) * dx / dy > px)
+    return onEdge, cross
+
+
+class PolygonEdgeTable:
+    """多边形边表：所有多边形的边按多边形顺序合并为数组，首尾自动闭合
+    第 k 个多边形的边为 [offsets[k], offsets[k+1])，建好后可在多次点查询间复用"""
+
+    def __init__(self, polygons):
+        counts = np.array([polygon.count() for polygon in polygons], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        xy = np.concatenate([polylineToArray(polygon)[:, :2] for polygon in polygons]) if polygons else np.empty((0, 2))
+        # 每条边的终点为同一多边形中的下一个点
+        valid = np.flatnonzero(counts > 0)
+        nxt = np.arange(1, len(xy) + 1)
+        nxt[self.offsets[valid + 1] - 1] = self.offsets[valid]
+        self.x0, self.y0 = xy[:, 0], xy[:, 1]
+        self.x1, self.y1 = xy[nxt, 0], xy[nxt, 1]
+        self.dx, self.dy = self.x1 - self.x0, self.y1 - self.y0
+        self.lenSq = self.dx * self.dx + self.dy * self.dy
+        self.bounds = np.tile([np.inf, np.inf, -np.inf, -np.inf], (len(polygons), 1))
+        if len(valid):
+            starts = self.offsets[valid]
+            self.bounds[valid] = np.column_stack([np.minimum.reduceat(self.x0, starts), np.minimum.reduceat(self.y0, starts),
+                                                  np.maximum.reduceat(self.x0, starts), np.maximum.reduceat(self.y0, starts)])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def signedAreas(self):
+        """各多边形的有向面积，逆时针为正"""
+        areas = np.zeros(len(self))
+        valid = np.flatnonzero(np.diff(self.offsets) > 0)
+        if len(valid):
+            cross = self.x0 * self.y1 - self.x1 * self.y0
+            areas[valid] = np.add.reduceat(cross, self.offsets[valid]) / 2.0
+        return areas
+
+    def _classify(self, px, py, e0, e1, tol):
+        """点 (px, py) 与边区间 [e0, e1) 的关系，px/py 为 (P,1) 时一次计算多个点"""
+        return _classifyEdges(px, py, self.x0[e0:e1], self.y0[e0:e1], self.dx[e0:e1], self.dy[e0:e1],
+                              self.lenSq[e0:e1], tol)
+
+    def testPoint(self, k, px, py, tol=epsilon):
+        """点与第 k 个多边形的位置关系：-1 在边界上，1 在内部，0 在外部"""
+        onEdge, cross = self._classify(px, py, self.offsets[k], self.offsets[k + 1], tol)
+        if onEdge.any():
+            return -1
+        return int(np.count_nonzero(cross) % 2)
+
+    def testPoints(self, points, tol=epsilon, chunk=1 << 22):
+        """多个点与所有多边形的位置关系，points 为 (n,2) 数组或 Point3D 列表
+        返回 (n, 多边形数) 的 int8 数组，取值同 testPoint"""
+        if isinstance(points, np.ndarray):
+            pts = np.asarray(points, dtype=np.float64).reshape(len(points), -1)[:, :2]
+        else:
+            pts = np.array([(p.x, p.y) for p in points], dtype=np.float64).reshape(-1, 2)
+        result = np.zeros((len(pts), len(self)), dtype=np.int8)
+        counts = np.diff(self.offsets)
+        valid = np.flatnonzero(counts > 0)
+        if len(pts) == 0 or len(valid) == 0:
+            return result
+        starts = self.offsets[valid]
+        # 按块处理，限制 (点数 x 边数) 临时数组的大小
+        step = max(1, chunk // len(self.x0))
+        for i in range(0, len(pts), step):
+            p = pts[i:i + step]
+            onEdge, cross = self._classify(p[:, :1], p[:, 1:], 0, len(self.x0), tol)
+            inside = np.add.reduceat(cross, starts, axis=1, dtype=np.int64) % 2
+            boundary = np.logical_or.reduceat(onEdge, starts, axis=1)
+            result[i:i + step, valid] = np.where(boundary, -1, inside)
+        return result
+
+
+    def testPairs(self, xs, ys, polyIds, tol=epsilon, chunk=1 << 22):
+        """逐对判断：第 k 个点 (xs[k], ys[k]) 与第 polyIds[k] 个多边形的位置关系
+        各对的边展开为一维数组后一次计算，适合候选对已经筛选过的情形"""
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        polyIds = np.asarray(polyIds, dtype=np.int64)
+        result = np.zeros(len(polyIds), dtype=np.int8)
+        counts = self.offsets[polyIds + 1] - self.offsets[polyIds]
+        ends = np.cumsum(counts)
+        k0 = 0
+        while k0 < len(polyIds):
+            # 每块展开的边数不超过 chunk（单个多边形超过时单独成块）
+            k1 = max(k0 + 1, int(np.searchsorted(ends, ends[k0] - counts[k0] + chunk, 'right')))
+            c = counts[k0:k1]
+            valid = c > 0
+            if valid.any():
+                pair, edge = expandRanges(self.offsets[polyIds[k0:k1]], c)
+                pair += k0
+                onEdge, cross = _classifyEdges(xs[pair], ys[pair], self.x0[edge], self.y0[edge], self.dx[edge],
+                                               self.dy[edge], self.lenSq[edge], tol)
+                starts = (np.cumsum(c) - c)[valid]
+                inside = np.add.reduceat(cross, starts, dtype=np.int64) % 2
+                boundary = np.logical_or.reduceat(onEdge, starts)
+                result[np.arange(k0, k1)[valid]] = np.where(boundary, -1, inside)
+            k0 = k1
+        return result
+
+
+
+def pointsInPolygons(points, polygons, tol=epsilon):
+    """多个点与多个多边形的位置关系，polygons 为多边形列表或已建好的 PolygonEdgeTable
+    返回 (点数, 多边形数) 的 int8 数组：-1 在边界上，1 在内部，0 在外部"""
+    table = polygons if isinstance(polygons, PolygonEdgeTable) else PolygonEdgeTable(polygons)
+    return table.testPoints(points, tol)
+
+
 def pointInPolygon(p, polygon):
     """
     判断点与多边形的位置关系
@@ -278,40 +401,7 @@ def pointInPolygon(p, polygon):
         1  : 在多边形内部
         0  : 在多边形外部
     """
-    n = polygon.count()
-    for i in range(n):
-        A = polygon.point(i)
-        B = polygon.point((i + 1) % n)
-
-        seg = Segment(A, B)
-        if p.distance(seg) < epsilon:
-            return -1
-
-
-    count = 0
-    for i in range(n):
-        A = polygon.point(i)
-        B = polygon.point((i + 1) % n)
-
-        if (A.y > p.y and B.y > p.y) or (A.y < p.y and B.y < p.y):
-            continue
-
-        if nearZero(A.y - p.y) and nearZero(B.y - p.y):
-            if (A.x <= p.x <= B.x) or (B.x <= p.x <= A.x):
-                return -1
-            continue
-
-        if not nearZero(B.y - A.y):
-            x_intersect = A.x + (p.y - A.y) * (B.x - A.x) / (B.y - A.y)
-
-            if x_intersect > p.x:
-                if not (nearZero(A.y - p.y) and A.x > p.x) and not (nearZero(B.y - p.y) and B.x > p.x):
-                    count += 1
-
-    if count % 2 == 1:
-        return 1
-    else:
-        return 0
+    return PolygonEdgeTable([polygon]).testPoint(0, p.x, p.y)
 
 
 def intersectTrianglePlane(triangle, plane):
@@ -328,15 +418,15 @@ def intersectTrianglePlane(triangle, plane):
     # 分类讨论，枚举各种情况
     if c1 is None:
         if c2 is not None and c3 is not None:  # 存在2个交点的情况
-            if c2.distance(c3) != 0.0:
+            if c2.distanceSquare(c3) != 0.0:
                 return Segment(c2, c3)
     elif c2 is None:
         if c1 is not None and c3 is not None:  # 存在2个交点的情况
-            if c1.distance(c3) != 0.0:
+            if c1.distanceSquare(c3) != 0.0:
                 return Segment(c1, c3)
     elif c3 is None:
         if c1 is not None and c2 is not None:  # 存在2个交点的情况
-            if c1.distance(c2) != 0.0:
+            if c1.distanceSquare(c2) != 0.0:
                 return Segment(c1, c2)
     elif c1 is not None and c2 is not None and c3 is not None:  # 存在3个交点的情况
         return Segment(c1, c3) if c1.isIdentical(c2) else Segment(c1, c2)
@@ -352,24 +442,86 @@ def intersectTriangleZPlane(triangle, z):
     plane = Plane.zPlane(z)
     return intersectTrianglePlane(triangle, plane)
 
+def _intersectEdgesZ(P, Q, z):
+    """批量计算边 PQ 与Z平面的交点，逻辑与 intersectSegmentPlane 相同
+    返回 (是否有交点, 交点坐标)"""
+    dz = Q[:, 2] - P[:, 2]
+    onPlane = np.abs(P[:, 2] - z) < epsilon
+    # 零长度边或平行于平面的边：起点在平面上时返回起点
+    flat = (np.abs(dz) < epsilon) | (((Q - P) ** 2).sum(axis=1) < epsilonSquare)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = -(P[:, 2] - z) / dz
+        pts = np.where(flat[:, None], P, P + (Q - P) * t[:, None])
+    has = np.where(flat, onPlane, (t >= 0) & (t <= 1))
+    return has, pts
+
+
+def _notCoincide(P, Q):
+    d = Q - P
+    return d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] + d[:, 2] * d[:, 2] != 0.0
+
+
+def intersectTrianglesZ(vertices, zs):
+    """批量三角面片与Z平面求交（intersectTriangleZPlane 的向量化版本）
+    vertices: (n,3,3) 面片顶点；zs: 标量或 (n,) 每个面片对应的截平面高度
+    返回 (segs, idx)：(m,2,3) 截交线段端点及 (m,) 所属面片序号"""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3, 3)
+    zs = np.broadcast_to(np.asarray(zs, dtype=np.float64), (len(vertices),))
+    A, B, C = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+    vz = vertices[:, :, 2]
+    inRange = (vz.min(axis=1) <= zs) & (vz.max(axis=1) >= zs)
+
+    h1, c1 = _intersectEdgesZ(A, B, zs)  # AB
+    h2, c2 = _intersectEdgesZ(A, C, zs)  # AC
+    h3, c3 = _intersectEdgesZ(B, C, zs)  # BC
+
+    # 分类讨论，与 intersectTrianglePlane 的枚举顺序一致
+    only23 = ~h1 & h2 & h3 & _notCoincide(c2, c3)
+    only13 = h1 & ~h2 & h3 & _notCoincide(c1, c3)
+    only12 = h1 & h2 & ~h3 & _notCoincide(c1, c2)
+    all3 = h1 & h2 & h3
+    same12 = all3 & (c1 == c2).all(axis=1)
+
+    P = np.where((only23)[:, None], c2, c1)
+    Q = np.where((only23 | only13 | same12)[:, None], c3, c2)
+    found = inRange & (only23 | only13 | only12 | all3)
+
+    idx = np.flatnonzero(found)
+    segs = np.stack([P[idx], Q[idx]], axis=1)
+    return segs, idx
+
+
+def intersectTrianglesZPlanes(vertices, zs):
+    """多个Z平面一次性批量求交，zs 需升序
+    返回每层的 (segs, idx) 列表"""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3, 3)
+    zs = np.asarray(zs, dtype=np.float64)
+    vz = vertices[:, :, 2]
+
+    # 面片-层关联索引：(面片, 层) 对按层、面片序号排列
+    index = FacetLayerIndex(vz.min(axis=1), vz.max(axis=1), zs)
+    facet, layer = index.facets, index.pairLayers()
+
+    segs, k = intersectTrianglesZ(vertices[facet], zs[layer])
+    bounds = np.searchsorted(layer[k], np.arange(len(zs) + 1), 'left')
+    return [(segs[bounds[i]:bounds[i + 1]], facet[k[bounds[i]:bounds[i + 1]]]) for i in range(len(zs))]
+
+
+def segmentsFromArray(segs):
+    """将 (m,2,3) 线段数组转化为 Segment 对象列表"""
+    return [Segment(Point3D(a[0], a[1], a[2]), Point3D(b[0], b[1], b[2])) for a, b in segs.tolist()]
+
+
 def adjustPolygonDirs(polygons):
-    """调整多边形的方向（统一外边界为逆时针，内边界为顺时针）"""
-    for i in range(len(polygons)):
-        pt = polygons[i].startPoint()  # 取出待检测轮廓上的起点
-        insideCount = 0  # 点在几个多边形内部计数
-
-        for j in range(len(polygons)):
-            if j == i:  # 如果两个多边形一样则跳过
-                continue
-            restPoly = polygons[j]
-            if pointInPolygon(pt, restPoly) == 1:  # 点在另一多边形内部，则加1
-                insideCount += 1
-
-        # 判断点在内部次数是否为偶数
-        if insideCount % 2 == 0:
-            polygons[i].makeCCW()  # 调整多边形方向为逆时针
-        else:
-            polygons[i].makeCW()  # 调整多边形方向为顺时针
+    """调整多边形的方向（统一外边界为逆时针，内边界为顺时针）
+    由嵌套森林得到每条轮廓被几层轮廓包含，偶数层为外边界，奇数层为内边界"""
+    from PolyPerSeeker import NestingForest  # 延迟导入，避免循环依赖
+    forest = NestingForest(polygons)
+    # 当前方向由边表中的有向面积得到，与 isCCW 一致：少于3个点视为逆时针
+    ccw = (forest.signedAreas > 0.0) | (np.diff(forest.table.offsets) < 3)
+    for polygon, depth, isCCW in zip(polygons, forest.depth, ccw.tolist()):
+        if isCCW != (depth % 2 == 0):
+            polygon.reverse()
 
 
 def rotatePolygons(polygons, angle, center=None):
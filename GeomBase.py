@@ -5,18 +5,32 @@ epsilonSquare = epsilon * epsilon
 pi=3.1415927
 
 class Point3D:
+    __slots__ = ('x', 'y', 'z', 'w', 'travel')
+
     def __init__(self,x=0.0,y=0.0,z=0.0,w=1.0):
-        self.x,self.y,self.z,self.w=x,y,z,w
+        self.x,self.y,self.z,self.w=x,y,z,w  # w 为齐次坐标
+        self.travel=0  # 空走标记：非0表示从该点到路径下一点为空走，不挤出
 
     def __str__(self):
         return f'Point3D:({self.x},{self.y},{self.z})'
 
     def clone(self):
-        return Point3D(self.x,self.y,self.z,self.w)
+        pt=Point3D(self.x,self.y,self.z,self.w)
+        pt.travel=self.travel
+        return pt
 
     def pointTo(self,other):
         return Vector3D(other.x-self.x,other.y-self.y,other.z-self.z)
 
+    def pointToInto(self,other,out):
+        """结果写入已有向量 out，不分配新对象"""
+        out.dx,out.dy,out.dz=other.x-self.x,other.y-self.y,other.z-self.z
+        return out
+
+    def set(self,x,y,z):
+        self.x,self.y,self.z=x,y,z
+        return self
+
     def translate(self,vec):
         self.x += vec.dx
         self.y += vec.dy
@@ -29,7 +43,12 @@ class Point3D:
         return math.sqrt(self.distanceSquare(other))
 
     def distanceSquare(self,other):
-        return self.pointTo(other).lengthSquare()
+        dx,dy,dz=other.x-self.x,other.y-self.y,other.z-self.z
+        return dx*dx+dy*dy+dz*dz
+
+    def distanceSquare2D(self,other):
+        dx,dy=other.x-self.x,other.y-self.y
+        return dx*dx+dy*dy
 
     def middle(self,other):
         return Point3D((self.x+other.x)/2.0,(self.y+other.y)/2.0,(self.z+other.z)/2.0)
@@ -63,6 +82,8 @@ class Point3D:
     pass
 
 class Vector3D:
+    __slots__ = ('dx', 'dy', 'dz', 'dw')
+
     def __init__(self,dx=0.0,dy=0.0,dz=0.0,dw=0.0):
         self.dx,self.dy,self.dz,self.dw=dx,dy,dz,dw
 
@@ -86,6 +107,22 @@ class Vector3D:
     def crossProduct(self, other):
         return Vector3D(self.dy*other.dz-other.dy*self.dz,-(self.dx*other.dz-other.dx*self.dz),self.dx*other.dy-other.dx*self.dy)
 
+    def crossProductInto(self, other, out):
+        """叉积写入已有向量 out（out 可以是 self 或 other）"""
+        dx = self.dy*other.dz-other.dy*self.dz
+        dy = -(self.dx*other.dz-other.dx*self.dz)
+        dz = self.dx*other.dy-other.dx*self.dy
+        out.dx, out.dy, out.dz = dx, dy, dz
+        return out
+
+    def crossProductZ(self, other):
+        """叉积的Z分量，XY平面内判断转向用"""
+        return self.dx*other.dy-other.dx*self.dy
+
+    def set(self, dx, dy, dz):
+        self.dx, self.dy, self.dz = dx, dy, dz
+        return self
+
     def amplify(self, f):
         self.dx *= f
         self.dy *= f
@@ -101,16 +138,18 @@ class Vector3D:
         return self.dx*self.dx + self.dy*self.dy + self.dz*self.dz
 
     def normalize(self):
-        if self.length()!=0 :
-            self.dx /= math.sqrt(self.length())
-            self.dy /= math.sqrt(self.length())
-            self.dz /= math.sqrt(self.length())
+        length = self.length()
+        if length!=0 :
+            self.dx /= length
+            self.dy /= length
+            self.dz /= length
         else:
             print("error: cannot normalize zero vector")
 
     def normalized(self):
-        if self.length()!=0 :
-            return Vector3D(self.dx/math.sqrt(self.length()),self.dy/math.sqrt(self.length()),self.dz/math.sqrt(self.length()))
+        length = self.length()
+        if length!=0 :
+            return Vector3D(self.dx/length,self.dy/length,self.dz/length)
         else:
             print("error: cannot normalize zero vector")
             return Vector3D()
@@ -159,6 +198,8 @@ class Vector3D:
             return None
 
 class Matrix3D:
+    __slots__ = ('a',)
+
     def __init__(self):
         self.a =[[1.0,0.0,0.0,0.0],
                  [0.0,1.0,0.0,0.0],
@@ -1,5 +1,7 @@
 import math
 import pyclipper
+from collections import deque
+import Profiler
 from Layer import Layer
 from ClipperAdaptor import ClipperAdaptor
 from GeomBase import *
@@ -18,94 +20,123 @@ class HollowingAlgo:
 
     def generate_hollow_layers(self, layers):
         print(f"正在进行3D均匀抽壳 (壁厚: {self.w}mm)...")
-
-        hollowed_layers = []
         total = len(layers)
+        hollowed_layers = list(self.iter_hollow_layers(layers, total))
+        print(f"  处理完成: {total}/{total}        ")
+        return hollowed_layers
 
-        for i in range(total):
-            if i % 10 == 0:
-                print(f"  处理进度: {i}/{total}", end="\r")
-
-            current_layer = layers[i]
-            z_i = current_layer.z
-
-            # 如果这一层因为破面导致外轮廓完全丢失，直接跳过
-            if not current_layer.contours:
-                hollowed_layers.append(Layer(z_i))
-                continue
-
-            # === 边界蒙皮检查 (Top/Bottom Skin) ===
-            # 如果距离顶底小于壁厚，强制实心
-            dist_to_top = self.z_max - z_i
-            dist_to_bottom = z_i - self.z_min
-
-            if dist_to_top < self.w - 0.01 or dist_to_bottom < self.w - 0.01:
-                # 强制实心
-                new_layer = Layer(z_i)
-                for p in current_layer.contours:
-                    new_layer.contours.append(p.clone())
-                hollowed_layers.append(new_layer)
-                continue
-
-            # === Park 算法逻辑 ===
-            # 1. 确定搜索范围
-            start_idx = i
-            while start_idx > 0 and (z_i - layers[start_idx - 1].z) < self.w:
-                start_idx -= 1
-
-            end_idx = i
-            while end_idx < total - 1 and (layers[end_idx + 1].z - z_i) < self.w:
-                end_idx += 1
-
-            void_candidates = []
-            is_solid = False
-
-            # 2. 遍历邻居层
-            for j in range(start_idx, end_idx + 1):
-                neighbor_layer = layers[j]
-                if not neighbor_layer.contours: continue
-
-                dz = abs(z_i - neighbor_layer.z)
-
-                if dz >= self.w - 1e-5:
-                    offset_dist = 0
-                else:
-                    offset_dist = math.sqrt(self.w ** 2 - dz ** 2)
-
-                # 向内偏置
-                offset_polys = self.ca.offset(neighbor_layer.contours, -offset_dist, pyclipper.JT_ROUND)
-
-                if not offset_polys:
-                    # 只要有一个邻居限制为空，说明此处无法容纳空腔，强制实心
-                    is_solid = True
-                    break
-
-                void_candidates.append(offset_polys)
-
-            # 3. 求交集
-            final_void = []
-            if not is_solid and void_candidates:
-                final_void = void_candidates[0]
-                for k in range(1, len(void_candidates)):
-                    final_void = self.ca.clip(final_void, void_candidates[k], pyclipper.CT_INTERSECTION)
-                    if not final_void: break
-
-            # 4. 生成结果
+    def iter_hollow_layers(self, layers, total=None):
+        """逐层产生抽壳结果（生成器），layers 可以是自下而上逐层产生的迭代器
+        只保留与待处理层高度差小于壁厚的邻居层，内存与壁厚范围内的层数相当"""
+        # 窗口元素为 [层, 整数路径]，各层轮廓只转化一次整数路径，邻居层之间的偏置/求交都在路径上进行
+        window = deque()
+        pending = 0  # 窗口中下一个待处理层的位置
+        done = 0
+
+        def process():
+            nonlocal pending, done
+            if done % 10 == 0:
+                print(f"  处理进度: {done}/{total if total is not None else '?'}", end="\r")
+            with Profiler.span('hollow', window[pending][0].z):
+                layer = self.hollow_layer(window, pending)
+            pending += 1
+            done += 1
+            # 丢弃之后各层都用不到的层
+            while pending < len(window) and window[pending][0].z - window[0][0].z >= self.w:
+                window.popleft()
+                pending -= 1
+            return layer
+
+        for layer in layers:
+            window.append([layer, None])
+            # 新层与待处理层的高度差达到壁厚时，待处理层的邻居已全部到齐
+            while pending < len(window) - 1 and layer.z - window[pending][0].z >= self.w:
+                yield process()
+        while pending < len(window):
+            yield process()
+
+    def layer_paths(self, entry):
+        if entry[1] is None:
+            entry[1] = self.ca.toPaths(entry[0].contours)
+        return entry[1]
+
+    def hollow_layer(self, window, i):
+        """对窗口中第 i 层抽壳，窗口包含其壁厚范围内的全部邻居层"""
+        current_layer = window[i][0]
+        z_i = current_layer.z
+
+        # 如果这一层因为破面导致外轮廓完全丢失，直接跳过
+        if not current_layer.contours:
+            return Layer(z_i)
+
+        # === 边界蒙皮检查 (Top/Bottom Skin) ===
+        # 如果距离顶底小于壁厚，强制实心
+        dist_to_top = self.z_max - z_i
+        dist_to_bottom = z_i - self.z_min
+
+        if dist_to_top < self.w - 0.01 or dist_to_bottom < self.w - 0.01:
+            # 强制实心
             new_layer = Layer(z_i)
+            for p in current_layer.contours:
+                new_layer.contours.append(p.clone())
+            return new_layer
 
-            if not final_void:
-                # 实心层：复制外轮廓
-                for p in current_layer.contours:
-                    new_layer.contours.append(p.clone())
-            else:
-                # 空心层：外轮廓 - 内腔
-                hollow_polys = self.ca.clip(current_layer.contours, final_void, pyclipper.CT_DIFFERENCE)
-                new_layer.contours = hollow_polys
+        # === Park 算法逻辑 ===
+        # 1. 确定搜索范围
+        start_idx = i
+        while start_idx > 0 and (z_i - window[start_idx - 1][0].z) < self.w:
+            start_idx -= 1
 
-            hollowed_layers.append(new_layer)
+        end_idx = i
+        while end_idx < len(window) - 1 and (window[end_idx + 1][0].z - z_i) < self.w:
+            end_idx += 1
 
-        print(f"  处理完成: {total}/{total}        ")
-        return hollowed_layers
+        void_candidates = []
+        is_solid = False
+
+        # 2. 遍历邻居层
+        for j in range(start_idx, end_idx + 1):
+            neighbor_layer = window[j][0]
+            if not neighbor_layer.contours: continue
+
+            dz = abs(z_i - neighbor_layer.z)
+
+            if dz >= self.w - 1e-5:
+                offset_dist = 0
+            else:
+                offset_dist = math.sqrt(self.w ** 2 - dz ** 2)
+
+            # 向内偏置
+            offset_polys = self.ca.offsetPaths(self.layer_paths(window[j]), -offset_dist, pyclipper.JT_ROUND)
+
+            if not offset_polys:
+                # 只要有一个邻居限制为空，说明此处无法容纳空腔，强制实心
+                is_solid = True
+                break
+
+            void_candidates.append(offset_polys)
+
+        # 3. 求交集
+        final_void = []
+        if not is_solid and void_candidates:
+            final_void = void_candidates[0]
+            for k in range(1, len(void_candidates)):
+                final_void = self.ca.clipPaths(final_void, void_candidates[k], pyclipper.CT_INTERSECTION)
+                if not final_void: break
+
+        # 4. 生成结果
+        new_layer = Layer(z_i)
+
+        if not final_void:
+            # 实心层：复制外轮廓
+            for p in current_layer.contours:
+                new_layer.contours.append(p.clone())
+        else:
+            # 空心层：外轮廓 - 内腔
+            hollow_paths = self.ca.clipPaths(self.layer_paths(window[i]), final_void, pyclipper.CT_DIFFERENCE)
+            new_layer.contours = self.ca.toPolys(hollow_paths)
+
+        return new_layer
 
 
 # ==============================================================================
@@ -3,6 +3,7 @@ import math
 from Layer import Layer
 from ClipperAdaptor import ClipperAdaptor
 from GeomBase import *
+import Profiler
 
 
 def clean_contours(ca, contours, precision=0.05):
@@ -18,87 +19,126 @@ def clean_contours(ca, contours, precision=0.05):
     return cleaned
 
 
-def pickFfRegions(layer1, layer2, shellThk):
-    c1, c2 = layer1.contours, layer2.contours
-    ca = ClipperAdaptor()
+def layerPaths(ca, layer, cache, key='contours', delta=0.0, jt=pyclipper.JT_SQUARE):
+    """层轮廓（或其偏置结果）的整数路径，cache 为该层自己的缓存字典，参考层在多次比较中只转化一次"""
+    paths = cache.get(key)
+    if paths is None:
+        paths = ca.toPaths(layer.contours)
+        if delta != 0.0:
+            paths = ca.offsetPaths(paths, delta, jt)
+        cache[key] = paths
+    return paths
+
+
+def pickFfRegions(layer1, layer2, shellThk, ca=None, cache1=None, cache2=None):
+    """cache1、cache2 为两层各自的整数路径缓存，由调用者随层一起保存"""
+    if ca is None: ca = ClipperAdaptor()
+    if cache1 is None: cache1 = {}
+    if cache2 is None: cache2 = {}
+    c2 = layer2.contours
+    z = c2[0].point(0).z if c2 else 0
 
+    # 中间结果均为整数路径，只在最后转化为 Polyline
     # === 1. 计算外壳内边界 c2oi ===
-    c2oi = ca.offset(c2, -shellThk, jt=pyclipper.JT_ROUND)
+    p2 = layerPaths(ca, layer2, cache2)
+    c2oi = layerPaths(ca, layer2, cache2, 'shell', -shellThk, pyclipper.JT_ROUND)
     if len(c2oi) == 0:
         return False
 
-    layer2.shellContours = c2oi
+    layer2.shellContours = ca.toPolys(c2oi, z)
 
     # === 2. 识别端面 (关键逻辑) ===
-    if len(c1) == 0:
-        d = c2
+    if len(layer1.contours) == 0:
+        d = p2
     else:
-        c1_safe = ca.offset(c1, 0.1, jt=pyclipper.JT_SQUARE)
-        d = ca.clip(c2, c1_safe, pyclipper.CT_DIFFERENCE, minArea=1.0)
+        c1_safe = layerPaths(ca, layer1, cache1, 'safe', 0.1, pyclipper.JT_SQUARE)
+        d = ca.clipPaths(p2, c1_safe, pyclipper.CT_DIFFERENCE, minArea=1.0)
 
     if len(d) == 0:
         return False
 
     # === 3. 生成密实填充区域 f ===
-    doo = ca.offset(d, shellThk, jt=pyclipper.JT_ROUND)
+    doo = ca.offsetPaths(d, shellThk, jt=pyclipper.JT_ROUND)
 
     # f = doo ∩ c2oi (限制在模型内部)
-    z = c2[0].point(0).z if c2 else 0
-    f = ca.clip(doo, c2oi, pyclipper.CT_INTERSECTION, z, minArea=1.0)
+    f = ca.clipPaths(doo, c2oi, pyclipper.CT_INTERSECTION, minArea=1.0)
 
-    layer2.ffContours = f
+    layer2.ffContours = ca.toPolys(f, z)
     return len(f) > 0
 
 
-def splitFfRegions(layers, shellThk, endLayerNum):
-    if not layers: return
+class EndLayerScanner:
+    """端面识别的逐层状态机，与原双指针扫描（参考层 i、目标层 j）等价：
+    按扫描方向依次送入各层，每层送入后其外壳和密实区域即已确定，只需保留前一层和端面组的参考层；
+    两层的整数路径缓存与层一起保存在对应的位置上，层被替换时缓存随之释放"""
+
+    def __init__(self, shellThk, endLayerNum):
+        self.shellThk = shellThk
+        self.endLayerNum = endLayerNum
+        self.ca = ClipperAdaptor()
+        self.prev, self.prevPaths = Layer(0), {}  # 辅助空层，以便处理第一层的端面
+        self.ref, self.refPaths = None, None  # 端面组的参考层，不在端面组内时为 None
+        self.count = 0
+
+    def feed(self, layer):
+        paths = {}
+        if self.ref is not None:
+            # 继续用参考层判断本层是否有端面区域，一组最多 endLayerNum 层
+            self.count += 1
+            if pickFfRegions(self.ref, layer, self.shellThk, self.ca, self.refPaths, paths) \
+                    and self.count < self.endLayerNum:
+                self.prev, self.prevPaths = layer, paths
+                return
+            # 一组端面处理完，本层改用前一层作为参考层重新判断
+            self.ref, self.refPaths = None, None
+
+        # 尝试识别本层是否相对于前一层有端面，有则以前一层为参考层开始一组端面
+        if pickFfRegions(self.prev, layer, self.shellThk, self.ca, self.prevPaths, paths):
+            self.ref, self.refPaths, self.count = self.prev, self.prevPaths, 0
+        self.prev, self.prevPaths = layer, paths
 
-    # 插入辅助空层，以便处理第一层的端面
-    layers.insert(0, Layer(0))
 
-    i = 0  # 参考层索引
-    j = 1  # 目标层索引
-
-    while True:
-        if j >= len(layers):
-            break
-
-        # 尝试识别 layer[j] 是否相对于 layer[i] 有端面
-        is_end = pickFfRegions(layers[i], layers[j], shellThk)
+def splitFfRegions(layers, shellThk, endLayerNum):
+    scanner = EndLayerScanner(shellThk, endLayerNum)
+    for layer in layers:
+        scanner.feed(layer)
 
-        if is_end:
-            count = 0
-            while is_end and count < endLayerNum:
-                j += 1
-                count += 1
-                if j >= len(layers): break
-                # 继续用 i 层作为参考，判断 j 层是否有端面区域
-                is_end = pickFfRegions(layers[i], layers[j], shellThk)
 
-            # 一组端面处理完，更新参考层位置
-            i = j - 1
+def splitSfRegion(ca, layer):
+    # 如果有外壳
+    if len(layer.shellContours) > 0:
+        # 如果没有密实区，整个内部都是稀疏区
+        if len(layer.ffContours) == 0:
+            layer.sfContours = layer.shellContours
         else:
-            i += 1
-            j += 1
-
-    del layers[0]
+            # s = c2oi - f
+            s = ca.clip(layer.shellContours, layer.ffContours, pyclipper.CT_DIFFERENCE, layer.z)
+            layer.sfContours = s
 
 
 def splitSfRegions(layers):
     ca = ClipperAdaptor()
     for layer in layers:
-        # 如果有外壳
-        if len(layer.shellContours) > 0:
-            # 如果没有密实区，整个内部都是稀疏区
-            if len(layer.ffContours) == 0:
-                layer.sfContours = layer.shellContours
-            else:
-                # s = c2oi - f
-                s = ca.clip(layer.shellContours, layer.ffContours, pyclipper.CT_DIFFERENCE, layer.z)
-                layer.sfContours = s
+        splitSfRegion(ca, layer)
+
+
+def mergeFfRegions(ca, layer, upper, lower):
+    """ff = lower_ff U upper_ff"""
+    if len(upper) > 0 and len(lower) > 0:
+        # 合并
+        layer.ffContours = ca.clip(upper, lower, pyclipper.CT_UNION, layer.z)
+    elif len(lower) > 0:
+        layer.ffContours = lower
+    else:
+        layer.ffContours = upper
 
 
 def idEndLayers(layers, shellThk, endLayerNum):
+    with Profiler.span('idEndLayers'):
+        identifyEndLayers(layers, shellThk, endLayerNum)
+
+
+def identifyEndLayers(layers, shellThk, endLayerNum):
     # 1. 下端面识别 (自下而上)
     splitFfRegions(layers, shellThk, endLayerNum)
 
@@ -109,28 +149,42 @@ def idEndLayers(layers, shellThk, endLayerNum):
     for layer in layers: layer.ffContours = []
 
     # 反转列表计算上端面
-    reversed_layers = layers[::-1]
-    splitFfRegions(reversed_layers, shellThk, endLayerNum)
+    splitFfRegions(layers[::-1], shellThk, endLayerNum)
 
     # 3. 合并上下端面结果
-    # ff = lower_ff U upper_ff
     ca = ClipperAdaptor()
     for i, layer in enumerate(layers):
-        upper = layer.ffContours
-        lower = lower_ff[i]
-
-        if len(upper) > 0 and len(lower) > 0:
-            # 合并
-            merged = ca.clip(upper, lower, pyclipper.CT_UNION, layer.z)
-            layer.ffContours = merged
-        elif len(lower) > 0:
-            layer.ffContours = lower
-        # else: 保持 upper
+        mergeFfRegions(ca, layer, layer.ffContours, lower_ff[i])
 
     # 4. 最后生成稀疏区域 (sf = shell - ff)
     splitSfRegions(layers)
 
 
+def iterIdEndLayers(layers, reversedLayers, shellThk, endLayerNum):
+    """逐层产生已识别端面的层（生成器），结果与 idEndLayers 相同
+    reversedLayers 为自上而下的同一组层（可以是重新切片得到的另一组对象）：先完整扫描一遍求上端面，
+    只保留非空的上端面区域；再自下而上扫描 layers，每层求出下端面后立即合并、生成稀疏区域并产生该层"""
+    upper = {}  # 自上而下的序号 -> 上端面区域
+    scanner = EndLayerScanner(shellThk, endLayerNum)
+    n = 0
+    for layer in reversedLayers:
+        with Profiler.span('idEndLayers:down', layer.z):
+            scanner.feed(layer)
+        if layer.ffContours:
+            upper[n] = layer.ffContours
+        layer.ffContours = []
+        n += 1
+
+    scanner = EndLayerScanner(shellThk, endLayerNum)
+    ca = ClipperAdaptor()
+    for i, layer in enumerate(layers):
+        with Profiler.span('idEndLayers', layer.z):
+            scanner.feed(layer)
+            mergeFfRegions(ca, layer, upper.pop(n - 1 - i, []), layer.ffContours)
+            splitSfRegion(ca, layer)
+        yield layer
+
+
 if __name__ == '__main__':
     import os
     import vtk
@@ -3,12 +3,16 @@ from Triangle import *
 from StlModel import *
 from Layer import *
 from GeomAlgo import *
+import numpy as np
+from AdaptiveLayers import genUniformHeights
+from FacetLayerIndex import FacetLayerIndex
 
 
 class IntersectStl_match:
-    def __init__(self, stlModel, layerThk):
+    def __init__(self, stlModel, layerThk, zs=None):
         self.stlModel = stlModel
         self.layerThk = layerThk
+        self.zs = zs  # 指定的层高列表（自适应层厚），为 None 时按 layerThk 均匀分层
         self.layers = []
         self.intersect()
 
@@ -25,6 +29,8 @@ class IntersectStl_match:
     def matchFacetZs_bisection(self, zs):
         """二分法层高匹配函数"""
         n = len(zs)
+        if n == 0:
+            return
         for tri in self.stlModel.triangles:
             zMin, zMax = tri.zMinPnt().z, tri.zMaxPnt().z
 
@@ -38,7 +44,7 @@ class IntersectStl_match:
                     up = mid
 
             start = up
-            if zs[low] == zMin:
+            if zs[low] >= zMin:
                 start = low
 
             # 2. 二分法寻找上限序号
@@ -51,40 +57,36 @@ class IntersectStl_match:
                     up = mid
 
             stop = low
-            if zs[up] == zMax:
+            if zs[up] <= zMax:
                 stop = up
 
             # 3. 将匹配的层高添加到面片
             for i in range(start, stop + 1):
-                tri.zs.append(zs[i])
+                if zMin <= zs[i] <= zMax:  # 区间落在首层之下或末层之上时两端不一定有效
+                    tri.zs.append(zs[i])
+
+    def matchFacetZs_index(self, zs):
+        """searchsorted 层高匹配：一次得到所有面片与层的关联（CSR 索引），不写入 tri.zs"""
+        return FacetLayerIndex.fromModel(self.stlModel, zs)
 
     def genLayerHeights(self):
-        """生成切片层高列表和层字典"""
-        xMin, xMax, yMin, yMax, zMin, zMax = self.stlModel.getBounds()
-        zs = []
-        layerDic = {}
-        z = zMin + self.layerThk
-        while z < zMax:
-            zs.append(z)
-            layerDic[z] = Layer(z)
-            z += self.layerThk
-        return zs, layerDic
+        """生成切片层高列表"""
+        if self.zs is not None:
+            return list(self.zs)
+        return genUniformHeights(self.stlModel, self.layerThk)
 
     def intersect(self):
         """层高匹配截交核心函数"""
-        # 生成层高列表和层字典
-        zs, layerDic = self.genLayerHeights()
-
-        # 使用二分法进行层高匹配
-        self.matchFacetZs_bisection(zs)
-
-        # 遍历所有三角面片进行截交计算
-        for triangle in self.stlModel.triangles:
-            for z in triangle.zs:
-                seg = intersectTriangleZPlane(triangle, z)
-                if seg is not None:
-                    layerDic[z].segments.append(seg)
+        zs = self.genLayerHeights()
+        self.layers = [Layer(z) for z in zs]
+        if not zs:
+            return
 
-        # 将层字典转换为层列表
-        for layer in layerDic.values():
-            self.layers.append(layer)
\ No newline at end of file
+        # 面片-层关联索引，展开为 (面片, 层) 对批量截交计算
+        index = self.matchFacetZs_index(zs)
+        if index.pairCount() == 0:
+            return
+        pairLayers = index.pairLayers()
+        segs, idx = intersectTrianglesZ(self.stlModel.getFacetVertices(index.facets), index.zs[pairLayers])
+        for i, seg in zip(pairLayers[idx].tolist(), segmentsFromArray(segs)):
+            self.layers[i].segments.append(seg)
@@ -3,66 +3,92 @@ from Triangle import *
 from StlModel import *
 from Layer import *
 from GeomAlgo import *
+import heapq
+from AdaptiveLayers import genUniformHeights
+import numpy as np
+import Profiler
 
 
 class SweepPlane:
+    """扫描平面活动面片集合：以 (zMax, 序号) 为键的最小堆，
+    每个面片只入堆、出堆各一次，维护代价为 O(log n)"""
+
     def __init__(self):
-        self.triangles = []  # 修正：移除不需要的参数
+        self.triangles = []  # 堆，元素为 (zMax, 面片按最低点排序后的序号)
+
+    def evict(self, z):
+        """移除 zMax < z 的面片"""
+        heap = self.triangles
+        while heap and heap[0][0] < z:
+            heapq.heappop(heap)
+
+    def insert(self, start, end, zMaxs, z):
+        """加入排序序号在 [start, end) 内的面片，zMax < z 的面片位于两层之间，直接跳过"""
+        heap = self.triangles
+        for r in range(start, end):
+            zMax = zMaxs[r]
+            if zMax >= z:
+                heapq.heappush(heap, (zMax, r))
+
+    def activeRanks(self):
+        """当前活动面片的排序序号（升序）"""
+        return np.sort(np.fromiter((r for _, r in self.triangles), dtype=np.int64, count=len(self.triangles)))
 
 
 class IntersectStl_sweep:
-    def __init__(self, stlModel, layerThk):
+    def __init__(self, stlModel, layerThk, zs=None, lazy=False):
         self.stlModel = stlModel
         self.layerThk = layerThk
+        self.zs = zs  # 指定的层高列表（自适应层厚），为 None 时按 layerThk 均匀分层
         self.layers = []
-        self.intersect()
+        if not lazy:  # lazy 为 True 时不立即截交，由调用者通过 iterLayers 逐层获取
+            self.intersect()
 
     def genLayerHeights(self):
         """生成切片层高列表函数"""
-        xMin, xMax, yMin, yMax, zMin, zMax = self.stlModel.getBounds()  # 模型边界
-        zs = []
-        z = zMin + self.layerThk
-        while z < zMax:  # 根据切片厚度均匀生成层高
-            zs.append(z)
-            z += self.layerThk
-        return zs
+        if self.zs is not None:
+            return list(self.zs)
+        return genUniformHeights(self.stlModel, self.layerThk)  # 根据切片厚度均匀生成层高
 
     def intersect(self):
         """扫描平面法截交实现函数"""
-        triangles = self.stlModel.triangles  # 赋值，保存引用，简化写法
+        self.layers.extend(self.iterLayers())
+
+    def iterLayers(self):
+        """逐层产生截交层的生成器（自下而上）"""
+        n = self.stlModel.getFacetNumber()
 
         # 检查是否有三角形
-        if len(triangles) == 0:
+        if n == 0:
             print("警告: 没有三角形数据，跳过截交计算")
             return
 
-        # 对三角形按最低点进行排序
-        triangles.sort(key=lambda t: t.zMinPnt().z)
+        # 面片Z范围数组，按最低点排序后的面片序号
+        zMins, zMaxs = self.stlModel.getFacetZRange()
+        order = np.argsort(zMins, kind='stable')
+        sortedZMaxs = zMaxs[order].tolist()
 
         zs = self.genLayerHeights()  # 生成层高列表
-        k = 0  # 添加面片遍历过程起始序号
-        sweep = SweepPlane()  # 扫描平面对象
-
-        for z in zs:  # 遍历层高列表循环
-            # 1. 移除扫描平面面片列表中不和扫描平面相关的面片
-            for i in range(len(sweep.triangles) - 1, -1, -1):
-                if z > sweep.triangles[i].zMaxPnt().z:
-                    del sweep.triangles[i]
-
-            # 2. 向扫描平面面片列表添加面片
-            for i in range(k, len(triangles)):
-                tri = triangles[i]
-                if z >= tri.zMinPnt().z and z <= tri.zMaxPnt().z:
-                    sweep.triangles.append(tri)
-                elif tri.zMinPnt().z > z:
-                    k = i  # 记录位置，下次从i开始遍历
-                    break
-
-            # 3. 面片列表和扫描平面求交
+        # 每层 zMin <= z 的面片数，一次 searchsorted 得到各层新加入面片的范围
+        ends = np.searchsorted(zMins[order], zs, 'right').tolist()
+        k = 0  # 尚未加入扫描平面的第一个面片序号
+        sweep = SweepPlane()  # 扫描平面对象（最小堆）
+
+        for z, end in zip(zs, ends):  # 遍历层高列表循环
+            # 1. 移除扫描平面中已低于截平面的面片
+            sweep.evict(z)
+
+            # 2. 向扫描平面添加新的相关面片
+            sweep.insert(k, end, sortedZMaxs, z)
+            k = end
+
+            # 3. 活动面片按最低点顺序和扫描平面批量求交
             layer = Layer(z)
-            for triangle in sweep.triangles:
-                seg = intersectTriangleZPlane(triangle, z)
-                if seg is not None:
-                    layer.segments.append(seg)  # 截交线段保存至layer.segments中
+            if sweep.triangles:
+                with Profiler.span('intersect', z):
+                    active = order[sweep.activeRanks()]
+                    segs, idx = intersectTrianglesZ(self.stlModel.getFacetVertices(active), z)
+                    layer.segments = segmentsFromArray(segs)  # 截交线段保存至layer.segments中
+                    Profiler.count('segments', len(layer.segments))
 
-            self.layers.append(layer)
\ No newline at end of file
+            yield layer
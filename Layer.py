@@ -3,6 +3,8 @@ class Layer:
         self.z = z # 当前层高度值
         self.segments = [] # 截交线段列表
         self.contours = [] # 多边形轮廓列表（封闭截交线）
+        self.openChains = 0 # 拼接后未闭合的开放链数量
+        self.thk = None # 本层层厚（自适应分层时设置），None 表示使用统一层厚
 
         self.shellContours = []  # 轮廓填充内边界轮廓
         self.ffContours = []  # 密实填充区域轮廓 (Full Fill)
@@ -1,6 +1,8 @@
 from GeomBase import Point3D
 
 class LinkPoint:
+    __slots__ = ('x', 'y', 'z', 'other', 'used', 'index', 'segments')
+
     def __init__(self, pnt3d, digits=7):
         self.x = round(pnt3d.x, digits)
         self.y = round(pnt3d.y, digits)
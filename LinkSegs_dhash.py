@@ -0,0 +1,144 @@
+import numpy as np
+from GeomBase import Point3D
+from Polyline import Polyline
+
+
+class LinkSegs_dhash:
+    """空间哈希拼接法：端点按容差网格吸附，并查集合并重合端点，再沿端点图遍历成轮廓
+    self.contours 为封闭轮廓，self.polys 为开放链，self.openCount 为开放链数量"""
+
+    def __init__(self, segs, tolerance=1e-5):
+        self.segs = segs
+        self.tolerance = tolerance
+        self.contours = []
+        self.polys = []
+        self.openCount = 0
+        self.link()
+
+    def find(self, i):
+        """并查集查找（路径减半）"""
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            if ri < rj:
+                self.parent[rj] = ri
+            else:
+                self.parent[ri] = rj
+
+    def mergePoints(self, pnts):
+        """网格边长为2倍容差，与某点重合的点只可能落在本格或靠近一侧的相邻格内
+        返回每个端点所属的代表点序号"""
+        tol = self.tolerance
+        coords = np.array([(p.x, p.y, p.z) for p in pnts], dtype=np.float64).reshape(-1, 3)
+        # 坐标完全相同的端点先直接合并，只对不同的点做网格查找
+        uniq, first, inverse = np.unique(coords, axis=0, return_index=True, return_inverse=True)
+        f = uniq / (2 * tol)
+        cells = np.floor(f)
+        sides = np.where(f - cells >= 0.5, 1, -1)
+
+        self.parent = list(range(len(uniq)))
+        grid = {}
+        pts = uniq.tolist()
+        for i, ((x, y, z), (ix, iy, iz), (sx, sy, sz)) in enumerate(
+                zip(pts, cells.astype(np.int64).tolist(), sides.tolist())):
+            for cx in (ix, ix + sx):
+                for cy in (iy, iy + sy):
+                    for cz in (iz, iz + sz):
+                        cell = grid.get((cx, cy, cz))
+                        if cell is None:
+                            continue
+                        for j in cell:
+                            qx, qy, qz = pts[j]
+                            if abs(x - qx) < tol and abs(y - qy) < tol and abs(z - qz) < tol:
+                                self.union(i, j)
+            grid.setdefault((ix, iy, iz), []).append(i)
+        # 代表点取该组中最先出现的端点
+        roots = np.array([self.find(i) for i in range(len(uniq))], dtype=np.int64)
+        groupFirst = np.full(len(uniq), len(pnts), dtype=np.int64)
+        np.minimum.at(groupFirst, roots, first)
+        return groupFirst[roots][inverse.reshape(-1)].tolist()
+
+    def walk(self, start, adj, deg, used, ends):
+        """从节点 start 出发沿未使用的边前进，返回经过的节点序列"""
+        nodes = [start]
+        cur = start
+        while True:
+            edges = adj[cur]
+            while edges and used[edges[-1]]:
+                edges.pop()
+            if not edges:
+                break
+            e = edges.pop()
+            used[e] = True
+            a, b = ends[e]
+            deg[a] -= 1
+            deg[b] -= 1
+            cur = b if a == cur else a
+            nodes.append(cur)
+            if cur == start:
+                break
+        return nodes
+
+    def link(self):
+        pnts = []
+        for seg in self.segs:
+            pnts.append(seg.A)
+            pnts.append(seg.B)
+        roots = self.mergePoints(pnts)
+
+        # 构建端点图：节点为合并后的代表点，边为线段（忽略退化线段和重复线段）
+        ends = []
+        adj = {}
+        seen = set()
+        for k in range(0, len(roots), 2):
+            a, b = roots[k], roots[k + 1]
+            key = (a, b) if a < b else (b, a)
+            if a == b or key in seen:
+                continue
+            seen.add(key)
+            e = len(ends)
+            ends.append((a, b))
+            adj.setdefault(a, []).append(e)
+            adj.setdefault(b, []).append(e)
+        # 逆序存放，walk 从列表尾部取边时按线段输入顺序访问
+        for edges in adj.values():
+            edges.reverse()
+        deg = {node: len(edges) for node, edges in adj.items()}
+        used = [False] * len(ends)
+
+        # 奇度数节点必为开放链端点，先从这些节点出发
+        for node in adj:
+            if deg[node] % 2 == 1:
+                self.addChain(self.walk(node, adj, deg, used, ends), pnts)
+
+        # 剩余的边都位于闭合回路上
+        for e, (a, b) in enumerate(ends):
+            if not used[e]:
+                self.addChain(self.walk(a, adj, deg, used, ends), pnts)
+
+        self.openCount = len(self.polys)
+        return self.contours
+
+    def addChain(self, nodes, pnts):
+        """首尾为同一节点的链为封闭轮廓，否则为开放链"""
+        if len(nodes) < 2:
+            return
+        poly = self.toPolyline(nodes, pnts)
+        if nodes[0] == nodes[-1] and poly.count() >= 3:
+            self.contours.append(poly)
+        else:
+            self.polys.append(poly)
+
+    @staticmethod
+    def toPolyline(nodes, pnts):
+        poly = Polyline()
+        for node in nodes:
+            p = pnts[node]
+            poly.addPoint(Point3D(p.x, p.y, p.z))
+        return poly
@@ -1,7 +1,7 @@
 from GeomBase import *
 from LinkPoint import LinkPoint
 from Polyline import Polyline
-import functools
+import bisect
 
 
 def cmp_pntSmaller(lp1, lp2):
@@ -37,8 +37,8 @@ class LinkSegs_dorder:
             lpnts.append(lp1)
             lpnts.append(lp2)
 
-        # 对点进行字典序排序
-        lpnts.sort(key=functools.cmp_to_key(cmp_pntSmaller))
+        # 对点进行字典序排序（与 cmp_pntSmaller 顺序相同，元组键避免逐次调用比较函数）
+        lpnts.sort(key=lambda lp: (lp.x, lp.y, lp.z))
         return lpnts
 
     def findUnusedPnt(self, lpnts):
@@ -49,8 +49,13 @@ class LinkSegs_dorder:
         return None
 
     def findCoincidentPoint(self, target_point, lpnts):
-        """在排序列表中寻找与目标点重合的未使用点"""
-        for lp in lpnts:
+        """在排序列表中寻找与目标点重合的未使用点
+        列表按x有序，二分定位到 x - 容差 处开始查找"""
+        start = bisect.bisect_left(self.xs, target_point.x - 1e-5)
+        for i in range(start, len(lpnts)):
+            lp = lpnts[i]
+            if lp.x >= target_point.x + 1e-5:
+                break
             if lp.isCoincident(target_point) and not lp.used and lp != target_point:
                 return lp
         return None
@@ -58,6 +63,7 @@ class LinkSegs_dorder:
     def link(self):
         """字典序拼接核心函数 - 简化版本"""
         lpnts = self.createLpList()
+        self.xs = [lp.x for lp in lpnts]
 
         debug_mode = len(lpnts) < 1000
 
@@ -0,0 +1,145 @@
+import copy
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from Layer import Layer
+from Polyline import polylineToArray, arrayToPolyline
+from GeomAlgo import intersectTrianglesZPlanes, segmentsFromArray
+from AdaptiveLayers import genUniformHeights
+from SliceAlgo import warnOpenLayers
+import Profiler
+
+
+def _chunks(items, workers, chunkSize):
+    """将层列表划分为连续的块"""
+    if chunkSize is None:
+        chunkSize = max(1, math.ceil(len(items) / (workers * 4)))
+    return [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+
+
+def _toArrays(polys):
+    return [polylineToArray(p) for p in polys]
+
+
+def _toPolys(arrs):
+    return [arrayToPolyline(a) for a in arrs]
+
+
+def _linkChunk(payload):
+    """子进程：对一块层的截交线段进行拼接与修复，返回轮廓数组"""
+    from SliceAlgo import heal_and_organize
+    results = []
+    for z, segs in payload:
+        layer = Layer(z)
+        layer.segments = segmentsFromArray(segs)
+        if len(layer.segments) > 0:
+            heal_and_organize(layer, tolerance=0.5)
+        results.append((z, _toArrays(layer.contours), layer.openChains))
+    return results
+
+
+def _pathChunk(payload):
+    """子进程：对一块层调用 genLayerPaths 生成轮廓、密实和稀疏填充路径，返回路径数组"""
+    from GenNcCode import genLayerPaths
+    pp, items = payload
+    results = []
+    for i, z, contours, ffContours, sfContours in items:
+        layer = Layer(z)
+        layer.contours, layer.ffContours, layer.sfContours = _toPolys(contours), _toPolys(ffContours), _toPolys(sfContours)
+        genLayerPaths(layer, i, pp)
+        results.append((_toArrays(layer.cpPaths), _toArrays(layer.ffPaths), _toArrays(layer.sfPaths)))
+    return results
+
+
+def _callChunk(task):
+    """子进程：执行一块任务；主进程启用了性能分析时在子进程内同样分析，分析器随结果一起返回"""
+    func, payload, profile = task
+    if not profile:
+        return func(payload), None
+    with Profiler.profiling('worker') as prof:
+        result = func(payload)
+    return result, prof
+
+
+def _runChunks(func, payloads, workers):
+    """按块执行任务（payloads 可以是生成器），逐块产生结果，子进程的性能分析结果并入主进程的分析器"""
+    profile = Profiler.enabled()
+    tasks = ((func, payload, profile) for payload in payloads)
+    if workers == 1:
+        for result, prof in map(_callChunk, tasks):
+            Profiler.merge(prof)
+            yield result
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result, prof in executor.map(_callChunk, tasks):
+                Profiler.merge(prof)
+                yield result
+
+
+def _segChunks(stlModel, zs, workers, chunkSize):
+    """按层块截交（生成器）：每块只读取与该块高度范围 [zs[i0], zs[i1-1]] 重叠的面片顶点，
+    面片保持按最低点排序，使每层线段顺序与扫描平面法一致"""
+    zMins, zMaxs = stlModel.getFacetZRange()
+    order = np.argsort(zMins, kind='stable')
+    sortedZMins = zMins[order]
+    for chunk in _chunks(list(range(len(zs))), workers, chunkSize):
+        zLo, zHi = zs[chunk[0]], zs[chunk[-1]]
+        candidates = order[:np.searchsorted(sortedZMins, zHi, 'right')]
+        facets = candidates[zMaxs[candidates] >= zLo]
+        chunkZs = zs[chunk[0]:chunk[-1] + 1]
+        layerSegs = intersectTrianglesZPlanes(stlModel.getFacetVertices(facets), np.array(chunkZs))
+        yield [(z, segs) for z, (segs, idx) in zip(chunkZs, layerSegs)]
+
+
+def sliceCombineParallel(stlModel, layerThk, workers=None, chunkSize=None, zs=None):
+    """多进程版 slice_combine：主进程按层块截交，子进程按层块拼接轮廓"""
+    workers = workers or os.cpu_count() or 1
+
+    if zs is None:
+        zs = genUniformHeights(stlModel, layerThk)
+    zs = list(zs)
+    if not zs or stlModel.getFacetNumber() == 0:
+        return [Layer(z) for z in zs]
+
+    # 截交（按层块向量化）后拼接与修复（按层块并行，只传递数组）
+    layers = []
+    for result in _runChunks(_linkChunk, _segChunks(stlModel, zs, workers, chunkSize), workers):
+        for z, contours, openChains in result:
+            layer = Layer(z)
+            layer.contours = _toPolys(contours)
+            layer.openChains = openChains
+            layers.append(layer)
+    warnOpenLayers(layers)
+    return layers
+
+
+def genAllPathsParallel(pp, workers=None, chunkSize=None):
+    """多进程版 genAllPaths：端面识别和支撑仍按顺序执行，各层路径生成并行"""
+    from GenNcCode import sliceLayers
+    from GenSptPath import genSptPath
+    workers = workers or os.cpu_count() or 1
+
+    sptSfInvl = pp.nozzleSize / pp.sptSfRate
+
+    layers = sliceLayers(pp, lambda model, thk, zs=None: sliceCombineParallel(model, thk, workers, chunkSize, zs))
+
+    items = [(i, layer.z, _toArrays(layer.contours), _toArrays(layer.ffContours), _toArrays(layer.sfContours))
+             for i, layer in enumerate(layers)]
+    # 子进程只需要路径参数，不传递模型
+    workerPp = copy.copy(pp)
+    workerPp.stlModel = None
+    payloads = [(workerPp, chunk) for chunk in _chunks(items, workers, chunkSize)]
+
+    i = 0
+    for result in _runChunks(_pathChunk, payloads, workers):
+        for cpPaths, ffPaths, sfPaths in result:
+            layer = layers[i]
+            layer.cpPaths, layer.ffPaths, layer.sfPaths = _toPolys(cpPaths), _toPolys(ffPaths), _toPolys(sfPaths)
+            i += 1
+
+    if pp.sptOn:
+        genSptPath(pp.stlModel, layers, sptSfInvl, pp.sptGridSize,
+                   pp.sptCrAngle, pp.sptFillType, pp.sptFillAngle, pp.sptXyGap)
+
+    return layers
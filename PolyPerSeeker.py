@@ -1,8 +1,113 @@
-from GeomAlgo import pointInPolygon
-from Utility import makeListLinear
+import numpy as np
+from GeomBase import epsilon
+from GeomAlgo import PolygonEdgeTable
+from Utility import makeListLinear, expandRanges
 import math
 
 
+class NestingForest:
+    """轮廓嵌套森林：parent[i] 为直接包含第 i 条轮廓的轮廓序号（无则为 -1），
+    children[i] 为直接子轮廓序号列表，depth[i] 为嵌套深度
+    父轮廓为包含其起点、面积更大的轮廓中面积最小者；候选轮廓先用包围盒网格索引筛选"""
+
+    def __init__(self, polys):
+        self.polys = polys
+        n = len(polys)
+        self.table = PolygonEdgeTable(polys)
+        self.bounds = self.table.bounds
+        self.signedAreas = self.table.signedAreas()
+        self.areas = np.abs(self.signedAreas)
+        # 按面积从小到大的名次，面积相同时保持输入顺序
+        self.order = np.argsort(self.areas, kind='stable')
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[self.order] = np.arange(n)
+
+        self.parent = [-1] * n
+        self.children = [[] for _ in range(n)]
+        self.depth = [0] * n
+        if n > 1:
+            self.buildIndex()
+            self.build()
+
+    def buildIndex(self):
+        """包围盒网格索引：约 sqrt(n) x sqrt(n) 个格子，记录 (格子编号, 轮廓序号) 并按格子排序；
+        跨越格子过多的大轮廓单独存放，每次查询都参与筛选"""
+        n = len(self.polys)
+        valid = np.isfinite(self.bounds).all(axis=1)
+        b = self.bounds[valid]
+        self.origin = b[:, :2].min(axis=0) if len(b) else np.zeros(2)
+        extent = (b[:, 2:].max(axis=0) - self.origin) if len(b) else np.ones(2)
+        self.gridNum = max(1, int(math.ceil(math.sqrt(n))))
+        self.cellSize = np.maximum(extent / self.gridNum, epsilon)
+
+        ids = np.flatnonzero(valid)
+        lo = self.cellOf(self.bounds[ids, :2])
+        hi = self.cellOf(self.bounds[ids, 2:])
+        w, h = hi[:, 0] - lo[:, 0] + 1, hi[:, 1] - lo[:, 1] + 1
+        large = w * h > max(4, self.gridNum)
+        self.large = ids[large]
+
+        # 展开每个轮廓覆盖的格子
+        ids, lo, h, cnt = ids[~large], lo[~large], h[~large], (w * h)[~large]
+        owner, local = expandRanges(None, cnt)
+        cx = lo[owner, 0] + local // h[owner]
+        cy = lo[owner, 1] + local % h[owner]
+        keys = cx * self.gridNum + cy
+        order = np.argsort(keys, kind='stable')
+        self.cellKeys, self.cellPolys = keys[order], ids[owner][order]
+
+    def cellOf(self, xy):
+        return np.clip(((xy - self.origin) / self.cellSize).astype(np.int64), 0, self.gridNum - 1)
+
+    def candidatePairs(self, ids, px, py):
+        """候选 (测试点, 轮廓) 对：轮廓包围盒包含测试点且面积名次更高"""
+        cell = self.cellOf(np.column_stack([px, py]))
+        keys = cell[:, 0] * self.gridNum + cell[:, 1]
+        lo = np.searchsorted(self.cellKeys, keys, 'left')
+        cnt = np.searchsorted(self.cellKeys, keys, 'right') - lo
+        pt, slot = expandRanges(lo, cnt)
+        cand = self.cellPolys[slot]
+        if len(self.large):
+            pt = np.concatenate([pt, np.repeat(np.arange(len(ids)), len(self.large))])
+            cand = np.concatenate([cand, np.tile(self.large, len(ids))])
+
+        b = self.bounds[cand]
+        x, y = px[pt], py[pt]
+        keep = (self.rank[cand] > self.rank[ids[pt]]) & (b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3])
+        return pt[keep], cand[keep]
+
+    def build(self):
+        # 取每条曲线的起点为测试点，所有候选对一次性判断
+        offsets = self.table.offsets
+        ids = np.flatnonzero(np.diff(offsets) > 0)
+        px, py = self.table.x0[offsets[ids]], self.table.y0[offsets[ids]]
+        pt, cand = self.candidatePairs(ids, px, py)
+        inside = self.table.testPairs(px[pt], py[pt], cand) == 1  # 点在多边形内部
+        pt, cand = pt[inside], cand[inside]
+
+        # 包含测试点的轮廓中面积名次最低者为父轮廓
+        order = np.lexsort((self.rank[cand], pt))
+        pt, cand = pt[order], cand[order]
+        first = np.ones(len(pt), dtype=bool)
+        first[1:] = pt[1:] != pt[:-1]
+        for i, j in zip(ids[pt[first]].tolist(), cand[first].tolist()):
+            self.parent[i] = j
+
+        # 按面积从小到大添加子轮廓；父轮廓面积名次总是更高，按名次从大到小即可逐级得到深度
+        for i in self.order.tolist():
+            if self.parent[i] >= 0:
+                self.children[self.parent[i]].append(i)
+        for i in self.order[::-1].tolist():
+            if self.parent[i] >= 0:
+                self.depth[i] = self.depth[self.parent[i]] + 1
+
+
+def buildNestingForest(polys):
+    """返回 (parent, children, depth)"""
+    forest = NestingForest(polys)
+    return forest.parent, forest.children, forest.depth
+
+
 class PolyPerSeeker:
     def __init__(self, polys):
         self.polys = makeListLinear(polys)  # 将输入列表转为线性列表
@@ -11,41 +116,21 @@ class PolyPerSeeker:
     def seek(self):
         """寻找父子关系的核心函数"""
         polys = self.polys
+        forest = NestingForest(polys)
 
-        # 初始化动态属性
-        for poly in polys:
-            poly.area = math.fabs(poly.getArea())  # 面积为绝对值
-            poly.parent = None  # 父曲线
-            poly.childs = []  # 子曲线列表
-            poly.depth = 0  # 深度值
+        # 设置动态属性
+        for i, poly in enumerate(polys):
+            poly.area = float(forest.areas[i])  # 面积为绝对值
+            parent = forest.parent[i]
+            poly.parent = polys[parent] if parent >= 0 else None  # 父曲线
+            poly.childs = [polys[k] for k in forest.children[i]]  # 子曲线列表
+            poly.depth = forest.depth[i]  # 深度值
 
-        # 根据面积对曲线排序（从小到大）
+        # 依据面积、深度值对polys排序
         polys.sort(key=lambda t: t.area)
-
-        # 寻找父子关系
-        for i in range(0, len(polys) - 1):
-            for j in range(i + 1, len(polys)):
-                pt = polys[i].startPoint()  # 取第i条曲线的起点为测试点
-                if pointInPolygon(pt, polys[j]) == 1:  # 点在多边形内部
-                    polys[i].parent = polys[j]  # 指定父曲线
-                    polys[j].childs.append(polys[i])  # 添加子曲线
-                    break
-
-        # 计算每条曲线的深度值
-        for poly in polys:
-            self.findPolyDepth(poly)
-
-        # 依据曲线深度值对polys排序
         polys.sort(key=lambda t: t.depth)
 
-    def findPolyDepth(self, poly):
-        """曲线深度值计算函数"""
-        crtPoly = poly
-        while crtPoly.parent is not None:
-            crtPoly = crtPoly.parent
-            poly.depth += 1
-
 
 def seekPolyPer(polys):
     """全局接口函数"""
-    return PolyPerSeeker(polys).polys
\ No newline at end of file
+    return PolyPerSeeker(polys).polys
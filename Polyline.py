@@ -1,4 +1,5 @@
 from GeomBase import *
+import numpy as np
 
 class Polyline:
     def __init__(self):
@@ -41,6 +42,13 @@ class Polyline:
             return self.points[index]
         return None
 
+    def flag(self, index):
+        """第 index 点的空走标记，非0表示从该点到下一点为空走"""
+        return self.points[index].travel
+
+    def setFlag(self, index, value):
+        self.points[index].travel = value
+
     def startPoint(self):
         if len(self.points) > 0:
             return self.points[0]
@@ -112,19 +120,196 @@ class Polyline:
 
     def multiply(self, m):
         for i in range(len(self.points)):
-            self.points[i] = self.points[i].multiplied(m)
+            pt = self.points[i].multiplied(m)
+            pt.travel = self.points[i].travel  # 空走标记不受变换影响
+            self.points[i] = pt
 
     def multiplied(self, m):
         new_polyline = self.clone()
         new_polyline.multiply(m)
         return new_polyline
 
+    def toArray(self):
+        """(n,4) 数组，每行为 x, y, z, 空走标记"""
+        return np.array([(pt.x, pt.y, pt.z, pt.travel) for pt in self.points], dtype=np.float64).reshape(-1, 4)
+
+class ArrayPolyline:
+    """数组存储的多段线：顶点为连续的 (n,3) float64 数组，
+    flags 为逐顶点空走标记数组（对应 Point3D.travel，默认0），接口与 Polyline 相同；
+    顶点不以 Point3D 对象存储，points 是只读的 Point3D 元组，逐点修改使用 setFlag(i, v) 或 xyz/flags 数组
+    copy=False 时直接使用传入的 (n,3) float64 数组，调用方不得再修改该数组"""
+
+    def __init__(self, xyz=None, flags=None, copy=True):
+        if xyz is None:
+            self._xyz = np.empty((8, 3))
+            self._flags = np.zeros(8)
+            self._n = 0
+        else:
+            xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+            self._n = len(xyz)
+            self._xyz = xyz.copy() if copy else xyz
+            self._flags = np.zeros(self._n) if flags is None else np.array(flags, dtype=np.float64)
+
+    @property
+    def xyz(self):
+        """(n,3) 顶点坐标数组（视图）"""
+        return self._xyz[:self._n]
+
+    @property
+    def flags(self):
+        """(n,) 逐顶点空走标记数组（视图），非0表示其后为空走"""
+        return self._flags[:self._n]
+
+    @property
+    def points(self):
+        """顶点的 Point3D 元组（含空走标记），每次由数组新建；元组不能追加或赋值，
+        修改其中的点不会写回多段线"""
+        return tuple(self.point(i) for i in range(self._n))
+
+    def toArray(self):
+        return np.column_stack([self.xyz, self.flags])
+
+    @staticmethod
+    def fromPolyline(polyline):
+        arr = polylineToArray(polyline)
+        return ArrayPolyline(arr[:, :3], arr[:, 3])
+
+    def toPolyline(self):
+        return arrayToPolyline(np.column_stack([self.xyz, self.flags]))
+
+    def __str__(self):
+        if self._n == 0:
+            return "Polyline: empty"
+        elif self._n == 1:
+            return f"Polyline: 1 point at {self.point(0)}"
+        else:
+            return f"Polyline: {self._n} points from {self.startPoint()} to {self.endPoint()}"
+
+    def _reserve(self, n):
+        if n > len(self._xyz):
+            cap = max(n, 2 * len(self._xyz))
+            xyz, flags = np.empty((cap, 3)), np.zeros(cap)
+            xyz[:self._n] = self.xyz
+            flags[:self._n] = self.flags
+            self._xyz, self._flags = xyz, flags
+
+    def clone(self):
+        return ArrayPolyline(self.xyz, self.flags)
+
+    def count(self):
+        return self._n
+
+    def addPoint(self, pt):
+        self._reserve(self._n + 1)
+        self._xyz[self._n] = (pt.x, pt.y, pt.z)
+        self._flags[self._n] = pt.travel
+        self._n += 1
+
+    def addTuple(self, tuple):
+        if len(tuple) >= 3:
+            self.addPoint(Point3D(tuple[0], tuple[1], tuple[2]))
+
+    def raddPoint(self, pt):
+        self.addPoint(pt)
+        self._xyz[1:self._n] = self._xyz[:self._n - 1].copy()
+        self._flags[1:self._n] = self._flags[:self._n - 1].copy()
+        self._xyz[0] = (pt.x, pt.y, pt.z)
+        self._flags[0] = pt.travel
+
+    def removePoint(self, index):
+        if 0 <= index < self._n:
+            pt = self.point(index)
+            self._xyz[index:self._n - 1] = self._xyz[index + 1:self._n].copy()
+            self._flags[index:self._n - 1] = self._flags[index + 1:self._n].copy()
+            self._n -= 1
+            return pt
+        return None
+
+    def point(self, index):
+        if 0 <= index < self._n:
+            x, y, z = self._xyz[index].tolist()
+            pt = Point3D(x, y, z)
+            pt.travel = float(self._flags[index])
+            return pt
+        return None
+
+    def flag(self, index):
+        return float(self._flags[:self._n][index])
+
+    def setFlag(self, index, value):
+        self._flags[:self._n][index] = value
+
+    def startPoint(self):
+        return self.point(0)
+
+    def endPoint(self):
+        return self.point(self._n - 1)
+
+    def isClosed(self):
+        if self._n < 3:
+            return False
+        return self.startPoint().isCoincide(self.endPoint())
+
+    def reverse(self):
+        self._xyz[:self._n] = self.xyz[::-1].copy()
+        self._flags[:self._n] = self.flags[::-1].copy()
+
+    def _signedArea2(self):
+        """鞋带公式，返回有向面积的2倍"""
+        x, y = self.xyz[:, 0], self.xyz[:, 1]
+        xj, yj = np.roll(x, -1), np.roll(y, -1)
+        return float(np.sum(x * yj - xj * y))
+
+    def getArea(self):
+        if self._n < 3:
+            return 0.0
+        return abs(self._signedArea2()) / 2.0
+
+    def makeCCW(self):
+        if self.isCCW():
+            return
+        self.reverse()
+
+    def makeCW(self):
+        if not self.isCCW():
+            return
+        self.reverse()
+
+    def isCCW(self):
+        if self._n < 3:
+            return True
+        return self._signedArea2() > 0
+
+    def translate(self, vec):
+        self._xyz[:self._n] += (vec.dx, vec.dy, vec.dz)
+
+    def translated(self, vec):
+        new_polyline = self.clone()
+        new_polyline.translate(vec)
+        return new_polyline
+
+    def appendSegment(self, seg):
+        if self._n == 0:
+            self.addPoint(seg.A)
+        self.addPoint(seg.B)
+
+    def multiply(self, m):
+        a = np.array(m.a, dtype=np.float64)
+        self._xyz[:self._n] = self.xyz @ a[:3, :3] + a[3, :3]  # 顶点齐次坐标 w=1，空走标记不变
+
+    def multiplied(self, m):
+        new_polyline = self.clone()
+        new_polyline.multiply(m)
+        return new_polyline
+
+
 def writePolyline(path, polyline: Polyline):
     f = None
     try:
         f = open(path, 'w')
         f.write('%s\n' % polyline.count())
-        for pt in polyline.points:
+        for i in range(polyline.count()):
+            pt = polyline.point(i)
             txt = "%s, %s, %s\n" % (pt.x, pt.y, pt.z)
             f.write(txt)
     except Exception as ex:
@@ -151,4 +336,24 @@ def readPolyline(path):
         return None
     finally:
         if f:
-            f.close()
\ No newline at end of file
+            f.close()
+
+
+def polylineToArray(polyline: Polyline):
+    """将Polyline转化为 (n,4) 数组，每行为 x, y, z, 空走标记，用于跨进程传递和批量生成G代码"""
+    return polyline.toArray()
+
+
+def arrayToPolyline(arr):
+    """将 (n,4) 或 (n,3) 数组转化为Polyline，第4列为空走标记"""
+    poly = Polyline()
+    arr = np.asarray(arr, dtype=np.float64)
+    if arr.ndim == 2 and arr.shape[1] > 3:
+        for x, y, z, travel in arr[:, :4].tolist():
+            pt = Point3D(x, y, z)
+            pt.travel = travel
+            poly.points.append(pt)
+    else:
+        for row in arr.tolist():
+            poly.points.append(Point3D(*row))
+    return poly
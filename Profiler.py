@@ -0,0 +1,204 @@
+import csv
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# 当前启用的分析器，为 None 时 span/count 不做任何事，插桩几乎没有开销
+_active = None
+_nullSpan = nullcontext()
+
+
+class Profiler:
+    """流水线性能分析器：记录各阶段的计时区间（span）和计数器（count）
+    span 可按层记录（layer 为层高 z），区间内不指定层的计数归入当前层；
+    可选用 cProfile 统计函数耗时，用 tracemalloc 统计各阶段的内存峰值；
+    流式流程中自上而下的一遍上端面识别记为 'idEndLayers:down'，与自下而上的 'idEndLayers' 区分"""
+
+    def __init__(self, job='job', cprofile=False, memory=False):
+        self.job = job
+        self.stages = {}  # 阶段名 -> [次数, 总耗时, 最大耗时, 内存峰值]
+        self.layers = {}  # 层高 -> {'stage:名称': 耗时, 计数器名: 值}
+        self.counters = {}  # 计数器名 -> 总计
+        self.layerStack = []  # 嵌套 span 的当前层
+        self.profile = cProfile.Profile() if cprofile else None
+        self.memory = memory
+        self.startTime = self.elapsed = None
+
+    def start(self):
+        self.startTime = time.perf_counter()
+        if self.memory:
+            tracemalloc.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        if self.memory:
+            tracemalloc.stop()
+        self.elapsed = time.perf_counter() - self.startTime
+
+    @contextmanager
+    def span(self, name, layer=None):
+        if layer is None and self.layerStack:
+            layer = self.layerStack[-1]
+        # 内存峰值只在最外层区间开始时清零，嵌套区间的峰值为外层区间开始以来的峰值（上界）
+        if self.memory and not self.layerStack:
+            tracemalloc.reset_peak()
+        self.layerStack.append(layer)
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.layerStack.pop()
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = [0, 0.0, 0.0, 0]
+            stage[0] += 1
+            stage[1] += dt
+            stage[2] = max(stage[2], dt)
+            if self.memory:
+                stage[3] = max(stage[3], tracemalloc.get_traced_memory()[1])
+            if layer is not None:
+                record = self.layerRecord(layer)
+                key = 'stage:' + name
+                record[key] = record.get(key, 0.0) + dt
+
+    def count(self, name, n=1, layer=None):
+        self.counters[name] = self.counters.get(name, 0) + n
+        if layer is None and self.layerStack:
+            layer = self.layerStack[-1]
+        if layer is not None:
+            record = self.layerRecord(layer)
+            record[name] = record.get(name, 0) + n
+
+    def merge(self, other):
+        """并入另一个分析器（如子进程中的分析器）的阶段、逐层记录和计数器
+        各进程的耗时直接相加，多进程时阶段总耗时可能超过整个作业的墙钟时间"""
+        for name, (c, t, m, peak) in other.stages.items():
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = [0, 0.0, 0.0, 0]
+            stage[0] += c
+            stage[1] += t
+            stage[2] = max(stage[2], m)
+            stage[3] = max(stage[3], peak)
+        for layer, record in other.layers.items():
+            mine = self.layerRecord(layer)
+            for key, value in record.items():
+                mine[key] = mine.get(key, 0) + value
+        for name, n in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def layerRecord(self, layer):
+        record = self.layers.get(layer)
+        if record is None:
+            record = self.layers[layer] = {}
+        return record
+
+    def topFunctions(self, n=30):
+        """cProfile 统计中自身耗时最多的 n 个函数"""
+        if self.profile is None:
+            return []
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        rows = []
+        for (file, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+            rows.append({'function': f"{file}:{line}({func})", 'calls': nc, 'tottime': tt, 'cumtime': ct})
+        rows.sort(key=lambda r: r['tottime'], reverse=True)
+        return rows[:n]
+
+    def report(self):
+        """汇总为可 JSON 序列化的字典"""
+        stages = {name: {'calls': c, 'total': t, 'mean': t / c, 'max': m}
+                  for name, (c, t, m, peak) in self.stages.items()}
+        if self.memory:
+            for name, stage in self.stages.items():
+                stages[name]['peakMemory'] = stage[3]
+        return {
+            'job': self.job,
+            'elapsed': self.elapsed,
+            'stages': stages,
+            'counters': dict(self.counters),
+            'layers': [dict(z=z, **record) for z, record in sorted(self.layers.items())],
+            'functions': self.topFunctions(),
+        }
+
+    def writeJson(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        return path
+
+    def writeCsv(self, path):
+        """逐层明细表：每行一层，列为各阶段耗时和各计数器"""
+        columns = sorted({key for record in self.layers.values() for key in record})
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['z'] + columns)
+            for z, record in sorted(self.layers.items()):
+                writer.writerow([z] + [record.get(key, 0) for key in columns])
+        return path
+
+    def printSummary(self, top=10):
+        total = self.elapsed if self.elapsed else sum(s[1] for s in self.stages.values())
+        print(f"性能分析 [{self.job}] 总耗时 {total:.3f}s")
+        for name, (c, t, m, peak) in sorted(self.stages.items(), key=lambda kv: kv[1][1], reverse=True):
+            line = f"  {name:<14} {t:8.3f}s  {c:6d} 次  最长 {m * 1000:8.2f}ms"
+            if self.memory:
+                line += f"  内存峰值 {peak / 1e6:8.1f}MB"
+            print(line)
+        for name, n in sorted(self.counters.items()):
+            print(f"  {name:<14} {n}")
+        # 最慢的几层
+        slowest = sorted(self.layers.items(), reverse=True,
+                         key=lambda kv: sum(v for k, v in kv[1].items() if k.startswith('stage:')))
+        for z, record in slowest[:top]:
+            t = sum(v for k, v in record.items() if k.startswith('stage:'))
+            print(f"  层 Z={z:.3f} {t * 1000:.2f}ms")
+
+
+@contextmanager
+def profiling(job='job', cprofile=False, memory=False, jsonPath=None, csvPath=None):
+    """在 with 块内启用分析器，结束时按需写出 JSON/CSV 报告
+    with profiling('part1', jsonPath='part1.json') as prof: writeNcCode(pp, 'part1.gcode')"""
+    global _active
+    prof = Profiler(job, cprofile, memory)
+    previous, _active = _active, prof
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _active = previous
+        if jsonPath is not None:
+            prof.writeJson(jsonPath)
+        if csvPath is not None:
+            prof.writeCsv(csvPath)
+
+
+def enabled():
+    """是否有启用的分析器，用于跳过只为计数而做的额外计算"""
+    return _active is not None
+
+
+def span(name, layer=None):
+    """插桩接口：当前分析器的计时区间，未启用时为空上下文"""
+    if _active is None:
+        return _nullSpan
+    return _active.span(name, layer)
+
+
+def count(name, n=1, layer=None):
+    """插桩接口：累加计数器，未启用时直接返回"""
+    if _active is not None:
+        _active.count(name, n, layer)
+
+
+def merge(prof):
+    """把子进程返回的分析器并入当前分析器，未启用或 prof 为 None 时直接返回"""
+    if _active is not None and prof is not None:
+        _active.merge(prof)
@@ -1,6 +1,8 @@
 from GeomBase import *
 
 class Segment:
+    __slots__ = ('A', 'B')
+
     def __init__(self, A, B):
         self.A = A.clone()
         self.B = B.clone()
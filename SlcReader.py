@@ -0,0 +1,146 @@
+import mmap
+import os
+import struct
+import numpy as np
+from SliceAlgo import SLC_LAYER, SLC_CONTOUR, SLC_END, slcDataOffset, readSlcLayer
+
+# 层索引旁路文件格式（小端），与 SLC 文件同名加 .idx：
+#   头部   magic(8s) 版本(I) SLC文件大小(Q) SLC修改时间(q, 纳秒) 层数(I)
+#   数据   层数个 float32 层高 z（与 SLC 文件中的值相同） + 层数个 uint64 层数据偏移
+INDEX_MAGIC = b'SLCINDEX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<8sIQqI')
+
+
+def scanSlcLayers(buf):
+    """只读各层和各轮廓的头部，跳过点坐标，返回 (层高数组, 层数据偏移数组)"""
+    size = len(buf)
+    zs, offsets = [], []
+    offset = slcDataOffset(buf)
+    while offset + SLC_LAYER.size <= size:
+        z, num_contours = SLC_LAYER.unpack_from(buf, offset)
+        if num_contours == SLC_END:
+            break
+        zs.append(z)
+        offsets.append(offset)
+        offset += SLC_LAYER.size
+        for _ in range(num_contours):
+            if offset + SLC_CONTOUR.size > size: break
+            num_points, _ = SLC_CONTOUR.unpack_from(buf, offset)
+            offset += SLC_CONTOUR.size + 8 * num_points
+    return np.array(zs, dtype=np.float32), np.array(offsets, dtype=np.uint64)
+
+
+class SlcReader:
+    """SLC 文件随机访问读取器：以内存映射打开文件，按层索引定位并只解析需要的层
+    层索引首次打开时扫描生成并写入旁路文件，之后按 SLC 文件大小和修改时间校验后直接读取"""
+
+    def __init__(self, path, useIndexFile=True):
+        self.path = path
+        self.indexPath = path + '.idx'
+        self.file = open(path, 'rb')
+        try:
+            self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"SLC 文件为空: {path}")
+        stat = os.fstat(self.file.fileno())
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+
+        index = self.loadIndex() if useIndexFile else None
+        if index is None:
+            index = scanSlcLayers(self.buf)
+            if useIndexFile:
+                self.saveIndex(*index)
+        self.zs, self.offsets = index
+
+    def loadIndex(self):
+        """读取旁路索引，不存在、已损坏或与 SLC 文件不匹配时返回 None"""
+        try:
+            with open(self.indexPath, 'rb') as f:
+                data = f.read()
+            magic, version, size, mtime, count = INDEX_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or (size, mtime) != self.stamp:
+            return None
+        if len(data) != INDEX_HEADER.size + 12 * count:
+            return None
+        zs = np.frombuffer(data, dtype='<f4', count=count, offset=INDEX_HEADER.size)
+        offsets = np.frombuffer(data, dtype='<u8', count=count, offset=INDEX_HEADER.size + 4 * count)
+        return zs.astype(np.float32), offsets.astype(np.uint64)
+
+    def saveIndex(self, zs, offsets):
+        """写入旁路索引，目录不可写时只在内存中使用"""
+        tmpPath = self.indexPath + '.tmp'
+        try:
+            with open(tmpPath, 'wb') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.stamp[0], self.stamp[1], len(zs)))
+                f.write(zs.astype('<f4').tobytes())
+                f.write(offsets.astype('<u8').tobytes())
+            os.replace(tmpPath, self.indexPath)
+        except OSError as ex:
+            print("SLC 层索引写入失败:", ex)
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def layerZs(self):
+        return self.zs.tolist()
+
+    def layer(self, i):
+        """解析第 i 层（支持负数序号），返回轮廓为 ArrayPolyline 的 Layer"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"SLC 层序号越界: {i}")
+        layer, _ = readSlcLayer(self.buf, int(self.offsets[i]))
+        return layer
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.layer(i) for i in range(*key.indices(len(self)))]
+        return self.layer(key)
+
+    def __iter__(self):
+        return self.iterLayers()
+
+    def rangeOf(self, zLow=None, zHigh=None):
+        """层高在 [zLow, zHigh] 内的层序号区间 [start, stop)，层高需升序"""
+        start = 0 if zLow is None else int(np.searchsorted(self.zs, np.float32(zLow), 'left'))
+        stop = len(self) if zHigh is None else int(np.searchsorted(self.zs, np.float32(zHigh), 'right'))
+        return start, max(start, stop)
+
+    def nearestLayer(self, z):
+        """与高度 z 最接近的层序号"""
+        if len(self) == 0:
+            return -1
+        i = int(np.searchsorted(self.zs, z))
+        if i == len(self) or (i > 0 and z - self.zs[i - 1] <= self.zs[i] - z):
+            i -= 1
+        return i
+
+    def iterLayers(self, zLow=None, zHigh=None):
+        """逐层解析层高在 [zLow, zHigh] 内的层（生成器）"""
+        start, stop = self.rangeOf(zLow, zHigh)
+        for i in range(start, stop):
+            yield self.layer(i)
+
+    def readLayers(self, zLow=None, zHigh=None):
+        return list(self.iterLayers(zLow, zHigh))
+
+
+def readSlcLayers(path, zLow=None, zHigh=None):
+    """只读取层高在 [zLow, zHigh] 内的层"""
+    with SlcReader(path) as reader:
+        return reader.readLayers(zLow, zHigh)
@@ -1,21 +1,40 @@
+import mmap
 import struct
 import math
+import numpy as np
 from GeomBase import Point3D
-from Polyline import Polyline
+from Polyline import Polyline, ArrayPolyline, polylineToArray
 from Layer import Layer
 from Segment import Segment
 from IntersectStl_sweep import IntersectStl_sweep
 from IntersectStl_match import IntersectStl_match
 from LinkSegs_dorder import LinkSegs_dorder
 from LinkSegs_dlook import LinkSegs_dlook
+from LinkSegs_dhash import LinkSegs_dhash
 from GeomAlgo import adjustPolygonDirs, intersectTriangleZPlane
+import Profiler
 
+# 截交线段拼接算法，切片缓存的键中计入其名称
+LINKER = LinkSegs_dhash
 
-def heal_and_organize(layer, tolerance=0.5):
 
-    linker = LinkSegs_dlook(layer.segments)
+def heal_and_organize(layer, tolerance=0.5):
+    """拼接截交线段并修复开放轮廓，返回拼接后的开放链数量"""
+    with Profiler.span('link', layer.z):
+        linker = LINKER(layer.segments)
+    with Profiler.span('heal', layer.z):
+        healLinkedContours(layer, linker, tolerance)
+    if Profiler.enabled():
+        Profiler.count('contours', len(layer.contours), layer.z)
+        Profiler.count('vertices', sum(contour.count() for contour in layer.contours), layer.z)
+    return layer.openChains
+
+
+def healLinkedContours(layer, linker, tolerance):
+    """闭合首尾接近的开放链，过滤极小轮廓并调整方向"""
     closed_contours = linker.contours
     open_polys = linker.polys
+    layer.openChains = linker.openCount
 
     # 尝试修复开放轮廓
     for poly in open_polys:
@@ -43,22 +62,33 @@ def heal_and_organize(layer, tolerance=0.5):
     adjustPolygonDirs(layer.contours)
 
 
-def intersectStl_sweep(stlModel, layerThk):
+def intersectStl_sweep(stlModel, layerThk, zs=None):
     """扫描平面法STL模型截交函数"""
-    return IntersectStl_sweep(stlModel, layerThk).layers
-
+    return IntersectStl_sweep(stlModel, layerThk, zs).layers
 
-def slice_combine(stlModel, layerThk):
-    # 1. 截交
-    slicer = IntersectStl_sweep(stlModel, layerThk)
-    layers = slicer.layers
 
-    # 2. 拼接与修复
-    total_healed = 0
-    for layer in layers:
+def iter_layers(stlModel, layerThk, zs=None):
+    """逐层产生已拼接轮廓的层（生成器，自下而上），截交线段拼接后即释放"""
+    slicer = IntersectStl_sweep(stlModel, layerThk, zs, lazy=True)
+    for layer in slicer.iterLayers():
         if len(layer.segments) > 0:
             heal_and_organize(layer, tolerance=0.5)  # 0.5mm 容差
             layer.segments = []
+        yield layer
+
+
+def warnOpenLayers(layers):
+    """统计并提示存在开放轮廓链的层数"""
+    openLayers = sum(1 for layer in layers if layer.openChains > 0)
+    if openLayers > 0:
+        print(f"警告: {openLayers} 层存在开放轮廓链")
+    return openLayers
+
+
+def slice_combine(stlModel, layerThk, zs=None):
+    # 截交、拼接与修复（zs 为指定层高列表时按其分层）
+    layers = list(iter_layers(stlModel, layerThk, zs))
+    warnOpenLayers(layers)
     return layers
 
 def intersectStl_brutal(stlModel, layerThk):
@@ -86,6 +116,23 @@ def intersectStl_brutal(stlModel, layerThk):
     return layers  # 返回层列表
 
 
+# SLC 文件各块的二进制格式（与原逐点 struct 读写一致，本机字节序）
+SLC_HEADER_SIZE = 2048 + 256  # 文本头部 + 保留区
+SLC_LAYER = struct.Struct('fI')  # 层高 z, 轮廓数
+SLC_CONTOUR = struct.Struct('II')  # 点数, 空隙数
+SLC_END = 0xFFFFFFFF  # 轮廓数为该值的层头表示文件结束
+
+
+def slcLayerBytes(layer):
+    """一层的 SLC 数据块：每个轮廓的点坐标用一次 tobytes 写出"""
+    block = bytearray(SLC_LAYER.pack(layer.z, len(layer.contours)))
+    for contour in layer.contours:
+        xy = np.ascontiguousarray(polylineToArray(contour)[:, :2], dtype=np.float32)
+        block += SLC_CONTOUR.pack(len(xy), 0)
+        block += xy.tobytes()
+    return block
+
+
 def writeSlcFile(layers, path):
     f = None
     try:
@@ -104,15 +151,10 @@ def writeSlcFile(layers, path):
         f.write(struct.pack('4f', start_z, layer_thk, 0.0, 0.0))
 
         for layer in layers:
-            f.write(struct.pack('fI', layer.z, len(layer.contours)))
-            for contour in layer.contours:
-                f.write(struct.pack('II', contour.count(), 0))
-                for i in range(contour.count()):
-                    pt = contour.point(i)
-                    f.write(struct.pack('2f', pt.x, pt.y))
+            f.write(slcLayerBytes(layer))
 
         max_z = layers[-1].z if layers else 0.0
-        f.write(struct.pack('fI', max_z, 0xFFFFFFFF))
+        f.write(SLC_LAYER.pack(max_z, SLC_END))
         return True
     except Exception as ex:
         print("writeSlcFile exception:", ex)
@@ -121,44 +163,59 @@ def writeSlcFile(layers, path):
         if f: f.close()
 
 
+def slcDataOffset(buf):
+    """跳过文件头和采样表，返回第一层数据的偏移"""
+    offset = SLC_HEADER_SIZE
+    num_channels = buf[offset]
+    offset += 1
+    if num_channels > 0: offset += 16
+    return offset
+
+
+def readSlcLayer(buf, offset):
+    """从 buf 的 offset 处解析一层，返回 (层, 下一层偏移)，遇到文件结束或数据不完整时层为 None
+    每个轮廓的点坐标用一次 np.frombuffer 读取，得到数组存储的 ArrayPolyline"""
+    size = len(buf)
+    if offset + SLC_LAYER.size > size:
+        return None, offset
+    z, num_contours = SLC_LAYER.unpack_from(buf, offset)
+    if num_contours == SLC_END:
+        return None, offset
+    offset += SLC_LAYER.size
+
+    layer = Layer(z)
+    for _ in range(num_contours):
+        if offset + SLC_CONTOUR.size > size: break
+        num_points, _ = SLC_CONTOUR.unpack_from(buf, offset)
+        offset += SLC_CONTOUR.size
+        # 数据不完整时只取完整的点
+        num_points = min(num_points, (size - offset) // 8)
+        xy = np.frombuffer(buf, dtype=np.float32, count=2 * num_points, offset=offset).reshape(-1, 2)
+        offset += 8 * num_points
+        xyz = np.empty((num_points, 3))
+        xyz[:, :2] = xy
+        xyz[:, 2] = z
+        layer.contours.append(ArrayPolyline(xyz, copy=False))
+    return layer, offset
+
+
 def readSlcFile(path):
-    f = None
     try:
-        f = open(path, 'rb')
-        layers = []
-        f.read(2048 + 256)
-        num_channels = struct.unpack('B', f.read(1))[0]
-        if num_channels > 0: f.read(16)
-
-        while True:
-            layer_header = f.read(8)
-            if len(layer_header) < 8: break
-            z, num_contours = struct.unpack('fI', layer_header)
-            if num_contours == 0xFFFFFFFF: break
-
-            layer = Layer(z)
-            for _ in range(num_contours):
-                contour_header = f.read(8)
-                if len(contour_header) < 8: break
-                num_points, _ = struct.unpack('II', contour_header)
-                contour = Polyline()
-                for _ in range(num_points):
-                    point_data = f.read(8)
-                    if len(point_data) < 8: break
-                    x, y = struct.unpack('2f', point_data)
-                    contour.addPoint(Point3D(x, y, z))
-                layer.contours.append(contour)
-            layers.append(layer)
-        return layers
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            layers = []
+            offset = slcDataOffset(mm)
+            while True:
+                layer, offset = readSlcLayer(mm, offset)
+                if layer is None: break
+                layers.append(layer)
+            return layers
     except Exception as ex:
         print("readSlcFile exception:", ex)
         return None
-    finally:
-        if f: f.close()
 
 
-def intersectStl_match(stlModel, layerThk):
-    return IntersectStl_match(stlModel, layerThk).layers
+def intersectStl_match(stlModel, layerThk, zs=None):
+    return IntersectStl_match(stlModel, layerThk, zs).layers
 
 
 def linkSegs_dorder(segs):
@@ -169,6 +226,10 @@ def linkSegs_dlook(segs):
     return LinkSegs_dlook(segs).contours
 
 
+def linkSegs_dhash(segs):
+    return LinkSegs_dhash(segs).contours
+
+
 def linkSegs_brutal(segs):
     segs = segs[:]
     contours = []
@@ -0,0 +1,240 @@
+import hashlib
+import os
+import struct
+import tempfile
+import numpy as np
+from Layer import Layer
+from Polyline import polylineToArray, arrayToPolyline
+
+# 缓存文件格式（小端）：
+#   头部   magic(8s) 版本(I) 层数(I) 层厚(d)
+#   层索引 每层 z(d) 数据偏移(Q) 数据长度(Q) 轮廓数(I) 开放链数(I)
+#   数据块 每个轮廓 点数(I) + 点数*3 个 float64 (x, y, z)
+CACHE_MAGIC = b'SLCCACHE'
+CACHE_VERSION = 2
+CACHE_HEADER = struct.Struct('<8sIId')
+CACHE_INDEX = struct.Struct('<dQQII')
+CACHE_COUNT = struct.Struct('<I')
+
+
+def callableName(func):
+    """函数的模块限定名，functools.partial 取其包装的函数"""
+    func = getattr(func, 'func', func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def meshHash(stlModel):
+    """模型内容哈希：对已应用变换的面片顶点分块计算，变换不同则哈希不同"""
+    h = hashlib.sha1()
+    h.update(struct.pack('<Q', stlModel.getFacetNumber()))
+    for start, v in stlModel.iterFacetChunks():
+        h.update(np.ascontiguousarray(v, dtype='<f8').tobytes())
+    return h.hexdigest()
+
+
+class CachedSlice:
+    """已打开的切片缓存文件，打开时只读入并核对层索引，各层轮廓按需加载"""
+
+    def __init__(self, path, temporary=False):
+        self.path = path
+        self.temporary = temporary  # 为 True 时关闭后删除文件
+        self.file = open(path, 'rb')
+        try:
+            magic, version, count, self.layerThk = CACHE_HEADER.unpack(self.file.read(CACHE_HEADER.size))
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                raise ValueError(f"不是有效的切片缓存文件: {path}")
+            index = self.file.read(CACHE_INDEX.size * count)
+            self.index = [CACHE_INDEX.unpack_from(index, i * CACHE_INDEX.size) for i in range(count)]
+            self.validate(CACHE_HEADER.size + CACHE_INDEX.size * count)
+        except (ValueError, struct.error):
+            self.file.close()
+            raise
+
+    def validate(self, dataStart):
+        """核对层索引：各层数据块须首尾相接，最后一层结束于文件末尾；文件被截断或损坏时抛出 ValueError"""
+        pos = dataStart
+        for z, offset, length, contourNum, openChains in self.index:
+            if offset != pos:
+                raise ValueError(f"切片缓存数据块不连续: {self.path}")
+            pos += length
+        if pos != os.fstat(self.file.fileno()).st_size:
+            raise ValueError(f"切片缓存数据不完整: {self.path}")
+
+    def __len__(self):
+        return len(self.index)
+
+    def close(self):
+        self.file.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def zs(self):
+        return [entry[0] for entry in self.index]
+
+    def loadLayer(self, i):
+        """读取第 i 层，返回只包含轮廓的 Layer；整块读入后按轮廓点数切分"""
+        z, offset, length, contourNum, openChains = self.index[i]
+        layer = Layer(z)
+        layer.openChains = openChains
+        self.file.seek(offset)
+        block = self.file.read(length)
+        pos = 0
+        for _ in range(contourNum):
+            if pos + CACHE_COUNT.size > len(block):
+                raise ValueError(f"切片缓存数据不完整: {self.path}")
+            n, = CACHE_COUNT.unpack_from(block, pos)
+            pos += CACHE_COUNT.size
+            if pos + n * 24 > len(block):
+                raise ValueError(f"切片缓存数据不完整: {self.path}")
+            arr = np.frombuffer(block, dtype='<f8', count=n * 3, offset=pos).reshape(n, 3)
+            layer.contours.append(arrayToPolyline(arr))
+            pos += n * 24
+        if pos != len(block):
+            raise ValueError(f"切片缓存数据块长度不符: {self.path}")
+        return layer
+
+    def layerHeaders(self):
+        """各层只含层高和开放链数的 Layer，不读取轮廓"""
+        layers = []
+        for z, offset, length, contourNum, openChains in self.index:
+            layer = Layer(z)
+            layer.openChains = openChains
+            layers.append(layer)
+        return layers
+
+    def loadLayers(self):
+        return [self.loadLayer(i) for i in range(len(self.index))]
+
+    def iterLayers(self, reverse=False):
+        """逐层读取的生成器，reverse 为 True 时自上而下"""
+        n = len(self.index)
+        for i in (range(n - 1, -1, -1) if reverse else range(n)):
+            yield self.loadLayer(i)
+
+
+class SliceCache:
+    """切片结果磁盘缓存，键由模型内容哈希、层厚、切片函数和线段拼接算法决定"""
+
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def key(self, stlModel, layerThk, zs=None, linker=None, slicer=None):
+        """zs 为指定的层高列表（自适应分层）时一并计入键；
+        linker 为拼接算法类，默认为 SliceAlgo.LINKER；slicer 为切片函数，默认为 SliceAlgo.slice_combine"""
+        from SliceAlgo import LINKER, slice_combine
+        h = hashlib.sha1()
+        h.update(meshHash(stlModel).encode())
+        h.update(struct.pack('<dI', layerThk, CACHE_VERSION))
+        h.update(callableName(linker or LINKER).encode())
+        h.update(callableName(slicer or slice_combine).encode())
+        if zs is not None:
+            h.update(np.asarray(zs, dtype='<f8').tobytes())
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cacheDir, key + '.slcache')
+
+    def open(self, key):
+        """打开缓存，不存在或已损坏时返回 None"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return CachedSlice(path)
+        except (ValueError, struct.error) as ex:
+            print("切片缓存读取失败:", ex)
+            return None
+
+    def save(self, key, layers, layerThk, count=None):
+        """写入缓存目录中的唯一临时文件后替换，避免中断或并发写入时留下不完整的缓存
+        layers 可以是逐层产生的迭代器，此时需给出层数 count：先预留层索引，逐层写出数据后再回填索引"""
+        if count is None:
+            count = len(layers)
+        path = self.path(key)
+        f = tempfile.NamedTemporaryFile(dir=self.cacheDir, prefix=key, suffix='.tmp', delete=False)
+        try:
+            with f:
+                self.writeLayers(f, layers, layerThk, count)
+            os.replace(f.name, path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+        return path
+
+    @staticmethod
+    def writeLayers(f, layers, layerThk, count):
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, count, layerThk))
+        f.write(bytes(CACHE_INDEX.size * count))
+        offset = CACHE_HEADER.size + CACHE_INDEX.size * count
+        index = []
+        for layer in layers:
+            block = bytearray()
+            for contour in layer.contours:
+                arr = polylineToArray(contour)[:, :3]
+                block += CACHE_COUNT.pack(len(arr))
+                block += np.ascontiguousarray(arr, dtype='<f8').tobytes()
+            index.append(CACHE_INDEX.pack(layer.z, offset, len(block), len(layer.contours), layer.openChains))
+            f.write(block)
+            offset += len(block)
+        if len(index) != count:
+            raise ValueError(f"切片缓存层数不符: 预期 {count} 层, 实际 {len(index)} 层")
+        f.seek(CACHE_HEADER.size)
+        f.write(b''.join(index))
+
+
+def openSliceCached(stlModel, layerThk, cacheDir, zs):
+    """打开切片缓存，未命中时逐层切片并流式写入缓存后再打开，不在内存中保留全部层
+    zs 为层高列表，为 None 时按 layerThk 均匀分层"""
+    from SliceAlgo import iter_layers
+    from AdaptiveLayers import genUniformHeights
+    cache = SliceCache(cacheDir)
+    # iter_layers 是 slice_combine 的逐层版本，结果相同，与 sliceCached 的默认切片共用缓存
+    key = cache.key(stlModel, layerThk, zs)
+    cached = cache.open(key)
+    if cached is not None:
+        print(f"切片缓存命中: {len(cached)} 层")
+        return cached
+    heights = zs if zs is not None else genUniformHeights(stlModel, layerThk)
+    cache.save(key, iter_layers(stlModel, layerThk, heights), layerThk, len(heights))
+    return CachedSlice(cache.path(key))
+
+
+def openSliceTemp(stlModel, layerThk, zs):
+    """逐层切片并流式写入临时文件后打开，关闭时删除该文件
+    不设缓存目录时，需要多遍逐层扫描的流程（端面识别）只切片一遍"""
+    from SliceAlgo import iter_layers
+    from AdaptiveLayers import genUniformHeights
+    heights = zs if zs is not None else genUniformHeights(stlModel, layerThk)
+    f = tempfile.NamedTemporaryFile(suffix='.slcache', delete=False)
+    try:
+        with f:
+            SliceCache.writeLayers(f, iter_layers(stlModel, layerThk, heights), layerThk, len(heights))
+        return CachedSlice(f.name, temporary=True)
+    except BaseException:
+        os.remove(f.name)
+        raise
+
+
+def sliceCached(stlModel, layerThk, cacheDir, slicer=None, zs=None):
+    """带缓存的切片：命中时直接读取各层轮廓，否则调用 slicer 切片并写入缓存
+    slicer(stlModel, layerThk, zs) 默认为 slice_combine"""
+    if slicer is None:
+        from SliceAlgo import slice_combine
+        slicer = slice_combine
+    cache = SliceCache(cacheDir)
+    key = cache.key(stlModel, layerThk, zs, slicer=slicer)
+    cached = cache.open(key)
+    if cached is not None:
+        with cached:
+            print(f"切片缓存命中: {len(cached)} 层")
+            return cached.loadLayers()
+    layers = slicer(stlModel, layerThk, zs)
+    cache.save(key, layers, layerThk)
+    return layers
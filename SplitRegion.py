@@ -25,7 +25,7 @@ class SplitRegion:
             cnt = poly.count()
             if cnt < 3: continue
 
-            pts = poly.points
+            pts = [poly.point(i) for i in range(cnt)]
             for i in range(cnt):  # 遍历每个顶点
                 # 获取前后点，处理闭合索引
                 prev_pt = pts[i - 1]
@@ -37,9 +37,9 @@ class SplitRegion:
 
                 # 判断峰点: (v1 x vx) * (v2 x vx) <= 0 (式 9-12)
                 # 即两邻边在扫描线方向(vx)的异侧
-                if v1.crossProduct(vx).dz * v2.crossProduct(vx).dz <= 0:
+                if v1.crossProductZ(vx) * v2.crossProductZ(vx) <= 0:
                     # 判断凹点: v1 x v2 < 0 (式 9-9)
-                    if v1.crossProduct(v2).dz < 0:
+                    if v1.crossProductZ(v2) < 0:
                         turnPts.append(curr_pt)
         return turnPts
 
@@ -1,43 +1,212 @@
 from GeomBase import *
 from Triangle import Triangle
+import numpy as np
 import vtk
 import struct
 import os
-import math
+import re
+import time
+import warnings
+import Profiler
+
+# 二进制STL面片记录：法向量(12字节) + 3个顶点(36字节) + 属性字节计数(2字节)
+STL_FACET_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                            ('vertices', '<f4', (3, 3)),
+                            ('attr', '<u2')])
+
+REASONABLE_RANGE = 10000.0  # 合理坐标范围（10米）
+
+
+MAP_CHUNK_FACETS = 1 << 20  # 映射模式下分块处理的面片数
+
+ASCII_CHUNK_BYTES = 1 << 24  # 文本STL每次读取的字节数
+ASCII_FACET_BYTES = 256  # 文本STL每个面片的估计字节数，用于预分配数组
+# 文本STL中除坐标外的关键字（已转为小写）
+_STL_KEYWORDS = (b'endfacet', b'endloop', b'outer loop', b'facet normal', b'vertex')
+# 文本STL记录：facet normal / vertex 关键字及其后3个坐标
+_STL_RECORD_RE = re.compile(rb'(facet\s+normal|vertex)\s+(\S+)\s+(\S+)\s+(\S+)')
 
 
 class StlModel:
     def __init__(self):
-        self.triangles = []  # 三角面片列表
+        self._triangles = None  # 三角面片列表（按需由数组生成）
+        self._vertices = None  # (N,3,3) 顶点数组
+        self._normals = None  # (N,3) 法向量数组
+        self._facets = None  # 内存映射模式下的面片记录（np.memmap）
+        self._matrix = None  # 映射模式下尚未应用的 4x4 变换矩阵
+        self._zRange = None  # 缓存的面片 (zMin, zMax) 数组
         self.xMin = self.xMax = self.yMin = self.yMax = self.zMin = self.zMax = 0
 
+    @property
+    def triangles(self):
+        """三角面片列表，旧接口使用时才由数组生成 Triangle 对象"""
+        if self._triangles is None:
+            self._triangles = self._createTriangles()
+        return self._triangles
+
+    @triangles.setter
+    def triangles(self, triangles):
+        self._triangles = triangles
+        self._vertices = self._normals = None
+        self._facets = self._matrix = self._zRange = None
+
+    @property
+    def vertices(self):
+        """(N,3,3) 顶点数组，第二维依次为 A、B、C
+        映射模式且无变换时为映射缓冲区上的只读视图，不复制数据"""
+        if self._triangles is not None and (self._vertices is None or len(self._vertices) != len(self._triangles)):
+            self._createArrays()
+        if self._matrix is not None:
+            return self.getFacetVertices(slice(None))
+        return self._vertices
+
+    @property
+    def normals(self):
+        """(N,3) 法向量数组"""
+        if self._triangles is not None and (self._normals is None or len(self._normals) != len(self._triangles)):
+            self._createArrays()
+        if self._matrix is not None:
+            return self.getFacetNormals(slice(None))
+        return self._normals
+
+    def isMapped(self):
+        """是否为内存映射模式"""
+        return self._facets is not None
+
+    def setFacets(self, vertices, normals=None):
+        """以数组形式设置面片数据，triangles 在需要时再生成"""
+        self._vertices = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 3, 3)
+        if normals is None:
+            self._normals = np.zeros((len(self._vertices), 3))
+        else:
+            self._normals = np.ascontiguousarray(normals, dtype=np.float64).reshape(-1, 3)
+        self._triangles = None
+        self._facets = self._matrix = self._zRange = None
+        self._calculateBounds()
+
+    def getFacetVertices(self, index):
+        """按序号(切片或整数数组)取出面片顶点，返回 (n,3,3) float64 数组
+        映射模式下只读取所需的页，并应用尚未执行的变换"""
+        if self._triangles is not None and self._facets is None:
+            return self.vertices[index]
+        v = np.asarray(self._vertices[index], dtype=np.float64)
+        if self._matrix is not None:
+            m = self._matrix
+            v = v @ m[:3, :3] + m[3, :3]
+        return v
+
+    def getFacetNormals(self, index):
+        """按序号取出面片法向量，返回 (n,3) float64 数组"""
+        if self._triangles is not None and self._facets is None:
+            return self.normals[index]
+        n = np.asarray(self._normals[index], dtype=np.float64)
+        if self._matrix is not None:
+            n = n @ self._matrix[:3, :3]
+        return n
+
+    def iterFacetChunks(self, chunk=MAP_CHUNK_FACETS):
+        """分块遍历面片，产生 (起始序号, 顶点数组)，内存占用与块大小成正比"""
+        n = self.getFacetNumber()
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            yield start, self.getFacetVertices(slice(start, stop))
+
+    def getFacetZRange(self):
+        """返回每个面片的 (zMin, zMax) 数组，分块计算并缓存"""
+        n = self.getFacetNumber()
+        if self._zRange is None or len(self._zRange[0]) != n:
+            zMins, zMaxs = np.empty(n), np.empty(n)
+            for start, v in self.iterFacetChunks():
+                zs = v[:, :, 2]
+                zMins[start:start + len(v)] = zs.min(axis=1)
+                zMaxs[start:start + len(v)] = zs.max(axis=1)
+            self._zRange = (zMins, zMaxs)
+        return self._zRange
+
+    def _createTriangles(self):
+        """由顶点/法向量数组生成 Triangle 对象列表"""
+        if self._vertices is None:
+            return []
+        triangles = []
+        for start, vs in self.iterFacetChunks():
+            ns = self.getFacetNormals(slice(start, start + len(vs)))
+            for (a, b, c), n in zip(vs.tolist(), ns.tolist()):
+                triangles.append(Triangle(Point3D(a[0], a[1], a[2]), Point3D(b[0], b[1], b[2]),
+                                          Point3D(c[0], c[1], c[2]), Vector3D(n[0], n[1], n[2])))
+        return triangles
+
+    def _createArrays(self):
+        """由 Triangle 对象列表生成顶点/法向量数组"""
+        tris = self._triangles
+        self._vertices = np.array([[(t.A.x, t.A.y, t.A.z), (t.B.x, t.B.y, t.B.z), (t.C.x, t.C.y, t.C.z)]
+                                   for t in tris], dtype=np.float64).reshape(-1, 3, 3)
+        self._normals = np.array([(t.N.dx, t.N.dy, t.N.dz) for t in tris], dtype=np.float64).reshape(-1, 3)
+        self._facets = self._matrix = self._zRange = None
+
     def getFacetNumber(self):
         """获取STL模型中的面片数"""
+        if self._triangles is None and self._vertices is not None:
+            return len(self._vertices)
         return len(self.triangles)
 
     def _calculateBounds(self):
-        """计算模型边界"""
-        if not self.triangles:
+        """计算模型边界（映射模式下分块计算）"""
+        if self.getFacetNumber() == 0:
             self.xMin = self.xMax = self.yMin = self.yMax = self.zMin = self.zMax = 0
             return
 
-        # 初始化边界值
-        self.xMin = self.xMax = self.triangles[0].A.x
-        self.yMin = self.yMax = self.triangles[0].A.y
-        self.zMin = self.zMax = self.triangles[0].A.z
-
-        # 遍历所有三角形更新边界
-        for tri in self.triangles:
-            for vertex in [tri.A, tri.B, tri.C]:
-                self.xMin = min(self.xMin, vertex.x)
-                self.xMax = max(self.xMax, vertex.x)
-                self.yMin = min(self.yMin, vertex.y)
-                self.yMax = max(self.yMax, vertex.y)
-                self.zMin = min(self.zMin, vertex.z)
-                self.zMax = max(self.zMax, vertex.z)
+        lo, hi = np.full(3, np.inf), np.full(3, -np.inf)
+        for start, v in self.iterFacetChunks():
+            pts = v.reshape(-1, 3)
+            lo = np.minimum(lo, pts.min(axis=0))
+            hi = np.maximum(hi, pts.max(axis=0))
+        self.xMin, self.yMin, self.zMin = lo.tolist()
+        self.xMax, self.yMax, self.zMax = hi.tolist()
+
+    def mapStlFile(self, filepath):
+        """以内存映射方式打开二进制STL，面片坐标为映射缓冲区上的视图，不生成 Python 对象"""
+        try:
+            file_size = os.path.getsize(filepath)
+            with open(filepath, 'rb') as f:
+                header = f.read(84)
+            if len(header) < 84:
+                return False
+
+            num_triangles = struct.unpack('<I', header[80:84])[0]
+            count = min(num_triangles, (file_size - 84) // STL_FACET_DTYPE.itemsize)
+            if count <= 0:
+                return False
+
+            facets = np.memmap(filepath, dtype=STL_FACET_DTYPE, mode='r', offset=84, shape=(count,))
+            bad = self._countUnreasonable(facets)
+            if bad > 0:
+                # 映射缓冲区只读，无法像整体读入那样剔除或按大端修正坏面片，改为整体读入
+                print(f"警告: {bad} 个面片坐标不合理，改为整体读入")
+                del facets
+                return self._readStlFileBinary(filepath)
+            self._triangles = None
+            self._facets = facets
+            self._vertices = facets['vertices']
+            self._normals = facets['normal']
+            self._matrix = self._zRange = None
+            self._calculateBounds()
+            print(f"内存映射读取成功，三角形数量: {count}")
+            return True
+
+        except Exception as ex:
+            print(f"内存映射STL文件时出错: {ex}")
+            return False
+
+    def _countUnreasonable(self, facets, chunk=MAP_CHUNK_FACETS):
+        """分块统计坐标不合理（非有限值或超出合理范围）的面片数"""
+        bad = 0
+        for start in range(0, len(facets), chunk):
+            v = np.asarray(facets['vertices'][start:start + chunk], dtype=np.float64)
+            bad += int(np.count_nonzero(~self._reasonableMask(v).all(axis=1)))
+        return bad
 
     def getCoords(self, line):
-        """从文本中提取坐标，被readStlFile调用"""
+        """从文本行中提取坐标"""
         # 移除多余的空格和换行符
         line = line.strip()
         # 按空格分割
@@ -52,43 +221,49 @@ class StlModel:
                 return None
         return None
 
-    def readStlFile(self, filepath):
-        """读取STL文件，输入文件路径"""
+    def readStlFile(self, filepath, mapped=False):
+        """读取STL文件，输入文件路径；mapped=True 时二进制文件以内存映射方式打开"""
+        with Profiler.span('read'):
+            return self._readStlFile(filepath, mapped)
+
+    def _readStlFile(self, filepath, mapped):
         print(f"尝试读取文件: {filepath}")
 
         # 首先检测文件格式
         file_type = self._detectStlFormat(filepath)
         print(f"检测到文件格式: {file_type}")
 
-        if file_type == "binary":
+        if file_type == "binary" and mapped:
+            return self.mapStlFile(filepath)
+        elif file_type == "binary":
             success = self._readStlFileBinary(filepath)
             if success:
-                print(f"二进制读取成功，三角形数量: {len(self.triangles)}")
+                print(f"二进制读取成功，三角形数量: {self.getFacetNumber()}")
             else:
                 print("二进制读取失败，尝试文本格式")
                 success = self._readStlFileText(filepath)
                 if success:
-                    print(f"文本读取成功，三角形数量: {len(self.triangles)}")
+                    print(f"文本读取成功，三角形数量: {self.getFacetNumber()}")
             return success
         elif file_type == "ascii":
             success = self._readStlFileText(filepath)
             if success:
-                print(f"文本读取成功，三角形数量: {len(self.triangles)}")
+                print(f"文本读取成功，三角形数量: {self.getFacetNumber()}")
             else:
                 print("文本读取失败，尝试二进制格式")
                 success = self._readStlFileBinary(filepath)
                 if success:
-                    print(f"二进制读取成功，三角形数量: {len(self.triangles)}")
+                    print(f"二进制读取成功，三角形数量: {self.getFacetNumber()}")
             return success
         else:
             # 如果无法确定，先尝试文本格式，再尝试二进制格式
             success = self._readStlFileText(filepath)
             if success:
-                print(f"文本读取成功，三角形数量: {len(self.triangles)}")
+                print(f"文本读取成功，三角形数量: {self.getFacetNumber()}")
                 return True
             success = self._readStlFileBinary(filepath)
             if success:
-                print(f"二进制读取成功，三角形数量: {len(self.triangles)}")
+                print(f"二进制读取成功，三角形数量: {self.getFacetNumber()}")
             return success
 
     def _detectStlFormat(self, filepath):
@@ -134,89 +309,61 @@ class StlModel:
             return "unknown"
 
     def _readStlFileText(self, filepath):
-        """读取文本STL文件"""
+        """读取文本STL文件（按字节流分块单遍解析，顶点直接写入预分配数组）"""
         try:
-            # 尝试多种编码
-            encodings = ['utf-8', 'latin-1', 'cp1252', 'gbk', 'ascii']
+            t0 = time.perf_counter()
+            file_size = os.path.getsize(filepath)
 
-            for encoding in encodings:
-                try:
-                    print(f"尝试使用编码 {encoding} 读取文本STL")
-                    with open(filepath, 'r', encoding=encoding) as f:
-                        content = f.read()
-
-                    lines = content.splitlines()
-                    self.triangles = []
-
-                    i = 0
-                    triangle_count = 0
-                    while i < len(lines):
-                        line = lines[i].strip()
-                        i += 1
-
-                        if 'facet normal' in line.lower():
-                            # 读取法向量
-                            coords = self.getCoords(line)
-                            if coords:
-                                N = Vector3D(coords[0], coords[1], coords[2])
-                            else:
-                                N = Vector3D(0, 0, 0)
-
-                            # 寻找 "outer loop"
-                            found_outer = False
-                            while i < len(lines) and not found_outer:
-                                if 'outer loop' in lines[i].lower():
-                                    found_outer = True
-                                i += 1
-
-                            if not found_outer:
-                                continue
-
-                            # 读取三个顶点
-                            vertices = []
-                            vertices_read = 0
-                            while i < len(lines) and vertices_read < 3:
-                                vertex_line = lines[i].strip()
-                                i += 1
-                                if 'vertex' in vertex_line.lower():
-                                    vertex_coords = self.getCoords(vertex_line)
-                                    if vertex_coords:
-                                        vertex = Point3D(vertex_coords[0], vertex_coords[1], vertex_coords[2])
-                                        # 检查坐标是否合理
-                                        if self._isReasonableCoordinate(vertex):
-                                            vertices.append(vertex)
-                                            vertices_read += 1
-                                        else:
-                                            print(f"警告: 发现不合理的坐标: {vertex}")
-
-                            # 创建三角形
-                            if len(vertices) == 3:
-                                triangle = Triangle(vertices[0], vertices[1], vertices[2], N)
-                                self.triangles.append(triangle)
-                                triangle_count += 1
-
-                            # 寻找 "endfacet"
-                            found_endfacet = False
-                            while i < len(lines) and not found_endfacet:
-                                if 'endfacet' in lines[i].lower():
-                                    found_endfacet = True
-                                i += 1
-
-                    print(f"使用编码 {encoding} 读取到 {triangle_count} 个三角形")
-
-                    if len(self.triangles) > 0:
-                        self._calculateBounds()
-                        return True
-
-                except UnicodeDecodeError:
-                    print(f"编码 {encoding} 解码错误")
-                    continue
-                except Exception as e:
-                    print(f"文本格式读取失败 (编码 {encoding}): {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+            # 按文件大小预估面片数，不足时倍增扩容
+            capacity = max(16, file_size // ASCII_FACET_BYTES)
+            vertices = np.empty((capacity, 3, 3))
+            normals = np.empty((capacity, 3))
+            valid = np.empty(capacity, dtype=bool)
+            n = 0
+
+            with open(filepath, 'rb') as f:
+                rest = b''
+                while True:
+                    data = f.read(ASCII_CHUNK_BYTES)
+                    buf = (rest + data).lower()
+                    if data:
+                        # 只解析到最后一个 endfacet 之后（不要求后面有换行），剩余部分并入下一块；
+                        # 没有完整面片时只保留最后一个面片的开头部分，剩余部分的长度不会随块数增长
+                        cut = buf.rfind(b'endfacet')
+                        if cut >= 0:
+                            cut += len(b'endfacet')
+                        else:
+                            cut = buf.rfind(b'facet')
+                            if cut < 0:
+                                cut = max(0, len(buf) - len(b'facet'))
+                        buf, rest = buf[:cut], buf[cut:]
+
+                    chunkN, chunkV, chunkOk = self._parseAsciiChunk(buf)
+                    k = len(chunkN)
+                    if n + k > capacity:
+                        capacity = max(n + k, capacity * 2)
+                        vertices = np.resize(vertices, (capacity, 3, 3))
+                        normals = np.resize(normals, (capacity, 3))
+                        valid = np.resize(valid, capacity)
+                    normals[n:n + k] = chunkN
+                    vertices[n:n + k] = chunkV
+                    valid[n:n + k] = chunkOk
+                    n += k
+                    if not data:
+                        break
+
+            valid = valid[:n] & self._reasonableMask(vertices[:n]).all(axis=1)
+            triangle_count = int(np.count_nonzero(valid))
+            if triangle_count < n:
+                print(f"警告: 忽略了 {n - triangle_count} 个不完整或坐标不合理的面片")
+
+            dt = max(time.perf_counter() - t0, 1e-9)
+            mb = file_size / (1024 * 1024)
+            print(f"文本STL解析: {triangle_count} 个三角形, {mb:.2f} MB, {dt:.3f} 秒, {mb / dt:.1f} MB/s")
 
+            if triangle_count > 0:
+                self.setFacets(vertices[:n][valid], normals[:n][valid])
+                return True
             return False
 
         except Exception as ex:
@@ -225,86 +372,100 @@ class StlModel:
             traceback.print_exc()
             return False
 
+    def _parseAsciiChunk(self, buf):
+        """解析一块只包含完整面片的小写文本，返回 (法向量, 顶点, 面片是否完整)"""
+        start = buf.find(b'facet')
+        if start < 0:
+            return np.empty((0, 3)), np.empty((0, 3, 3)), np.empty(0, dtype=bool)
+
+        # 快速路径：去掉关键字后剩余的全是数字，每个面片正好12个数
+        body = buf[start:]
+        end = body.rfind(b'endfacet')
+        body = body[:end + 8]
+        for keyword in _STL_KEYWORDS:
+            body = body.replace(keyword, b' ')
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                vals = np.fromstring(body, sep=' ')
+            if len(vals) == 12 * buf.count(b'endfacet'):
+                vals = vals.reshape(-1, 12)
+                return vals[:, :3], vals[:, 3:].reshape(-1, 3, 3), np.ones(len(vals), dtype=bool)
+        except (ValueError, DeprecationWarning):
+            pass
+
+        # 慢速路径：格式不规整（缺少顶点、多个 solid 等）时逐记录匹配
+        records = _STL_RECORD_RE.findall(buf)
+        if not records:
+            return np.empty((0, 3)), np.empty((0, 3, 3)), np.empty(0, dtype=bool)
+        rec = np.array(records)
+        isNormal = rec[:, 0].astype('S1') == b'f'
+        xyz = self._parseFloats(rec[:, 1:])
+        fidx = np.cumsum(isNormal) - 1
+        k = int(fidx[-1]) + 1
+
+        normals = np.zeros((k, 3))
+        vertices = np.zeros((k, 3, 3))
+        normals[fidx[isNormal]] = xyz[isNormal]
+
+        # 顶点在所属面片内的序号 = 组内排名
+        vf, vxyz = fidx[~isNormal], xyz[~isNormal]
+        inFacet = vf >= 0
+        vf, vxyz = vf[inFacet], vxyz[inFacet]
+        rank = np.arange(len(vf)) - np.searchsorted(vf, vf, 'left')
+        ok = rank < 3
+        vertices[vf[ok], rank[ok]] = vxyz[ok]
+        return normals, vertices, np.bincount(vf, minlength=k) == 3
+
+    @staticmethod
+    def _parseFloats(tokens):
+        """将字节串坐标数组转为浮点数，无法解析的记为 NaN"""
+        try:
+            return tokens.astype(np.float64)
+        except ValueError:
+            out = np.empty(tokens.shape)
+            for idx, tok in np.ndenumerate(tokens):
+                try:
+                    out[idx] = float(tok)
+                except ValueError:
+                    out[idx] = np.nan
+            return out
+
     def _readStlFileBinary(self, filepath):
-        """读取二进制STL文件"""
+        """读取二进制STL文件（整体读入结构化数组，向量化校验）"""
         try:
+            file_size = os.path.getsize(filepath)
             with open(filepath, 'rb') as f:
-                # 跳过80字节的头文件
-                header = f.read(80)
+                # 80字节的头文件 + 4字节三角形数量
+                header = f.read(84)
+            if len(header) < 84:
+                return False
 
-                # 读取三角形数量
-                num_triangles_data = f.read(4)
-                if len(num_triangles_data) < 4:
-                    return False
+            num_triangles = struct.unpack('<I', header[80:84])[0]
 
-                # 尝试小端和大端字节序
-                try:
-                    num_triangles = struct.unpack('<I', num_triangles_data)[0]
-                except:
-                    num_triangles = struct.unpack('>I', num_triangles_data)[0]
+            # 验证三角形数量是否合理
+            expected_size = 84 + num_triangles * STL_FACET_DTYPE.itemsize
 
-                # 验证三角形数量是否合理
-                file_size = os.path.getsize(filepath)
-                expected_size = 84 + num_triangles * 50
+            print(
+                f"二进制STL - 三角形数量: {num_triangles}, 期望文件大小: {expected_size}, 实际文件大小: {file_size}")
 
-                print(
-                    f"二进制STL - 三角形数量: {num_triangles}, 期望文件大小: {expected_size}, 实际文件大小: {file_size}")
+            if abs(expected_size - file_size) > 100:  # 允许100字节的误差
+                print(f"警告: 文件大小不匹配，可能不是有效的二进制STL文件")
+                # 但仍然尝试读取
 
-                if abs(expected_size - file_size) > 100:  # 允许100字节的误差
-                    print(f"警告: 文件大小不匹配，可能不是有效的二进制STL文件")
-                    # 但仍然尝试读取
+            # 文件被截断时只读取完整的面片记录
+            count = min(num_triangles, (file_size - 84) // STL_FACET_DTYPE.itemsize)
+            facets = np.fromfile(filepath, dtype=STL_FACET_DTYPE, count=count, offset=84)
 
-                self.triangles = []
-                valid_triangles = 0
+            vertices, valid = self._validateFacets(facets)
+            valid_triangles = int(np.count_nonzero(valid))
+            print(f"成功读取的三角形数量: {valid_triangles}")
 
-                for i in range(num_triangles):
-                    # 读取法向量（12字节）
-                    normal_data = f.read(12)
-                    if len(normal_data) < 12:
-                        break
-
-                    # 尝试小端和大端字节序读取顶点
-                    vertices = []
-                    valid_vertices = 0
-
-                    for j in range(3):
-                        vertex_data = f.read(12)
-                        if len(vertex_data) < 12:
-                            break
-
-                        # 尝试小端字节序
-                        try:
-                            x, y, z = struct.unpack('<3f', vertex_data)
-                            vertex = Point3D(x, y, z)
-                            if self._isReasonableCoordinate(vertex):
-                                vertices.append(vertex)
-                                valid_vertices += 1
-                            else:
-                                # 尝试大端字节序
-                                x, y, z = struct.unpack('>3f', vertex_data)
-                                vertex = Point3D(x, y, z)
-                                if self._isReasonableCoordinate(vertex):
-                                    vertices.append(vertex)
-                                    valid_vertices += 1
-                        except:
-                            continue
-
-                    # 跳过属性字节计数（2字节）
-                    f.read(2)
-
-                    # 创建三角形
-                    if len(vertices) == 3:
-                        triangle = Triangle(vertices[0], vertices[1], vertices[2])
-                        self.triangles.append(triangle)
-                        valid_triangles += 1
-
-                print(f"成功读取的三角形数量: {valid_triangles}")
-
-                if valid_triangles > 0:
-                    self._calculateBounds()
-                    return True
-                else:
-                    return False
+            if valid_triangles > 0:
+                self.setFacets(vertices[valid], facets['normal'][valid])
+                return True
+            else:
+                return False
 
         except Exception as ex:
             print(f"读取二进制STL文件时出错: {ex}")
@@ -312,16 +473,24 @@ class StlModel:
             traceback.print_exc()
             return False
 
-    def _isReasonableCoordinate(self, point):
-        """检查坐标是否合理（避免天文数字）"""
-        # 合理的3D打印模型坐标通常在 -1000 到 1000 mm 范围内
-        reasonable_range = 10000.0  # 10米范围应该足够大了
-        return (abs(point.x) < reasonable_range and
-                abs(point.y) < reasonable_range and
-                abs(point.z) < reasonable_range and
-                not math.isnan(point.x) and not math.isinf(point.x) and
-                not math.isnan(point.y) and not math.isinf(point.y) and
-                not math.isnan(point.z) and not math.isinf(point.z))
+    @staticmethod
+    def _reasonableMask(vertices):
+        """向量化的坐标合理性检查，返回每个顶点是否合理"""
+        with np.errstate(invalid='ignore'):
+            return (np.isfinite(vertices) & (np.abs(vertices) < REASONABLE_RANGE)).all(axis=-1)
+
+    def _validateFacets(self, facets):
+        """校验面片顶点：小端不合理时尝试大端解释，返回 (顶点数组, 有效面片掩码)"""
+        raw = facets['vertices']
+        vertices = raw.astype(np.float64)
+        ok = self._reasonableMask(vertices)
+        if not ok.all():
+            with np.errstate(invalid='ignore', over='ignore'):
+                swapped = raw.byteswap().astype(np.float64)
+            use_swapped = ~ok & self._reasonableMask(swapped)
+            vertices[use_swapped] = swapped[use_swapped]
+            ok |= use_swapped
+        return vertices, ok.all(axis=1)
 
     def extractFromVtkStlReader(self, vtkStlReader):
         """从VTK Reader提取数据 """
@@ -379,6 +548,29 @@ class StlModel:
     def multiplied(self, m):
         """根据矩阵进行几何变换"""
         model = StlModel()
+        if self._facets is not None:
+            # 映射模式：共享映射缓冲区，仅组合变换矩阵，访问面片时再计算
+            model._facets = self._facets
+            model._vertices, model._normals = self._vertices, self._normals
+            mat = np.array(m.a, dtype=np.float64)
+            model._matrix = mat if self._matrix is None else self._matrix @ mat
+            model._calculateBounds()
+            return model
+
+        if self._triangles is None and self._vertices is not None:
+            # 数组模式：按 Point3D/Vector3D.multiplied 相同的运算顺序逐分量计算
+            a = m.a
+            v, n = self._vertices, self._normals
+            vx, vy, vz = v[..., 0], v[..., 1], v[..., 2]
+            nx, ny, nz = n[..., 0], n[..., 1], n[..., 2]
+            newV = np.empty_like(v)
+            newN = np.empty_like(n)
+            for k in range(3):
+                newV[..., k] = vx * a[0][k] + vy * a[1][k] + vz * a[2][k] + a[3][k]
+                newN[..., k] = nx * a[0][k] + ny * a[1][k] + nz * a[2][k]
+            model.setFacets(newV, newN)
+            return model
+
         for t in self.triangles:
             # 变换三角形顶点和法向量
             newA = t.A.multiplied(m)
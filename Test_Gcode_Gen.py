@@ -62,6 +62,7 @@ original_init = Point3D.__init__
 
 def new_init(self, x=0.0, y=0.0, z=0.0, w=1.0):
     self.x, self.y, self.z, self.w = x, y, z, w
+    self.travel = 0
 
 
 Point3D.__init__ = new_init
@@ -186,7 +187,7 @@ class GCodeGenerator:
             prev = poly.point(i - 1)
 
             is_travel = False
-            if hasattr(prev, 'w') and abs(prev.w - 1.0) < 1e-5:
+            if prev.travel:
                 is_travel = True
 
             if is_travel:
@@ -5,7 +5,7 @@ import vtk
 sys.path.append('.')
 
 try:
-    from SliceAlgo import readSlcFile
+    from SlcReader import SlcReader
     from VtkAdaptor import VtkAdaptor
     from GeomBase import *
 except ImportError as e:
@@ -18,12 +18,17 @@ class HollowingViewer:
         self.slc_path = slc_path
 
         print(f"正在读取: {slc_path}")
-        self.layers = readSlcFile(slc_path)
-        if not self.layers:
-            print("读取失败或文件为空")
+        # 按层索引随机访问，只在需要显示时解析对应的层
+        try:
+            self.reader = SlcReader(slc_path)
+        except (OSError, ValueError) as ex:
+            print("读取失败或文件为空:", ex)
             sys.exit(1)
 
-        self.total = len(self.layers)
+        self.total = len(self.reader)
+        if self.total == 0:
+            print("读取失败或文件为空")
+            sys.exit(1)
 
         self.va = VtkAdaptor()
         self.va.setBackgroundColor(1.0, 1.0, 1.0)  # 白色背景
@@ -32,8 +37,7 @@ class HollowingViewer:
         self.idx = min(int(self.total * 0.4), self.total - 1)
         self.mode = "SINGLE"
 
-        self.actors = []
-        self._init_actors()
+        self.actors = [None] * self.total  # 各层显示对象，首次显示时创建
 
         self.va.interactor.AddObserver("KeyPressEvent", self.on_key)
 
@@ -51,51 +55,54 @@ class HollowingViewer:
         self._update(reset_camera=True)
         self.va.display()
 
-    def _init_actors(self):
-        print("正在构建显示对象...")
-        for i in range(self.total):
-            layer = self.layers[i]
-            z = layer.z
-            group = []
-
-            if layer.contours:
-                for poly in layer.contours:
-                    # 判断顺逆时针 (内孔/外壁)
-                    is_inner = not poly.isCCW()
-
-                    # 转换为VTK
-                    pts = vtk.vtkPoints()
-                    lines = vtk.vtkCellArray()
-                    lines.InsertNextCell(poly.count() + 1)
-                    for j in range(poly.count()):
-                        p = poly.point(j)
-                        pts.InsertNextPoint(p.x, p.y, z)  # 使用真实Z高度
-                        lines.InsertCellPoint(j)
-                    lines.InsertCellPoint(0)  # 闭合
-
-                    pd = vtk.vtkPolyData()
-                    pd.SetPoints(pts);
-                    pd.SetLines(lines)
-                    map = vtk.vtkPolyDataMapper()
-                    map.SetInputData(pd)
-                    act = vtk.vtkActor()
-                    act.SetMapper(map)
-
-                    if is_inner:
-                        # 内壁 -> 红色，加粗
-                        act.GetProperty().SetColor(1, 0, 0)
-                        act.GetProperty().SetLineWidth(2)
-                    else:
-                        # 外壳 -> 蓝色
-                        act.GetProperty().SetColor(0, 0, 1)
-                        act.GetProperty().SetOpacity(0.5)
-                        act.GetProperty().SetLineWidth(1)
-
-                    act.SetVisibility(False)
-                    self.va.renderer.AddActor(act)
-                    group.append(act)
-
-            self.actors.append(group)
+    def _layer_actors(self, i):
+        """第 i 层的显示对象，首次访问时读取该层并创建"""
+        if self.actors[i] is None:
+            self.actors[i] = self._build_actors(self.reader.layer(i))
+        return self.actors[i]
+
+    def _build_actors(self, layer):
+        z = layer.z
+        group = []
+
+        if layer.contours:
+            for poly in layer.contours:
+                # 判断顺逆时针 (内孔/外壁)
+                is_inner = not poly.isCCW()
+
+                # 转换为VTK
+                pts = vtk.vtkPoints()
+                lines = vtk.vtkCellArray()
+                lines.InsertNextCell(poly.count() + 1)
+                for j in range(poly.count()):
+                    p = poly.point(j)
+                    pts.InsertNextPoint(p.x, p.y, z)  # 使用真实Z高度
+                    lines.InsertCellPoint(j)
+                lines.InsertCellPoint(0)  # 闭合
+
+                pd = vtk.vtkPolyData()
+                pd.SetPoints(pts);
+                pd.SetLines(lines)
+                map = vtk.vtkPolyDataMapper()
+                map.SetInputData(pd)
+                act = vtk.vtkActor()
+                act.SetMapper(map)
+
+                if is_inner:
+                    # 内壁 -> 红色，加粗
+                    act.GetProperty().SetColor(1, 0, 0)
+                    act.GetProperty().SetLineWidth(2)
+                else:
+                    # 外壳 -> 蓝色
+                    act.GetProperty().SetColor(0, 0, 1)
+                    act.GetProperty().SetOpacity(0.5)
+                    act.GetProperty().SetLineWidth(1)
+
+                act.SetVisibility(False)
+                self.va.renderer.AddActor(act)
+                group.append(act)
+
+        return group
 
     def on_key(self, obj, event):
         key = obj.GetKeySym()
@@ -125,8 +132,14 @@ class HollowingViewer:
     def _update(self, reset_camera=False):
         # 1. 切换可见性
         has_visible_actor = False
+        if self.mode == "ALL" and None in self.actors:
+            print("正在构建显示对象...")
         for i, g in enumerate(self.actors):
             vis = (self.mode == "ALL") or (i == self.idx)
+            if vis:
+                g = self._layer_actors(i)
+            elif g is None:
+                continue
             for a in g:
                 a.SetVisibility(vis)
                 if vis: has_visible_actor = True
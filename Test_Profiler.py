@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.append('.')
+
+from StlModel import StlModel
+from GenNcCode import PrintParams, writeNcCode
+from Profiler import profiling
+
+
+def profile_job(stl_path, layerThk=0.5, sptOn=False, cprofile=False, memory=False):
+    """对一次完整的切片-路径-G代码流程做性能分析，报告写在 G 代码旁边"""
+    name = os.path.splitext(os.path.basename(stl_path))[0]
+    out_dir = "./output"
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, name)
+
+    with profiling(name, cprofile, memory, jsonPath=base + "_profile.json", csvPath=base + "_layers.csv") as prof:
+        stlModel = StlModel()
+        if not stlModel.readStlFile(stl_path):
+            print(f"读取失败: {stl_path}")
+            return None
+        pp = PrintParams(stlModel)
+        pp.layerThk = layerThk
+        pp.sptOn = sptOn
+        writeNcCode(pp, base + ".gcode")
+
+    prof.printSummary()
+    print(f"报告已保存: {base}_profile.json, {base}_layers.csv")
+    return prof
+
+
+if __name__ == '__main__':
+    stl_file = sys.argv[1] if len(sys.argv) > 1 else "./STL/multiEnds.STL"
+    if not os.path.exists(stl_file):
+        print(f"错误：找不到 {stl_file}")
+    else:
+        profile_job(stl_file, cprofile='--cprofile' in sys.argv, memory='--memory' in sys.argv)
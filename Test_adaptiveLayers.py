@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from StlModel import StlModel
+from AdaptiveLayers import genAdaptiveHeights, layerThicknesses
+from SliceAlgo import slice_combine
+
+
+def boxFacets(x0, y0, z0, x1, y1, z1):
+    """长方体的12个三角面片"""
+    p = [(x, y, z) for z in (z0, z1) for y in (y0, y1) for x in (x0, x1)]
+    quads = [(0, 2, 3, 1), (4, 5, 7, 6), (0, 1, 5, 4), (2, 6, 7, 3), (0, 4, 6, 2), (1, 3, 7, 5)]
+    return [[p[a], p[b], p[c]] for q in quads for a, b, c in ((q[0], q[1], q[2]), (q[0], q[2], q[3]))]
+
+
+def steppedModel(stepZ=3.37, topZ=6.0):
+    """底座 20x20 顶面在 stepZ，上面叠一个 10x10 的方柱到 topZ；
+    旁边的四面体有一个接近水平的面（1.0 到 1.2 之间），要求最小层厚"""
+    facets = boxFacets(0, 0, 0, 20, 20, stepZ) + boxFacets(5, 5, stepZ, 15, 15, topZ)
+    a, b, c, d = (30, 0, 1.0), (40, 0, 1.2), (30, 10, 1.0), (30, 0, 0.9)
+    facets += [[a, b, c], [a, d, b], [a, c, d], [b, d, c]]
+    stlModel = StlModel()
+    stlModel.setFacets(np.array(facets, dtype=np.float64))
+    return stlModel
+
+
+@pytest.mark.parametrize("stepZ", [3.37, 3.05, 2.0])
+def test_flatFaceIsLayerBoundary(stepZ):
+    """内部水平面正下方一定是层面，且各层层厚都在 [minThk, maxThk] 内"""
+    stlModel = steppedModel(stepZ)
+    minThk, maxThk = 0.1, 0.4
+    zs = genAdaptiveHeights(stlModel, minThk, maxThk, 0.05)
+    assert any(stepZ - 1e-3 < z < stepZ for z in zs)
+    assert zs == sorted(zs) and zs[-1] < stlModel.zMax
+    thks = layerThicknesses(zs, stlModel.zMin)
+    assert min(thks) >= minThk - 1e-9
+    assert max(thks) <= maxThk + 1e-9
+
+
+def stackedModel(tops):
+    """逐级收窄的方柱叠在一起，各级顶面高度为 tops，每级顶面都是内部水平面（最后一级为模型顶面）"""
+    facets, z0 = [], 0.0
+    for i, z1 in enumerate(tops):
+        facets += boxFacets(i, i, z0, 20 - i, 20 - i, z1)
+        z0 = z1
+    stlModel = StlModel()
+    stlModel.setFacets(np.array(facets, dtype=np.float64))
+    return stlModel
+
+
+@pytest.mark.parametrize("tops, minThk, maxThk, kept", [
+    ([3.0, 3.03, 6.0], 0.1, 0.4, 3.0),  # 两个水平面相距不足 minThk
+    ([0.05, 3.37, 6.0], 0.1, 0.4, 3.37),  # 第一个水平面离底面不足 minThk
+    ([3.0, 3.12, 3.3, 6.0], 0.1, 0.15, 3.0),  # maxThk < 2 * minThk
+    ([1.0, 1.17, 1.2, 2.29, 2.31, 4.0], 0.1, 0.15, 1.0),
+])
+def test_closeFlatFacesKeepThicknessLimits(tops, minThk, maxThk, kept):
+    """水平面之间或离底面的距离不足 minThk 时，层厚仍在 [minThk, maxThk] 内"""
+    stlModel = stackedModel(tops)
+    zs = genAdaptiveHeights(stlModel, minThk, maxThk, 0.05)
+    thks = layerThicknesses(zs, stlModel.zMin)
+    assert min(thks) >= minThk - 1e-9
+    assert max(thks) <= maxThk + 1e-9
+    # 离上一个层面不小于 minThk 的水平面仍是层面
+    assert any(kept - 1e-3 < z < kept for z in zs)
+
+
+def test_randomFlatFacesKeepThicknessLimits():
+    rnd = np.random.default_rng(5)
+    for minThk, maxThk in [(0.1, 0.4), (0.1, 0.15), (0.2, 0.3)]:
+        for _ in range(20):
+            tops = np.cumsum(rnd.uniform(0.01, 0.5, 12)).tolist()
+            zs = genAdaptiveHeights(stackedModel(tops), minThk, maxThk, 0.05)
+            thks = layerThicknesses(zs, 0.0)
+            assert min(thks) >= minThk - 1e-9
+            assert max(thks) <= maxThk + 1e-9
+
+
+def test_nearlyFlatFaceUsesMinThickness():
+    """接近水平的斜面覆盖的高度范围内取最小层厚"""
+    stlModel = steppedModel()
+    zs = genAdaptiveHeights(stlModel, 0.1, 0.4, 0.05)
+    thks = layerThicknesses(zs, stlModel.zMin)
+    inSlope = [t for z, t in zip(zs, thks) if z > 1.0 and z - t < 1.2]
+    assert inSlope and max(inSlope) == pytest.approx(0.1)
+
+
+def test_layerBelowFlatFaceHasLowerSection():
+    """水平面下方的层面切出底座的截面，上方的层切出方柱的截面"""
+    stlModel = steppedModel()
+    zs = genAdaptiveHeights(stlModel, 0.1, 0.4, 0.05)
+    i = min(range(len(zs)), key=lambda j: abs(zs[j] - 3.37))
+    layers = slice_combine(stlModel, 0.1, zs[i:i + 2])
+    assert sum(abs(c.getArea()) for c in layers[0].contours) == pytest.approx(400.0)
+    assert sum(abs(c.getArea()) for c in layers[1].contours) == pytest.approx(100.0)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,86 @@
+import math
+import numpy as np
+import pytest
+from GeomBase import Point3D, Vector3D, Matrix3D
+from Polyline import Polyline, ArrayPolyline, polylineToArray, arrayToPolyline
+from GenNcCode import PrintParams, pathToCode
+
+
+def square(cls, size=10.0, z=0.2):
+    poly = cls()
+    for x, y in [(0, 0), (size, 0), (size, size), (0, size), (0, 0)]:
+        poly.addPoint(Point3D(x, y, z))
+    return poly
+
+
+def test_arrayPolylineExtrudes():
+    """默认空走标记为0，数组多段线的每一段都挤出"""
+    pp = PrintParams(None)
+    code, e = pathToCode(square(ArrayPolyline), pp, 0.0, 0.01)
+    lines = code.splitlines()
+    assert lines[0].startswith("G0 ")
+    assert all(line.startswith("G1 ") for line in lines[1:])
+    assert len(lines) == 5
+    assert e == pytest.approx(40.0 * 0.01)
+
+
+def test_travelFlagMarksTravelMove():
+    pp = PrintParams(None)
+    for cls in (Polyline, ArrayPolyline):
+        poly = square(cls)
+        poly.setFlag(1, 1)  # 第2点到第3点为空走
+        code, e = pathToCode(poly, pp, 0.0, 0.01)
+        kinds = [line.split()[0] for line in code.splitlines()]
+        assert kinds == ["G0", "G1", "G0", "G1", "G1"]
+        assert e == pytest.approx(30.0 * 0.01)
+
+
+def test_flagIndependentOfHomogeneousW():
+    """变换按齐次坐标 w=1 计算平移，空走标记保持不变"""
+    m = Matrix3D.createTranslateMatrix(1.0, 2.0, 3.0)
+    for cls in (Polyline, ArrayPolyline):
+        poly = square(cls)
+        poly.setFlag(2, 1)
+        moved = poly.multiplied(m)
+        assert [moved.flag(i) for i in range(moved.count())] == [0, 0, 1, 0, 0]
+        pt = moved.point(1)
+        assert (pt.x, pt.y, pt.z) == pytest.approx((11.0, 2.0, 3.2))
+
+
+def test_arrayRoundTripKeepsFlags():
+    poly = square(Polyline)
+    poly.setFlag(3, 1)
+    arr = polylineToArray(poly)
+    assert arr[:, 3].tolist() == [0, 0, 0, 1, 0]
+    back = arrayToPolyline(arr)
+    assert [back.flag(i) for i in range(back.count())] == [0, 0, 0, 1, 0]
+    assert [p.w for p in back.points] == [1.0] * 5
+    arrPoly = ArrayPolyline.fromPolyline(poly)
+    assert arrPoly.flags.tolist() == [0, 0, 0, 1, 0]
+    assert polylineToArray(arrPoly.toPolyline()).tolist() == arr.tolist()
+
+
+def test_arrayPolylinePointsAreReadOnly():
+    """ArrayPolyline.points 是由数组生成的只读 Point3D 元组，追加或赋值直接报错"""
+    poly = square(ArrayPolyline)
+    poly.setFlag(-1, 1)
+    pts = poly.points
+    assert isinstance(pts, tuple)
+    assert [(p.x, p.y, p.z, p.travel) for p in pts] == [tuple(row) for row in polylineToArray(poly).tolist()]
+    with pytest.raises(AttributeError):
+        pts.append(Point3D(1, 1, 1))
+    with pytest.raises(TypeError):
+        pts[0] = Point3D(1, 1, 1)
+    with pytest.raises(AttributeError):
+        poly.points = []
+    assert poly.flag(4) == 1 and poly.point(4).travel == 1
+
+
+def test_arrayPolylineNoCopy():
+    xyz = np.zeros((3, 3))
+    assert np.shares_memory(ArrayPolyline(xyz, copy=False).xyz, xyz)
+    assert not np.shares_memory(ArrayPolyline(xyz).xyz, xyz)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,139 @@
+import io
+import os
+import random
+import tempfile
+import pytest
+from GeomBase import Point3D
+from Polyline import Polyline, ArrayPolyline
+from Layer import Layer
+from StlModel import StlModel
+import SliceAlgo
+from GenNcCode import PrintParams, GCodeWriter, pathToCode, genAllPaths, postProcess, writeNcCode
+
+STL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "STL")
+
+
+def referencePathToCode(path, pp, e, e_per_mm):
+    """逐点实现（批量格式化之前的写法），前一点空走标记非0时为空走"""
+    code = ""
+    for i in range(path.count()):
+        p = path.point(i)
+        if i == 0:
+            code += "G0 F%d X%.3f Y%.3f Z%.3f\n" % (pp.g0Speed, p.x, p.y, p.z)
+        else:
+            prev = path.point(i - 1)
+            if prev.travel:
+                code += "G0 F%d X%.3f Y%.3f\n" % (pp.g0Speed, p.x, p.y)
+            else:
+                e += p.distance(prev) * e_per_mm
+                code += "G1 F%d X%.3f Y%.3f E%.5f\n" % (pp.g1Speed, p.x, p.y, e)
+    return code, e
+
+
+def referenceProgram(layers, pp):
+    """逐层逐点生成完整程序，挤出量按各层层厚计算"""
+    filament_area = 3.141592653589793 * (pp.filamentSize / 2) ** 2
+    code, e = pp.startCode, 0.0
+    for i, layer in enumerate(layers):
+        code += "; Layer %d Z=%.3f\n" % (i, layer.z)
+        thk = getattr(layer, 'thk', None)
+        e_per_mm = pp.nozzleSize * (thk if thk is not None else pp.layerThk) / filament_area
+        paths = getattr(layer, 'sptCpPaths', []) + getattr(layer, 'sptDpPaths', []) + \
+            layer.cpPaths + layer.ffPaths + layer.sfPaths
+        for path in paths:
+            block, e = referencePathToCode(path, pp, e, e_per_mm)
+            code += block
+    return code + pp.endCode
+
+
+def randomPath(rnd, cls, n, z):
+    path = cls()
+    for i in range(n):
+        pt = Point3D(rnd.uniform(-50, 50), rnd.uniform(-50, 50), z)
+        pt.travel = 1 if rnd.random() < 0.2 else 0
+        path.addPoint(pt)
+    return path
+
+
+def test_pathToCodeMatchesReference():
+    """随机路径（含空走标记）的批量格式化与逐点累加的输出逐字节相同"""
+    rnd = random.Random(7)
+    pp = PrintParams(None)
+    e = eRef = 0.0
+    for k in range(200):
+        cls = Polyline if k % 2 == 0 else ArrayPolyline
+        path = randomPath(rnd, cls, rnd.randint(1, 60), 0.2)
+        code, e = pathToCode(path, pp, e, 0.0333)
+        ref, eRef = referencePathToCode(path, pp, eRef, 0.0333)
+        assert code == ref
+        assert e == eRef
+    assert e > 0
+
+
+def test_writerUsesPerLayerThickness():
+    """自适应层厚：每层按本层层厚计算挤出量，E 在层间连续累加"""
+    rnd = random.Random(11)
+    pp = PrintParams(None)
+    layers = []
+    for i, thk in enumerate([0.1, 0.3, 0.15, None]):
+        layer = Layer(0.2 * (i + 1))
+        if thk is not None:
+            layer.thk = thk
+        layer.cpPaths = [randomPath(rnd, Polyline, 30, layer.z)]
+        layer.ffPaths = [randomPath(rnd, ArrayPolyline, 20, layer.z)]
+        layer.sfPaths = []
+        layers.append(layer)
+    sink = io.StringIO()
+    GCodeWriter(sink, pp).writeLayers(layers)
+    code = sink.getvalue()
+    assert code == referenceProgram(layers, pp)
+    assert code.count("\nG1 ") > 0
+
+
+@pytest.mark.parametrize("adaptive, sptOn", [(False, False), (True, False), (False, True)])
+def test_pipelineExtrudesAndMatchesReference(adaptive, sptOn):
+    """样例模型的完整流程：路径确有挤出段，流式写出与整体生成、逐点参考实现一致"""
+    stlModel = StlModel()
+    stlModel.readStlFile(os.path.join(STL_DIR, "multiEnds.STL"))
+    pp = PrintParams(stlModel)
+    pp.layerThk, pp.adaptive, pp.sptOn = 0.5, adaptive, sptOn
+    pp.minLayerThk, pp.maxLayerThk = 0.3, 0.6
+
+    layers = genAllPaths(pp)
+    code = postProcess(layers, pp)
+    assert code.count("\nG1 ") > 0
+    assert code == referenceProgram(layers, pp)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = writeNcCode(pp, os.path.join(tmp, "out.gcode"))
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == code
+
+
+def test_streamedPipelineSlicesOnce(monkeypatch):
+    """未设缓存目录时流式流程也只切片一遍，两遍扫描都读临时缓存，结束后删除临时文件"""
+    stlModel = StlModel()
+    stlModel.readStlFile(os.path.join(STL_DIR, "multiEnds.STL"))
+    pp = PrintParams(stlModel)
+    pp.layerThk = 1.0
+    expected = postProcess(genAllPaths(pp), pp)
+
+    calls = []
+    iterLayers = SliceAlgo.iter_layers
+
+    def countingIterLayers(*args, **kw):
+        calls.append(kw)
+        return iterLayers(*args, **kw)
+
+    monkeypatch.setattr(SliceAlgo, "iter_layers", countingIterLayers)
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.setattr(tempfile, "tempdir", tmp)
+        path = writeNcCode(pp, os.path.join(tmp, "out.gcode"))
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == expected
+        assert os.listdir(tmp) == ["out.gcode"]
+    assert calls == [{}]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
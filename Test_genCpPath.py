@@ -6,6 +6,7 @@ import vtk
 
 try:
     import GeomAlgo
+    from GeomBase import Vector3D
     from Segment import Segment
     from GenCpPath import GenCpPath
     from ClipperAdaptor import ClipperAdaptor
@@ -105,9 +106,9 @@ def patched_linkToParent(self, child):
 
     newPoly = Polyline()
     for i in range(iAtdMin + 1): newPoly.addPoint(parent.point(i).clone())
-    if newPoly.count() > 0: newPoly.points[-1].w = 1
+    if newPoly.count() > 0: newPoly.setFlag(newPoly.count() - 1, 1)
     for i in range(child.count()): newPoly.addPoint(child.point(i).clone())
-    if newPoly.count() > 0: newPoly.points[-1].w = 1
+    if newPoly.count() > 0: newPoly.setFlag(newPoly.count() - 1, 1)
     for i in range(iAtdMin, parent.count()): newPoly.addPoint(parent.point(i).clone())
     return newPoly
 
@@ -198,7 +199,7 @@ def show_clean_contours():
     # 1. 原始轮廓 (黑色加粗)
     for c in layer.contours:
         p = c.clone()
-        for pt in p.points: pt.z = 0  # 拍平
+        if p.count() > 0: p.translate(Vector3D(0, 0, -p.startPoint().z))  # 拍平（各层轮廓为平面曲线）
         act = va.drawPolyline(p)
         act.GetProperty().SetColor(0, 0, 0)
         act.GetProperty().SetLineWidth(3)
@@ -206,7 +207,7 @@ def show_clean_contours():
     # 2. 填充路径 (红色)
     for p in paths:
         draw_p = p.clone()
-        for pt in draw_p.points: pt.z = 0
+        if draw_p.count() > 0: draw_p.translate(Vector3D(0, 0, -draw_p.startPoint().z))
         act = va.drawPolyline(draw_p)
         act.GetProperty().SetColor(1, 0, 0)
         act.GetProperty().SetLineWidth(1.5)
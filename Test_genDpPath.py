@@ -2,6 +2,7 @@ import time
 import os
 import vtk
 from VtkAdaptor import VtkAdaptor
+from GeomBase import Vector3D
 from SliceAlgo import readSlcFile
 from GenDpPath import genDpPath
 from Utility import degToRad
@@ -58,7 +59,7 @@ class InteractiveViewer:
             if self.layers[i].contours:
                 for poly in self.layers[i].contours:
                     # 强制Z值
-                    for pt in poly.points: pt.z = z
+                    if poly.count() > 0: poly.translate(Vector3D(0, 0, z - poly.startPoint().z))
                     act = self.va.drawPolyline(poly)
                     act.GetProperty().SetColor(0, 0, 0)  # 黑色
                     act.GetProperty().SetLineWidth(1)
@@ -68,7 +69,7 @@ class InteractiveViewer:
             if i < len(self.pathses) and self.pathses[i]:
                 for path in self.pathses[i]:
                     # 强制Z值
-                    for pt in path.points: pt.z = z
+                    if path.count() > 0: path.translate(Vector3D(0, 0, z - path.startPoint().z))
                     act = self.va.drawPolyline(path)
                     act.GetProperty().SetColor(1, 0, 0)  # 红色
                     act.GetProperty().SetLineWidth(1.5)
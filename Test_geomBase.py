@@ -0,0 +1,61 @@
+import math
+import timeit
+import tracemalloc
+from GeomBase import *
+from Segment import Segment
+from GeomAlgo import distance, pointSegmentDistanceSquare
+
+
+class DictPoint3D:
+    """无 __slots__ 的旧式点类，仅用于对比"""
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def pointTo(self, other):
+        return Vector3D(other.x - self.x, other.y - self.y, other.z - self.z)
+
+    def distance(self, other):  # 旧实现：经由 pointTo 分配临时向量
+        return math.sqrt(self.pointTo(other).lengthSquare())
+
+
+def measureMemory(cls, n):
+    """创建 n 个对象的内存占用（字节）"""
+    tracemalloc.start()
+    objs = [cls(i, i, i) for i in range(n)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return current
+
+
+if __name__ == '__main__':
+    n = 100000
+    memOld = measureMemory(DictPoint3D, n)
+    memNew = measureMemory(Point3D, n)
+    print(f"{n} 个点内存: __dict__ {memOld / 1e6:.2f} MB, __slots__ {memNew / 1e6:.2f} MB, "
+          f"节省 {(1 - memNew / memOld) * 100:.0f}%")
+
+    p1, p2 = DictPoint3D(1, 2, 3), DictPoint3D(4, 6, 8)
+    q1, q2 = Point3D(1, 2, 3), Point3D(4, 6, 8)
+    tOld = timeit.timeit(lambda: p1.distance(p2), number=n)
+    tNew = timeit.timeit(lambda: q1.distance(q2), number=n)
+    tSq = timeit.timeit(lambda: q1.distanceSquare(q2), number=n)
+    print(f"distance x{n}: 旧 {tOld:.3f}s, 新 {tNew:.3f}s, distanceSquare {tSq:.3f}s")
+
+    v1, v2, out = Vector3D(1, 2, 3), Vector3D(4, 5, 6), Vector3D()
+    tOld = timeit.timeit(lambda: v1.crossProduct(v2), number=n)
+    tNew = timeit.timeit(lambda: v1.crossProductInto(v2, out), number=n)
+    print(f"叉积 x{n}: 新建对象 {tOld:.3f}s, 写入已有对象 {tNew:.3f}s")
+
+    seg = Segment(Point3D(0, 0, 0), Point3D(10, 3, 0))
+    q = Point3D(4, 5, 0)
+    tOld = timeit.timeit(lambda: distance(q, seg), number=n)
+    tNew = timeit.timeit(lambda: pointSegmentDistanceSquare(q, seg.A, seg.B), number=n)
+    print(f"点到线段距离 x{n}: distance {tOld:.3f}s, pointSegmentDistanceSquare {tNew:.3f}s")
+
+    tracemalloc.start()
+    for i in range(n):
+        q1.distanceSquare(q2)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"distanceSquare 峰值内存: {peak} 字节")
@@ -9,6 +9,7 @@ import LinkPoint
 try:
     from LinkSegs_dorder import LinkSegs_dorder
     from LinkSegs_dlook import LinkSegs_dlook
+    from LinkSegs_dhash import LinkSegs_dhash
 
 
     # 创建对应的包装函数
@@ -160,6 +161,20 @@ def test_stl_model(stl_file_path, layer_thk=1.0):
         else:
             print("跳过字典查询法 (未找到实现)")
 
+        # 空间哈希法
+        dhash_time = float('inf')
+        if OPTIMIZED_ALGOS_AVAILABLE:
+            print("空间哈希法测试...")
+            start_time = time.time()
+            try:
+                linker = LinkSegs_dhash(test_layer.segments)
+                dhash_time = time.time() - start_time
+                print(f"✓ 空间哈希法: {dhash_time:.3f}秒, 轮廓数: {len(linker.contours)}, 开放链: {linker.openCount}")
+            except Exception as e:
+                print(f"✗ 空间哈希法失败: {e}")
+        else:
+            print("跳过空间哈希法 (未找到实现)")
+
         # 暴力法（只在线段数较少时测试）
         brutal_time = float('inf')
         if len(test_layer.segments) <= 1000:  # 只在线段数较少时测试暴力法
@@ -181,6 +196,10 @@ def test_stl_model(stl_file_path, layer_thk=1.0):
             speedup = dorder_time / dlook_time
             print(f"字典查询法比字典序排序法快: {speedup:.2f}倍")
 
+        if dorder_time != float('inf') and dhash_time != float('inf') and dhash_time > 0:
+            speedup = dorder_time / dhash_time
+            print(f"空间哈希法比字典序排序法快: {speedup:.2f}倍")
+
         if brutal_time != float('inf') and dlook_time != float('inf') and dlook_time > 0:
             speedup = brutal_time / dlook_time
             print(f"字典查询法比暴力法快: {speedup:.2f}倍")
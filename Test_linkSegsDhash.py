@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from GeomBase import Point3D
+from Segment import Segment
+from LinkSegs_dhash import LinkSegs_dhash
+
+TOL = 1e-3
+
+
+def polygonSegs(corners, jitter=None):
+    """依次连接 corners 的封闭多边形线段；jitter(k) 返回第 k 个线段端点的偏移"""
+    segs = []
+    n = len(corners)
+    for i in range(n):
+        ends = []
+        for k, (x, y, z) in ((2 * i, corners[i]), (2 * i + 1, corners[(i + 1) % n])):
+            dx, dy, dz = (0.0, 0.0, 0.0) if jitter is None else jitter(k)
+            ends.append(Point3D(x + dx, y + dy, z + dz))
+        segs.append(Segment(ends[0], ends[1]))
+    return segs
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_jitteredEndpointsClose(seed):
+    """共享端点各自偏移不足容差的一半，仍拼成一个封闭轮廓，没有开放链"""
+    rnd = np.random.default_rng(seed)
+    # 网格边长 2 * TOL：角点 y 在格边界上，偏移后的端点落在相邻两格内；x 在格中线上，查找的相邻格随偏移方向变化
+    cell = 2 * TOL
+    corners = [(0.0, 0.0, 0.2), (10.0, 0.0, 0.2), (10.0, 10.0, 0.2), (0.0, 10.0, 0.2)]
+    corners = [(x + 0.5 * cell, y + cell, z) for x, y, z in corners]
+    offsets = rnd.uniform(-0.45 * TOL, 0.45 * TOL, (8, 3))
+    link = LinkSegs_dhash(polygonSegs(corners, lambda k: offsets[k]), TOL)
+    assert len(link.contours) == 1
+    assert link.openCount == 0 and link.polys == []
+    assert link.contours[0].count() == 5
+    assert link.contours[0].getArea() == pytest.approx(100.0, abs=1e-2)
+
+
+def test_endpointsInSameCellBeyondToleranceStayApart():
+    """两个端点在同一网格内（距离小于格宽）但相距超过容差，不合并，轮廓保持开放"""
+    corners = [(0.0, 0.0, 0.2), (10.0, 0.0, 0.2), (10.0, 10.0, 0.2), (0.0, 10.0, 0.2)]
+    # 第一条线段的起点与最后一条线段的终点相距 1.5 倍容差，都在 [0, 2 * TOL) 格内
+    x0 = 0.1 * TOL
+    corners = [(x + x0, y + x0, z) for x, y, z in corners]
+    segs = polygonSegs(corners)
+    segs[-1].B = Point3D(x0 + 1.5 * TOL, x0, 0.2)
+    assert np.floor(segs[0].A.x / (2 * TOL)) == np.floor(segs[-1].B.x / (2 * TOL))
+    link = LinkSegs_dhash(segs, TOL)
+    assert link.contours == []
+    assert link.openCount == 1
+    assert link.polys[0].count() == 5
+
+
+def test_separateChainsNotMerged():
+    """两条链的端点间距在容差和格宽之间，仍为两条开放链"""
+    a = [Segment(Point3D(0, 0, 0), Point3D(1, 0, 0)), Segment(Point3D(1, 0, 0), Point3D(1, 1, 0))]
+    gap = 1.2 * TOL
+    b = [Segment(Point3D(1 + gap, 1, 0), Point3D(2, 1, 0)), Segment(Point3D(2, 1, 0), Point3D(2, 2, 0))]
+    link = LinkSegs_dhash(a + b, TOL)
+    assert link.contours == []
+    assert link.openCount == 2
+    assert sorted(p.count() for p in link.polys) == [3, 3]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
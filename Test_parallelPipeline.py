@@ -0,0 +1,51 @@
+import os
+import pytest
+from StlModel import StlModel
+from GenNcCode import PrintParams, genAllPaths
+from Polyline import polylineToArray
+from SliceAlgo import slice_combine
+from ParallelPipeline import sliceCombineParallel
+
+STL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "STL")
+
+
+@pytest.fixture(scope="module")
+def stlModel():
+    stlModel = StlModel()
+    stlModel.readStlFile(os.path.join(STL_DIR, "multiEnds.STL"))
+    return stlModel
+
+
+def pathArrays(polys):
+    return [polylineToArray(p).tolist() for p in polys]
+
+
+def layerPaths(layers):
+    return [(layer.z, pathArrays(layer.cpPaths), pathArrays(layer.ffPaths), pathArrays(layer.sfPaths))
+            for layer in layers]
+
+
+def test_parallelPathsMatchSerial(stlModel):
+    """多进程生成的各层路径与单进程完全相同"""
+    pp = PrintParams(stlModel)
+    pp.layerThk = 1.0
+    serial = layerPaths(genAllPaths(pp))
+    pp.workers = 2
+    parallel = layerPaths(genAllPaths(pp))
+    assert sum(len(cp) + len(ff) + len(sf) for z, cp, ff, sf in serial) > 0
+    assert any(ff for z, cp, ff, sf in serial) and any(sf for z, cp, ff, sf in serial)
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("chunkSize", [1, 3, None])
+def test_chunkedIntersectionMatchesSliceCombine(stlModel, chunkSize):
+    """按层块截交只读取重叠面片，各层轮廓与整体截交相同"""
+    expected = slice_combine(stlModel, 1.0)
+    layers = sliceCombineParallel(stlModel, 1.0, workers=1, chunkSize=chunkSize)
+    assert [layer.z for layer in layers] == [layer.z for layer in expected]
+    assert [pathArrays(layer.contours) for layer in layers] == [pathArrays(layer.contours) for layer in expected]
+    assert [layer.openChains for layer in layers] == [layer.openChains for layer in expected]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import pytest
+from StlModel import StlModel
+from GenNcCode import PrintParams, genAllPaths, writeNcCode
+from Profiler import profiling
+
+STL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "STL")
+LAYER_COUNTERS = ('segments', 'contours', 'vertices')
+
+
+@pytest.fixture(scope="module")
+def pp():
+    stlModel = StlModel()
+    stlModel.readStlFile(os.path.join(STL_DIR, "multiEnds.STL"))
+    pp = PrintParams(stlModel)
+    pp.layerThk = 1.0
+    return pp
+
+
+def layerCounters(prof):
+    return {name: prof.counters.get(name, 0) for name in LAYER_COUNTERS}
+
+
+def test_streamedCountersMatchListPipeline(pp):
+    """流式流程的逐层计数器与整体生成相同，不随扫描遍数重复累加"""
+    with profiling('list') as listProf:
+        genAllPaths(pp)
+    with tempfile.TemporaryDirectory() as tmp, profiling('stream') as streamProf:
+        writeNcCode(pp, os.path.join(tmp, "out.gcode"))
+    assert all(n > 0 for n in layerCounters(listProf).values())
+    assert layerCounters(streamProf) == layerCounters(listProf)
+    assert 'idEndLayers:down' in streamProf.stages
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallelPipelineReportsPathStages(pp, workers):
+    """多进程生成路径时，子进程中的阶段耗时和计数器并入主进程的分析器"""
+    with profiling('list') as listProf:
+        genAllPaths(pp)
+    pp.workers = workers
+    try:
+        with profiling('parallel') as parProf:
+            genAllPaths(pp)
+    finally:
+        pp.workers = 1
+    for name in ('genCpPath', 'genDpPath', 'link', 'heal'):
+        assert parProf.stages[name][0] == listProf.stages[name][0]
+    # 并行切片在主进程批量截交，不逐层统计线段数
+    for name in ('contours', 'vertices'):
+        assert parProf.counters[name] == listProf.counters[name]
+    assert parProf.counters['clipper'] > 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import pytest
+from StlModel import StlModel
+from Layer import Layer
+from SliceAlgo import slice_combine
+from LinkSegs_dlook import LinkSegs_dlook
+from SliceCache import SliceCache, CachedSlice, sliceCached
+
+STL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "STL")
+
+
+@pytest.fixture(scope="module")
+def model():
+    stlModel = StlModel()
+    stlModel.readStlFile(os.path.join(STL_DIR, "multiEnds.STL"))
+    return stlModel
+
+
+def contourSignature(layers):
+    return [(layer.z, layer.openChains, [[(p.x, p.y, p.z) for p in c.points] for c in layer.contours])
+            for layer in layers]
+
+
+def test_truncatedCacheIsResliced(model):
+    """截断的缓存文件打开时即判为无效，重新切片并覆盖"""
+    expected = contourSignature(slice_combine(model, 2.0))
+    with tempfile.TemporaryDirectory() as cacheDir:
+        sliceCached(model, 2.0, cacheDir)
+        cache = SliceCache(cacheDir)
+        path = cache.path(cache.key(model, 2.0))
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as f:
+            f.truncate(size - 10)
+        with pytest.raises(ValueError):
+            CachedSlice(path)
+        assert cache.open(cache.key(model, 2.0)) is None
+
+        assert contourSignature(sliceCached(model, 2.0, cacheDir)) == expected
+        assert os.path.getsize(path) == size
+        with cache.open(cache.key(model, 2.0)) as cached:
+            assert contourSignature(cached.loadLayers()) == expected
+
+
+def test_failedSaveLeavesNoFiles(model):
+    """写入失败时删除临时文件，不留下缓存"""
+    with tempfile.TemporaryDirectory() as cacheDir:
+        cache = SliceCache(cacheDir)
+        key = cache.key(model, 2.0)
+        with pytest.raises(ValueError):
+            cache.save(key, iter([Layer(1.0)]), 2.0, count=2)
+        assert os.listdir(cacheDir) == []
+
+
+def test_keyIncludesLinkerAndSlicer(model):
+    with tempfile.TemporaryDirectory() as cacheDir:
+        cache = SliceCache(cacheDir)
+        assert cache.key(model, 2.0) != cache.key(model, 2.0, linker=LinkSegs_dlook)
+        assert cache.key(model, 2.0) != cache.key(model, 1.0)
+        assert cache.key(model, 2.0) == cache.key(model, 2.0, slicer=slice_combine)
+        assert cache.key(model, 2.0) != cache.key(model, 2.0, slicer=reversedSlicer)
+
+
+def reversedSlicer(stlModel, layerThk, zs=None):
+    """另一种切片函数：每层轮廓顺序相反"""
+    layers = slice_combine(stlModel, layerThk, zs)
+    for layer in layers:
+        layer.contours.reverse()
+    return layers
+
+
+def test_slicerResultsAreNotShared(model):
+    """不同切片函数的结果分别缓存，互不命中"""
+    with tempfile.TemporaryDirectory() as cacheDir:
+        custom = contourSignature(sliceCached(model, 2.0, cacheDir, slicer=reversedSlicer))
+        default = contourSignature(sliceCached(model, 2.0, cacheDir))
+        assert default == contourSignature(slice_combine(model, 2.0))
+        assert custom != default
+        assert contourSignature(sliceCached(model, 2.0, cacheDir, slicer=reversedSlicer)) == custom
+        assert len(os.listdir(cacheDir)) == 2
+
+
+def test_corruptBlockRaisesOnLoad(model):
+    """层内轮廓点数与索引中的数据块长度不符时，读取该层报错"""
+    with tempfile.TemporaryDirectory() as cacheDir:
+        sliceCached(model, 2.0, cacheDir)
+        cache = SliceCache(cacheDir)
+        path = cache.path(cache.key(model, 2.0))
+        with CachedSlice(path) as cached:
+            i = next(i for i, entry in enumerate(cached.index) if entry[3] > 0)
+            offset = cached.index[i][1]
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write((1).to_bytes(4, 'little'))
+        with CachedSlice(path) as cached:
+            with pytest.raises(ValueError):
+                cached.loadLayer(i)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import numpy as np
+import pytest
+import StlModel as StlModule
+from StlModel import StlModel
+
+
+def asciiStl(vertices, sep):
+    """由 (n,3,3) 顶点数组生成文本STL，sep 为各行之间的分隔符"""
+    lines = ["solid test"]
+    for tri in vertices:
+        lines.append("facet normal 0 0 1")
+        lines.append("outer loop")
+        lines += ["vertex %.17g %.17g %.17g" % tuple(v) for v in tri]
+        lines.append("endloop")
+        lines.append("endfacet")
+    lines.append("endsolid test")
+    return sep.join(lines)
+
+
+@pytest.mark.parametrize("sep", ["\n", " ", "\r\n"])
+@pytest.mark.parametrize("chunk", [64, 1000, 1 << 24])
+def test_chunkedAsciiParse(monkeypatch, sep, chunk):
+    """任意分块大小、没有换行的文件都能完整解析"""
+    rnd = np.random.default_rng(3)
+    vertices = rnd.uniform(-100, 100, (300, 3, 3))
+    monkeypatch.setattr(StlModule, "ASCII_CHUNK_BYTES", chunk)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.stl")
+        with open(path, "w") as f:
+            f.write(asciiStl(vertices, sep))
+        stlModel = StlModel()
+        assert stlModel.readStlFile(path)
+    assert stlModel.getFacetNumber() == len(vertices)
+    assert np.array_equal(stlModel.getFacetVertices(slice(0, len(vertices))), vertices)
+
+
+def test_carryOverIsBounded(monkeypatch):
+    """没有换行的单行文件，每块并入下一块的剩余部分不超过一个面片"""
+    vertices = np.arange(900, dtype=np.float64).reshape(100, 3, 3)
+    monkeypatch.setattr(StlModule, "ASCII_CHUNK_BYTES", 256)
+    sizes = []
+    parse = StlModel._parseAsciiChunk
+
+    def recordingParse(self, buf):
+        sizes.append(len(buf))
+        return parse(self, buf)
+
+    monkeypatch.setattr(StlModel, "_parseAsciiChunk", recordingParse)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.stl")
+        with open(path, "w") as f:
+            f.write(asciiStl(vertices, " "))
+        stlModel = StlModel()
+        assert stlModel.readStlFile(path)
+    assert stlModel.getFacetNumber() == 100
+    assert max(sizes) < 2 * 256
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
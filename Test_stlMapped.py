@@ -0,0 +1,57 @@
+import os
+import tempfile
+import numpy as np
+import pytest
+from StlModel import StlModel, STL_FACET_DTYPE
+
+STL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "STL")
+
+
+def writeBinaryStl(path, vertices):
+    facets = np.zeros(len(vertices), dtype=STL_FACET_DTYPE)
+    facets['vertices'] = vertices
+    with open(path, 'wb') as f:
+        f.write(bytes(80))
+        f.write(np.uint32(len(facets)).tobytes())
+        f.write(facets.tobytes())
+
+
+def readBoth(path):
+    array, mapped = StlModel(), StlModel()
+    assert array.readStlFile(path)
+    assert mapped.readStlFile(path, mapped=True)
+    return array, mapped
+
+
+def assertSameModel(array, mapped):
+    n = array.getFacetNumber()
+    assert mapped.getFacetNumber() == n
+    assert mapped.getBounds() == array.getBounds()
+    assert np.isfinite(mapped.getBounds()).all()
+    assert np.array_equal(mapped.getFacetVertices(slice(0, n)), array.getFacetVertices(slice(0, n)))
+    for a, b in zip(mapped.getFacetZRange(), array.getFacetZRange()):
+        assert np.array_equal(a, b)
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, 1e9])
+def test_mappedMatchesArrayWithCorruptFacet(bad):
+    """含坏面片的二进制STL，映射模式与整体读入的面片、边界和Z范围相同"""
+    rnd = np.random.default_rng(1)
+    vertices = rnd.uniform(-50, 50, (200, 3, 3)).astype(np.float32)
+    vertices[17, 1, 2] = bad
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corrupt.stl")
+        writeBinaryStl(path, vertices)
+        array, mapped = readBoth(path)
+        assert array.getFacetNumber() == 199
+        assertSameModel(array, mapped)
+
+
+def test_mappedMatchesArray():
+    array, mapped = readBoth(os.path.join(STL_DIR, "baymax.stl"))
+    assert mapped.isMapped()
+    assertSameModel(array, mapped)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
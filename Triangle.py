@@ -1,6 +1,8 @@
 from GeomBase import*
 
 class Triangle:
+    __slots__ = ('A', 'B', 'C', 'N', 'zs')
+
     def __init__(self,A, B, C, N = Vector3D(0,0,0)):
         self.A, self.B, self.C, self.N = A.clone(), B.clone(), C.clone(), N.clone()
         self.zs=[]
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 def makeListLinear(lists):
     """将多维列表转化为一维列表"""
@@ -21,4 +22,14 @@ def degToRad(deg):
 
 def radToDeg(rad):
     """弧度转角度"""
-    return rad * 180.0 / math.pi
\ No newline at end of file
+    return rad * 180.0 / math.pi
+
+def expandRanges(starts, counts):
+    """把区间 [starts[k], starts[k] + counts[k]) 逐个展开，返回 (区间序号, 取值) 两个数组
+    starts 为 None 时取值为区间内的局部序号 0..counts[k]-1"""
+    counts = np.asarray(counts, dtype=np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    if starts is None:
+        return owner, local
+    return owner, np.asarray(starts)[owner] + local